@@ -0,0 +1,179 @@
+"""
+District Daily Anomaly Detection
+================================
+Flags single-district spikes that the national trend charts hide.
+- Dense district x day matrix per dataset and metric (from the prefix-sum
+  date index, one np.diff away)
+- Trailing-window median / MAD baselines for every district at once
+  (sliding-window views, no per-district loop)
+- Robust z-scores, ranked anomaly table and an optional report figure
+
+Usage:
+  python anomalies.py [--threshold 4] [--window 28] [--metrics norm_total norm_18_plus] [--plot]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from date_index import load_date_index
+from metrics import DATA_DIR, DATASETS, SCRIPT_DIR
+
+BASELINE_DAYS = 28
+Z_THRESHOLD = 4.0
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+ANOMALY_FILE = os.path.join(SCRIPT_DIR, "district_anomalies.csv")
+
+
+def district_day_matrix(dataset_name, metric='norm_total', data_dir=DATA_DIR):
+    """
+    Dense daily values for every district of a dataset.
+
+    Returns:
+    --------
+    (keys, dates, daily): 'State|District' Index, DatetimeIndex, array (districts x days)
+    """
+    index = load_date_index(dataset_name, 'district', data_dir)
+    if index is None:
+        return None
+    daily = np.diff(index.cumsum[:, :, index.metrics.index(metric)], axis=1)
+    return index.keys, index.dates, daily
+
+
+def robust_zscores(daily, window=BASELINE_DAYS):
+    """
+    Trailing baselines and robust z-scores for every row of a (series x days) matrix.
+
+    The baseline for day t is the median of days t-window .. t-1; the scale is
+    MAD_SCALE * MAD, floored at sqrt(baseline + 1) so that sparse, mostly-zero
+    series are not flagged for ordinary count noise. The first `window` days
+    have no baseline (NaN).
+
+    Returns:
+    --------
+    (baseline, z): arrays with the shape of daily
+    """
+    baseline = np.full(daily.shape, np.nan)
+    z = np.full(daily.shape, np.nan)
+    if daily.shape[1] <= window:
+        return baseline, z
+
+    windows = sliding_window_view(daily, window, axis=1)[:, :-1]  # days t-window .. t-1
+    med = np.median(windows, axis=-1)
+    mad = np.median(np.abs(windows - med[..., None]), axis=-1)
+    scale = np.maximum(MAD_SCALE * mad, np.sqrt(med + 1))
+
+    baseline[:, window:] = med
+    z[:, window:] = (daily[:, window:] - med) / scale
+    return baseline, z
+
+
+def detect_anomalies(datasets=None, metrics=('norm_total',), threshold=Z_THRESHOLD,
+                     window=BASELINE_DAYS, data_dir=DATA_DIR):
+    """
+    Ranked district-day spikes across datasets and metrics.
+
+    Returns:
+    --------
+    pd.DataFrame with columns: dataset, metric, state, district, date, value,
+    baseline, z (sorted by z, highest first)
+    """
+    frames = []
+    for name in datasets or DATASETS:
+        for metric in metrics:
+            matrix = district_day_matrix(name, metric, data_dir)
+            if matrix is None:
+                continue
+            keys, dates, daily = matrix
+            baseline, z = robust_zscores(daily, window)
+            rows, cols = np.nonzero(np.nan_to_num(z, nan=-np.inf) >= threshold)
+            parts = keys[rows].str.split('|', n=1, expand=True) if len(rows) else None
+            frames.append(pd.DataFrame({
+                'dataset': name,
+                'metric': metric,
+                'state': parts.get_level_values(0) if len(rows) else [],
+                'district': parts.get_level_values(1) if len(rows) else [],
+                'date': dates[cols],
+                'value': daily[rows, cols],
+                'baseline': baseline[rows, cols],
+                'z': z[rows, cols],
+            }))
+    if not frames:
+        raise FileNotFoundError(f"No cleaned data found in {data_dir}")
+    return pd.concat(frames, ignore_index=True).sort_values('z', ascending=False, ignore_index=True)
+
+
+def plot_anomalies(anomalies, n=6, window=BASELINE_DAYS, data_dir=DATA_DIR, output_file=None):
+    """Small multiples of the top-n anomalous district series with their baselines."""
+    import matplotlib.pyplot as plt
+    from matplotlib.dates import DateFormatter
+
+    top = anomalies.drop_duplicates(['dataset', 'metric', 'state', 'district']).head(n)
+    if top.empty:
+        print("No anomalies to plot.")
+        return
+    n_cols = 2 if len(top) > 1 else 1
+    n_rows = int(np.ceil(len(top) / n_cols))
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(7 * n_cols, 3 * n_rows), squeeze=False)
+
+    matrices = {}
+    for ax, row in zip(axes.flat, top.itertuples()):
+        key = (row.dataset, row.metric)
+        if key not in matrices:
+            keys, dates, daily = district_day_matrix(row.dataset, row.metric, data_dir)
+            matrices[key] = (keys, dates, daily, robust_zscores(daily, window)[0])
+        keys, dates, daily, baseline = matrices[key]
+        i = keys.get_loc(f"{row.state}|{row.district}")
+        flagged = anomalies[(anomalies['dataset'] == row.dataset) & (anomalies['metric'] == row.metric)
+                            & (anomalies['state'] == row.state) & (anomalies['district'] == row.district)]
+
+        ax.plot(dates, daily[i], color='#4c72b0', linewidth=1, label='Daily')
+        ax.plot(dates, baseline[i], color='#999999', linestyle='--', linewidth=1, label=f'{window}-day median')
+        ax.scatter(flagged['date'], flagged['value'], color='#dd3333', zorder=3, s=20, label='Anomaly')
+        ax.set_title(f"{row.district}, {row.state} ({row.dataset}, {row.metric})", fontsize=10)
+        ax.xaxis.set_major_formatter(DateFormatter("%d %b"))
+        ax.tick_params(labelsize=8)
+    for ax in list(axes.flat)[len(top):]:
+        ax.axis('off')
+    axes.flat[0].legend(fontsize=8)
+    fig.suptitle("Top District Anomalies (robust z-score)", fontsize=13)
+    fig.tight_layout()
+    if output_file:
+        fig.savefig(output_file, dpi=150)
+        print(f"[OK] Anomaly figure saved: {output_file}")
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect district-level daily anomalies")
+    parser.add_argument('--threshold', type=float, default=Z_THRESHOLD, help="Robust z-score cut-off")
+    parser.add_argument('--window', type=int, default=BASELINE_DAYS, help="Trailing baseline days")
+    parser.add_argument('--metrics', nargs='+', default=['norm_total'])
+    parser.add_argument('--top', type=int, default=20, help="Anomalies to print")
+    parser.add_argument('--plot', action='store_true', help="Save and show a report figure")
+    parser.add_argument('--output', default=ANOMALY_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    anomalies = detect_anomalies(metrics=args.metrics, threshold=args.threshold, window=args.window)
+    elapsed = time.perf_counter() - start
+
+    anomalies.to_csv(args.output, index=False)
+    print(f"\n{'='*60}")
+    print(f"DISTRICT ANOMALIES (z >= {args.threshold:g}, {args.window}-day baseline)")
+    print('='*60)
+    with pd.option_context('display.width', 200):
+        print(anomalies.head(args.top).to_string(index=False, float_format='{:,.1f}'.format))
+    print(f"\n[OK] {len(anomalies):,} anomalies in {elapsed:.2f}s, saved to: {args.output}")
+
+    if args.plot:
+        plot_anomalies(anomalies, window=args.window,
+                       output_file=os.path.splitext(args.output)[0] + '.png')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""
+Local Analytics HTTP Service
+============================
+Loads the cleaned datasets once, keeps pre-aggregated tables in memory
+and serves JSON for maps and dashboards.
+- Threaded server (concurrent requests), stdlib only
+- LRU cache of serialized responses keyed by endpoint + query
+- Date-range (start/end) and state filters on every data endpoint
+  (pincode prefix drill-down covers the full date span)
+
+Endpoints (all GET, JSON):
+  /api/health
+  /api/datasets
+  /api/state_totals ?dataset=&metric=&start=&end=&states=
+  /api/peaks        ?dataset=&metric=&start=&end=&states=
+  /api/hotspots     ?dataset=&metric=&k=&start=&end=&states=
+  /api/daily        ?dataset=&metric=&start=&end=&states=&by=state
+  /api/pincodes     ?dataset=&metric=&prefix=&k=&states=   (prefix: 2-4 digits; omit for regions)
+
+Usage:
+  python api_server.py [--port 8050]
+  python api_server.py --load-test http://127.0.0.1:8050 --requests 2000 --concurrency 16
+"""
+
+import argparse
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+from date_index import DateRangeIndex
+from hotspots import top_k_per_group
+from metrics import DATA_DIR, DATASETS, METRIC_COLUMNS, add_norm_columns, load_cleaned
+from pincode_index import PREFIX_DIGITS, PincodeRollup
+
+CACHE_SIZE = 512
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of serialized JSON responses."""
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class PincodeDays:
+    """
+    Pincode x day totals for date-ranged hotspots, without regrouping rows.
+
+    Hotspots rank pincodes within any date range, so the day grain has to be
+    kept; a dense prefix sum at that grain (~19k pincodes x ~300 days x 4
+    metrics as float64) would take ~180 MB per dataset. Instead rows are
+    sorted by date with integer pincode codes: a range is a searchsorted
+    slice and one bincount per request, and full-span totals are precomputed.
+    """
+
+    def __init__(self, pin):
+        # pin comes from a sorted groupby, so each (state, district, pincode) is contiguous
+        keys = pin[['state', 'district', 'pincode']]
+        new_key = np.r_[True, (keys.iloc[1:].to_numpy() != keys.iloc[:-1].to_numpy()).any(axis=1)]
+        self.keys = keys[new_key].reset_index(drop=True)
+        order = np.argsort(pin['date'].to_numpy(), kind='stable')
+        self.dates = pin['date'].to_numpy()[order]
+        self.codes = (np.cumsum(new_key) - 1)[order]
+        self.values = pin[METRIC_COLUMNS].to_numpy(dtype=np.float64)[order]
+        self.dtypes = pin[METRIC_COLUMNS].dtypes
+        self.totals = self.keys.assign(**{m: self._sum(m, 0, len(self.dates)) for m in METRIC_COLUMNS})
+
+    def _sum(self, metric, lo, hi):
+        sums = np.bincount(self.codes[lo:hi], weights=self.values[lo:hi, METRIC_COLUMNS.index(metric)],
+                           minlength=len(self.keys))
+        return sums.astype(self.dtypes[metric])
+
+    def range_total(self, metric, start=None, end=None):
+        """Per-pincode totals of a metric over [start, end]: state, district, pincode, metric."""
+        if not start and not end:
+            return self.totals[['state', 'district', 'pincode', metric]]
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), 'left') if start else 0
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), 'right') if end else len(self.dates)
+        return self.keys.assign(**{metric: self._sum(metric, lo, max(lo, hi))})
+
+
+class AnalyticsStore:
+    """In-memory pre-aggregated tables for every dataset."""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.pincode_days = {}
+        self.state_day = {}
+        self.date_index = {}
+        self.pincode_rollup = {}
+        print("Loading datasets into the analytics store...")
+        for name in DATASETS:
+            df = load_cleaned(name, data_dir)
+            if df is None:
+                continue
+            add_norm_columns(df, name)
+            df['date'] = pd.to_datetime(df['date'])
+            self.pincode_rollup[name] = PincodeRollup.from_frame(df)
+            pin = df.groupby(['state', 'district', 'pincode', 'date'])[METRIC_COLUMNS].sum().reset_index()
+            self.pincode_days[name] = PincodeDays(pin)
+            self.state_day[name] = pin.groupby(['state', 'date'])[METRIC_COLUMNS].sum().reset_index()
+            self.date_index[name] = DateRangeIndex.from_frame(self.state_day[name], 'state')
+            print(f"  - {name}: {len(df):,} rows -> {len(pin):,} pincode-days")
+        if not self.state_day:
+            raise FileNotFoundError(f"No cleaned data found in {data_dir}")
+
+    # --- Filters ---
+    @staticmethod
+    def _filter(frame, start=None, end=None, states=None):
+        mask = np.ones(len(frame), dtype=bool)
+        if start:
+            mask &= (frame['date'] >= pd.Timestamp(start)).to_numpy()
+        if end:
+            mask &= (frame['date'] <= pd.Timestamp(end)).to_numpy()
+        if states:
+            mask &= frame['state'].isin(states).to_numpy()
+        return frame[mask]
+
+    # --- Endpoints ---
+    def datasets(self):
+        return {
+            name: {
+                'metrics': METRIC_COLUMNS,
+                'start': frame['date'].min().strftime('%Y-%m-%d'),
+                'end': frame['date'].max().strftime('%Y-%m-%d'),
+                'states': sorted(frame['state'].unique()),
+            }
+            for name, frame in self.state_day.items()
+        }
+
+    def state_totals(self, dataset, metric, start=None, end=None, states=None):
+        # Prefix-sum lookup: O(states) for any date range
+        totals = self.date_index[dataset].range_total(start, end)[metric].round().astype('int64')
+        if states:
+            totals = totals[totals.index.isin(states)]
+        return {'dataset': dataset, 'metric': metric, 'totals': totals.to_dict()}
+
+    def peaks(self, dataset, metric, start=None, end=None, states=None):
+        rows = self._filter(self.state_day[dataset], start, end, states)
+        top = top_k_per_group(rows, 'state', metric, 1)
+        return {
+            'dataset': dataset, 'metric': metric,
+            'peaks': {s: {'date': d.strftime('%Y-%m-%d'), 'value': v}
+                      for s, d, v in zip(top['state'], top['date'], top[metric])},
+        }
+
+    def hotspots(self, dataset, metric, k=3, start=None, end=None, states=None):
+        agg = self.pincode_days[dataset].range_total(metric, start, end)
+        if states:
+            agg = agg[agg['state'].isin(states)]
+        top = top_k_per_group(agg[agg[metric] > 0], 'state', metric, k)
+        result = {}
+        for s, r, d, p, v in zip(top['state'], top['rank'], top['district'], top['pincode'], top[metric]):
+            result.setdefault(s, []).append({'rank': r, 'district': d, 'pincode': str(p), 'value': v})
+        return {'dataset': dataset, 'metric': metric, 'k': k, 'hotspots': result}
+
+    def daily(self, dataset, metric, start=None, end=None, states=None, by=None):
+        rows = self._filter(self.state_day[dataset], start, end, states)
+        if by == 'state':
+            series = {
+                s: {'dates': g['date'].dt.strftime('%Y-%m-%d').tolist(), 'values': g[metric].tolist()}
+                for s, g in rows.groupby('state')
+            }
+        else:
+            total = rows.groupby('date')[metric].sum()
+            series = {'dates': total.index.strftime('%Y-%m-%d').tolist(), 'values': total.tolist()}
+        return {'dataset': dataset, 'metric': metric, 'series': series}
+
+    def pincodes(self, dataset, metric, prefix=None, k=10, states=None):
+        # Prefix roll-up: the prefix total is a lookup, its children a sorted range
+        rollup = self.pincode_rollup[dataset]
+        if prefix:
+            if not prefix.isdigit() or len(prefix) not in PREFIX_DIGITS[:-1]:
+                raise ValueError(f"prefix must be {'/'.join(map(str, PREFIX_DIGITS[:-1]))} digits: {prefix}")
+            row = rollup.lookup(prefix)
+            total = None if row is None else {'state': row['state'], 'pincodes': row['pincodes'],
+                                              'value': int(round(row[metric]))}
+            rows = rollup.children(prefix)
+        else:
+            total, rows = None, rollup.levels[PREFIX_DIGITS[0]]
+        if states:
+            rows = rows[rows['state'].isin(states)]
+        rows = rows.nlargest(k, metric)
+        children = [
+            {'prefix': str(p), 'state': s, 'pincodes': n, 'value': v}
+            for p, s, n, v in zip(rows.index, rows['state'], rows['pincodes'],
+                                  rows[metric].round().astype('int64'))
+        ]
+        if 'district' in rows.columns:
+            for child, district in zip(children, rows['district']):
+                child['district'] = district
+        return {'dataset': dataset, 'metric': metric, 'prefix': prefix, 'total': total,
+                'children': children}
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def make_handler(store, cache):
+    """Request handler class bound to a store and a response cache."""
+
+    endpoints = {
+        '/api/state_totals': store.state_totals,
+        '/api/peaks': store.peaks,
+        '/api/hotspots': store.hotspots,
+        '/api/daily': store.daily,
+        '/api/pincodes': store.pincodes,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass  # keep load tests quiet
+
+        def _send(self, status, body, cache_status='MISS'):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('X-Cache', cache_status)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            cache_key = (url.path, tuple(sorted(query.items())))
+
+            body = cache.get(cache_key)
+            if body is not None:
+                self._send(200, body, 'HIT')
+                return
+
+            try:
+                if url.path == '/api/health':
+                    payload = {'status': 'ok', 'cache': {'hits': cache.hits, 'misses': cache.misses}}
+                    self._send(200, json.dumps(payload).encode())
+                    return
+                if url.path == '/api/datasets':
+                    payload = store.datasets()
+                elif url.path in endpoints:
+                    dataset = query.get('dataset', next(iter(store.state_day)))
+                    metric = query.get('metric', 'norm_total')
+                    if dataset not in store.state_day or metric not in METRIC_COLUMNS:
+                        raise ValueError(f"Unknown dataset/metric: {dataset}/{metric}")
+                    kwargs = {
+                        'start': query.get('start'),
+                        'end': query.get('end'),
+                        'states': query['states'].split(',') if query.get('states') else None,
+                    }
+                    if url.path == '/api/hotspots':
+                        kwargs['k'] = int(query.get('k', 3))
+                    if url.path == '/api/daily':
+                        kwargs['by'] = query.get('by')
+                    if url.path == '/api/pincodes':
+                        kwargs = {'prefix': query.get('prefix'), 'k': int(query.get('k', 10)),
+                                  'states': kwargs['states']}
+                    payload = endpoints[url.path](dataset, metric, **kwargs)
+                else:
+                    self._send(404, json.dumps({'error': f"Unknown endpoint: {url.path}"}).encode())
+                    return
+                body = json.dumps(payload, default=_json_default, separators=(',', ':')).encode()
+            except (ValueError, KeyError) as e:
+                self._send(400, json.dumps({'error': str(e)}).encode())
+                return
+            except Exception as e:
+                # Anything else is a server bug: answer in JSON instead of dropping the connection
+                traceback.print_exc()
+                self._send(500, json.dumps({'error': f"Internal error: {type(e).__name__}: {e}"}).encode())
+                return
+
+            cache.put(cache_key, body)
+            self._send(200, body)
+
+    return Handler
+
+
+class AnalyticsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # default listen backlog of 5 stalls concurrent clients
+
+
+def serve(host='127.0.0.1', port=8050, data_dir=DATA_DIR):
+    """Load the store and serve until interrupted."""
+    store = AnalyticsStore(data_dir)
+    server = AnalyticsServer((host, port), make_handler(store, ResponseCache()))
+    print(f"[OK] Serving analytics API on http://{host}:{port}/api/datasets")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def load_test(base_url, n_requests=1000, concurrency=16):
+    """Fire a mix of endpoint requests and report throughput and latency percentiles."""
+    datasets = json.loads(urlopen(f"{base_url}/api/datasets").read())
+    paths = []
+    for name, info in datasets.items():
+        for metric in info['metrics']:
+            paths += [
+                f"/api/state_totals?dataset={name}&metric={metric}",
+                f"/api/peaks?dataset={name}&metric={metric}",
+                f"/api/hotspots?dataset={name}&metric={metric}&k=3",
+                f"/api/pincodes?dataset={name}&metric={metric}",
+                f"/api/daily?dataset={name}&metric={metric}&start={info['start']}&end={info['end']}",
+            ]
+
+    def fetch(i):
+        start = time.perf_counter()
+        urlopen(base_url + paths[i % len(paths)]).read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(fetch, range(n_requests))))
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'='*60}")
+    print(f"LOAD TEST: {n_requests:,} requests, concurrency {concurrency}")
+    print('='*60)
+    print(f"  Throughput: {n_requests / elapsed:,.0f} req/s ({elapsed:.2f}s)")
+    for p in (50, 90, 99):
+        print(f"  p{p} latency: {np.percentile(latencies, p) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local analytics HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--load-test', metavar='URL', help="Load-test a running server instead of serving")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.load_test:
+        load_test(args.load_test.rstrip('/'), args.requests, args.concurrency)
+    else:
+        serve(args.host, args.port, args.data_dir)
+
+
+if __name__ == '__main__':
+    main()
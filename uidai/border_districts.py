@@ -0,0 +1,244 @@
+"""
+Geometry-Derived Border Districts
+=================================
+Finds the districts lying within N km of India's international land
+boundary, replacing the hand-typed border district list.
+- Grid spatial index over the boundary line segments
+- Vectorised vertex-to-segment distances (km) per candidate district
+- Area-weighted district centroids for bubble placement
+- Results cached per buffer distance in geo/cache/
+
+Usage:
+  python border_districts.py [buffer_km]
+"""
+
+import json
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from district_geometry import DISTRICT_GEOJSON, GEO_DIR, load_district_geojson
+
+BOUNDARY_GEOJSON = os.path.join(GEO_DIR, "india_land_boundary.geojson")
+CACHE_DIR = os.path.join(GEO_DIR, "cache")
+MAX_BROADCAST_PAIRS = 1_000_000  # point x segment pairs per distance chunk (~16 MB per array)
+
+# Hand-typed border districts, used when the geometry is not vendored
+FALLBACK_BORDER_DISTRICTS = [
+    'Kachchh', 'Kutch', 'Banas Kantha', 'Banaskantha', 'Barmer', 'Jaisalmer', 'Bikaner', 'Ganganagar', 
+    'Fazilka', 'Firozpur', 'Ferozepur', 'Tarn Taran', 'Amritsar', 'Gurdaspur', 'Pathankot',
+    'Kathua', 'Samba', 'Jammu', 'Rajouri', 'Poonch', 'Baramulla', 'Kupwara', 'Bandipore', 'Kargil', 'Leh', 'Ladakh',
+    'Lahaul And Spiti', 'Kinnaur', 'Uttarkashi', 'Chamoli', 'Pithoragarh', 'Champawat', 'Udham Singh Nagar',
+    'Pilibhit', 'Lakhimpur Kheri', 'Bahraich', 'Shrawasti', 'Balrampur', 'Siddharthnagar', 'Maharajganj',
+    'West Champaran', 'East Champaran', 'Sitamarhi', 'Madhubani', 'Supaul', 'Araria', 'Kishanganj',
+    'Darjeeling', 'Jalpaiguri', 'Cooch Behar', 'Alipurduar', 'Uttar Dinajpur', 'Dakshin Dinajpur', 
+    'Maldah', 'Murshidabad', 'Nadia', 'North 24 Parganas', 'South 24 Parganas',
+    'North Sikkim', 'East Sikkim', 'West Sikkim', 'South Sikkim', 'Sikkim',
+    'Dhubri', 'Kokrajhar', 'Chirang', 'Baksa', 'Udalguri', 'Cachar', 'Karimganj', 'Hailakandi',
+    'West Garo Hills', 'South Garo Hills', 'East Khasi Hills', 'West Jaintia Hills',
+    'West Tripura', 'Khowai', 'Sepahijala', 'South Tripura', 'Dhalai', 'Unakoti', 'North Tripura',
+    'Mamit', 'Lunglei', 'Lawngtlai', 'Saiha', 'Champhai', 'Serchhip',
+    'Churachandpur', 'Chandel', 'Tengnoupal', 'Kamjong', 'Ukhrul',
+    'Mon', 'Tuensang', 'Kiphire', 'Phek', 'Noklak',
+    'Tawang', 'West Kameng', 'Upper Subansiri', 'West Siang', 'Upper Siang', 'Anjaw', 'Changlang', 'Tirap', 'Longding'
+]
+
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON_EQUATOR = 111.32
+
+
+# ============================================================================
+# SPATIAL INDEX
+# ============================================================================
+class SegmentGridIndex:
+    """
+    Uniform lat/lon grid over line segments.
+
+    Each segment is registered in every cell its bounding box touches, so a
+    bounding-box query only has to look at the segments in the cells it
+    overlaps instead of the whole boundary.
+    """
+
+    def __init__(self, segments, cell_deg=0.5):
+        # segments: (N, 4) array of [lon1, lat1, lon2, lat2]
+        self.segments = np.asarray(segments, dtype=float)
+        self.cell_deg = cell_deg
+        self.cells = defaultdict(list)
+
+        lon_min = np.minimum(self.segments[:, 0], self.segments[:, 2])
+        lon_max = np.maximum(self.segments[:, 0], self.segments[:, 2])
+        lat_min = np.minimum(self.segments[:, 1], self.segments[:, 3])
+        lat_max = np.maximum(self.segments[:, 1], self.segments[:, 3])
+        for i, (x0, x1, y0, y1) in enumerate(zip(
+            self._cell(lon_min), self._cell(lon_max), self._cell(lat_min), self._cell(lat_max)
+        )):
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells[(cx, cy)].append(i)
+
+    def _cell(self, values):
+        return np.floor(np.asarray(values) / self.cell_deg).astype(int)
+
+    def query(self, lon_min, lat_min, lon_max, lat_max):
+        """Indices of segments whose cells overlap the bounding box."""
+        x0, x1 = self._cell([lon_min, lon_max])
+        y0, y1 = self._cell([lat_min, lat_max])
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return np.fromiter(found, dtype=int, count=len(found))
+
+
+def _line_segments(geojson):
+    """All boundary line segments as an (N, 4) array of [lon1, lat1, lon2, lat2]."""
+    segments = []
+    for feat in geojson['features']:
+        geom = feat['geometry']
+        if geom['type'] == 'LineString':
+            lines = [geom['coordinates']]
+        elif geom['type'] == 'MultiLineString':
+            lines = geom['coordinates']
+        elif geom['type'] == 'Polygon':
+            lines = geom['coordinates']
+        else:  # MultiPolygon
+            lines = [ring for polygon in geom['coordinates'] for ring in polygon]
+        for line in lines:
+            pts = np.asarray(line, dtype=float)[:, :2]
+            segments.append(np.hstack([pts[:-1], pts[1:]]))
+    return np.vstack(segments)
+
+
+def _min_distance_km(points, segments):
+    """Minimum distance (km) from any point to any segment (local equirectangular)."""
+    lat0 = np.radians(points[:, 1].mean())
+    scale = np.array([KM_PER_DEG_LON_EQUATOR * np.cos(lat0), KM_PER_DEG_LAT])
+
+    a = segments[None, :, :2] * scale         # (1, k, 2)
+    b = segments[None, :, 2:] * scale
+    ab = b - a
+    denom = (ab ** 2).sum(axis=2)
+    safe_denom = np.where(denom > 0, denom, 1)
+
+    # Points in chunks, so the (chunk, k, 2) broadcast stays under MAX_BROADCAST_PAIRS
+    best = np.inf
+    step = max(1, MAX_BROADCAST_PAIRS // max(len(segments), 1))
+    for start in range(0, len(points), step):
+        p = points[start:start + step, None, :] * scale   # (chunk, 1, 2)
+        t = np.where(denom > 0, ((p - a) * ab).sum(axis=2) / safe_denom, 0)
+        closest = a + np.clip(t, 0, 1)[..., None] * ab
+        best = min(best, float(np.sqrt(((p - closest) ** 2).sum(axis=2)).min()))
+    return best
+
+
+def _rings(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    return geometry['coordinates']
+
+
+def polygon_centroid(geometry):
+    """Area-weighted centroid (lon, lat) of a Polygon/MultiPolygon (outer rings)."""
+    total_area = cx = cy = 0.0
+    for polygon in _rings(geometry):
+        ring = np.asarray(polygon[0], dtype=float)
+        x, y = ring[:, 0], ring[:, 1]
+        cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+        area = cross.sum() / 2
+        if area == 0:
+            continue
+        cx += ((x[:-1] + x[1:]) * cross).sum() / 6
+        cy += ((y[:-1] + y[1:]) * cross).sum() / 6
+        total_area += area
+    if total_area == 0:
+        ring = np.asarray(_rings(geometry)[0][0], dtype=float)
+        return float(ring[:, 0].mean()), float(ring[:, 1].mean())
+    return float(cx / total_area), float(cy / total_area)
+
+
+# ============================================================================
+# BORDER DISTRICT SET
+# ============================================================================
+def compute_border_districts(buffer_km, district_geojson, boundary_geojson):
+    """
+    Districts within buffer_km of the boundary, with centroids and distances.
+
+    Returns:
+    --------
+    pd.DataFrame with columns: state, district, district_key, distance_km, lat, lon
+    """
+    index = SegmentGridIndex(_line_segments(boundary_geojson))
+    rows = []
+    for feat in district_geojson['features']:
+        props = feat['properties']
+        points = np.vstack([np.asarray(ring, dtype=float)[:, :2]
+                            for polygon in _rings(feat['geometry']) for ring in polygon])
+
+        # Bounding box grown by the buffer distance, in degrees
+        lat_pad = buffer_km / KM_PER_DEG_LAT
+        lon_pad = buffer_km / (KM_PER_DEG_LON_EQUATOR * np.cos(np.radians(points[:, 1].mean())))
+        candidates = index.query(points[:, 0].min() - lon_pad, points[:, 1].min() - lat_pad,
+                                 points[:, 0].max() + lon_pad, points[:, 1].max() + lat_pad)
+        if len(candidates) == 0:
+            continue
+
+        distance = _min_distance_km(points, index.segments[candidates])
+        if distance <= buffer_km:
+            lon, lat = polygon_centroid(feat['geometry'])
+            rows.append({
+                'state': props['state'],
+                'district': props['district'],
+                'district_key': props['district_key'],
+                'distance_km': round(distance, 2),
+                'lat': round(lat, 4),
+                'lon': round(lon, 4),
+            })
+
+    columns = ['state', 'district', 'district_key', 'distance_km', 'lat', 'lon']
+    return pd.DataFrame(rows, columns=columns).sort_values(['state', 'district']).reset_index(drop=True)
+
+
+def load_border_districts(buffer_km=50, district_path=DISTRICT_GEOJSON,
+                          boundary_path=BOUNDARY_GEOJSON, cache_dir=CACHE_DIR):
+    """
+    Border districts for a buffer distance, served from the disk cache when valid.
+
+    The cache entry is reused while it is newer than both geometry files.
+    """
+    cache_file = os.path.join(cache_dir, f"border_districts_{buffer_km:g}km.csv")
+    if os.path.exists(cache_file) and all(
+        os.path.getmtime(p) <= os.path.getmtime(cache_file) for p in (district_path, boundary_path)
+    ):
+        return pd.read_csv(cache_file)
+
+    if not os.path.exists(boundary_path):
+        raise FileNotFoundError(f"International boundary geometry not found: {boundary_path}")
+    with open(boundary_path) as f:
+        boundary_geojson = json.load(f)
+    result = compute_border_districts(buffer_km, load_district_geojson(district_path), boundary_geojson)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    result.to_csv(cache_file, index=False)
+    print(f"[OK] {len(result)} border districts within {buffer_km:g} km cached: {cache_file}")
+    return result
+
+
+def border_districts_or_fallback(buffer_km=50):
+    """
+    Geometry-derived border districts, or None (with a warning) when the
+    geometry is not vendored and callers must use FALLBACK_BORDER_DISTRICTS.
+    """
+    try:
+        return load_border_districts(buffer_km)
+    except FileNotFoundError as e:
+        print(f"  [WARN] Border geometry missing; using the hand-typed list of "
+              f"{len(FALLBACK_BORDER_DISTRICTS)} border district names. {e}")
+        return None
+
+
+if __name__ == '__main__':
+    buffer = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(load_border_districts(buffer).to_string(index=False))
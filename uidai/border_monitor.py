@@ -0,0 +1,225 @@
+"""
+Incremental Border-District Surge Monitor
+=========================================
+Daily alerting for border districts without recomputing the full history.
+- Per-district exponentially weighted mean/variance for every metric,
+  persisted between runs next to the cleaned store
+- Each new day is one O(districts) array update; z-scores are taken
+  against the statistics from before that day
+- Alerts for border districts (geometry-derived, else the hand-typed list)
+  are printed and appended to border_alerts.csv
+
+New days come from the district date index (days after the last processed
+date). The index is extended in place with newer part files, not rebuilt.
+Rows of --day-file are laid over the index for this run only and are not
+saved to it; they reach indiafinal.py, anomalies.py and forecast.py once
+they are cleaned into the part files.
+
+Usage:
+  python border_monitor.py [--day-file new_rows.csv --dataset Biometric] [--reset]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from border_districts import FALLBACK_BORDER_DISTRICTS, border_districts_or_fallback
+from date_index import update_date_indexes
+from district_geometry import canonical_district
+from metrics import DATA_DIR, DATASETS, METRIC_COLUMNS, SCRIPT_DIR
+
+EWMA_HALFLIFE_DAYS = 14
+WARMUP_DAYS = 14          # no alerts until a district has this much history
+ALERT_Z = 3.0
+ALERT_MIN_COUNT = 20      # ignore surges smaller than this many records
+ALERT_FILE = os.path.join(SCRIPT_DIR, "border_alerts.csv")
+
+
+class EwmaState:
+    """
+    Exponentially weighted mean and variance per (district, metric).
+
+    Arrays are (districts x metrics); districts seen for the first time are
+    appended with zero history.
+    """
+
+    def __init__(self, keys=(), metrics=METRIC_COLUMNS, halflife=EWMA_HALFLIFE_DAYS):
+        self.metrics = list(metrics)
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.keys = pd.Index(keys, dtype=object)
+        self.mean = np.zeros((len(self.keys), len(self.metrics)))
+        self.var = np.zeros((len(self.keys), len(self.metrics)))
+        self.days = np.zeros(len(self.keys), dtype=np.int64)
+        self.last_date = None
+
+    def _align(self, keys):
+        new = pd.Index(keys).difference(self.keys)
+        if len(new):
+            pad = np.zeros((len(new), len(self.metrics)))
+            self.keys = self.keys.append(new)
+            self.mean = np.vstack([self.mean, pad])
+            self.var = np.vstack([self.var, pad])
+            self.days = np.r_[self.days, np.zeros(len(new), dtype=np.int64)]
+
+    def update(self, date, day_totals):
+        """
+        Fold one day into the statistics.
+
+        day_totals : pd.DataFrame indexed by district key with the metric
+                     columns; districts missing from it count as zero
+
+        Returns:
+        --------
+        (x, z): that day's values and z-scores against the prior statistics,
+        both arrays aligned to self.keys
+        """
+        self._align(day_totals.index)
+        x = day_totals.reindex(self.keys, fill_value=0)[self.metrics].to_numpy(dtype=float)
+
+        std = np.sqrt(self.var + self.mean + 1)  # plus a Poisson term so sparse series stay quiet
+        z = (x - self.mean) / std
+        z[self.days < WARMUP_DAYS] = np.nan
+
+        diff = x - self.mean
+        first = self.days == 0
+        self.mean += self.alpha * diff
+        self.var = (1 - self.alpha) * (self.var + self.alpha * diff ** 2)
+        self.mean[first] = x[first]
+        self.var[first] = 0
+        self.days += 1
+        self.last_date = pd.Timestamp(date)
+        return x, z
+
+    def save(self, path):
+        np.savez(path, keys=np.asarray(self.keys, dtype=str), metrics=np.asarray(self.metrics),
+                 mean=self.mean, var=self.var, days=self.days, alpha=self.alpha,
+                 last_date=str(self.last_date.date()) if self.last_date is not None else '')
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            state = cls(data['keys'], [str(m) for m in data['metrics']])
+            state.alpha = float(data['alpha'])
+            state.mean, state.var, state.days = data['mean'], data['var'], data['days']
+            last = str(data['last_date'])
+            state.last_date = pd.Timestamp(last) if last else None
+        return state
+
+
+def _state_path(dataset_name, data_dir):
+    return os.path.join(data_dir, f"{DATASETS[dataset_name]}_border_monitor.npz")
+
+
+def border_mask(keys, border_geo):
+    """Boolean mask of 'State|District' keys that are border districts."""
+    keys = pd.Index(keys)
+    if border_geo is not None:
+        return keys.isin(set(border_geo['district_key']))
+    fallback = {canonical_district(d) for d in FALLBACK_BORDER_DISTRICTS}
+    return keys.str.split('|', n=1).str[1].isin(fallback)
+
+
+def new_days_from_index(dataset_name, after=None, data_dir=DATA_DIR, rows=None):
+    """
+    Yield (date, per-district totals) for indexed days after a date.
+
+    The district index is brought up to date by appending new days from
+    newer part files to the cached prefix sums rather than rebuilding it;
+    `rows` are overlaid for this call only. Only the days after `after`
+    are differenced.
+    """
+    indexes = update_date_indexes(dataset_name, rows, data_dir)
+    if indexes is None:
+        return
+    index = indexes['district']
+    first = 0 if after is None else int(np.clip((after - index.start_date).days + 1, 0, index.n_days))
+    daily = np.diff(index.cumsum[:, first:], axis=1)
+    for d, date in enumerate(index.dates[first:]):
+        yield date, pd.DataFrame(daily[:, d], index=index.keys, columns=index.metrics)
+
+
+def run_monitor(dataset_name, days=None, data_dir=DATA_DIR, buffer_km=50,
+                threshold=ALERT_Z, reset=False, rows=None):
+    """
+    Advance a dataset's monitor over new days and return the alerts raised.
+
+    days : iterable of (date, totals) - defaults to new days in the date index
+    rows : pd.DataFrame - newly cleaned rows overlaid on the date index (not saved)
+
+    Returns:
+    --------
+    pd.DataFrame with columns: dataset, date, state, district, metric, value,
+    expected, z
+    """
+    path = _state_path(dataset_name, data_dir)
+    state = EwmaState() if reset or not os.path.exists(path) else EwmaState.load(path)
+    if days is None:
+        days = new_days_from_index(dataset_name, state.last_date, data_dir, rows)
+
+    alerts = []
+    n_days = 0
+    is_border = None
+    border_geo = border_districts_or_fallback(buffer_km)  # warns once if the geometry is missing
+    for date, totals in days:
+        if state.last_date is not None and date <= state.last_date:
+            continue  # already folded in
+        expected = state.mean.copy()
+        known = len(state.keys)
+        x, z = state.update(date, totals)
+        expected = np.vstack([expected, np.zeros((len(state.keys) - known, len(state.metrics)))])
+        if is_border is None or len(is_border) != len(state.keys):
+            is_border = border_mask(state.keys, border_geo)
+
+        hit = (np.nan_to_num(z, nan=-np.inf) >= threshold) & (x >= ALERT_MIN_COUNT)
+        hit &= is_border[:, None]
+        hit_rows, hit_cols = np.nonzero(hit)
+        for r, c in zip(hit_rows, hit_cols):
+            st, district = state.keys[r].split('|', 1)
+            alerts.append((dataset_name, date.date(), st, district, state.metrics[c],
+                           x[r, c], round(expected[r, c], 1), round(z[r, c], 2)))
+        n_days += 1
+
+    if n_days:
+        state.save(path)
+    through = f"{state.last_date:%Y-%m-%d}" if state.last_date is not None else 'no data'
+    print(f"  - {dataset_name}: {n_days} new day(s), {len(alerts)} alert(s), "
+          f"{len(state.keys)} districts tracked (through {through})")
+    columns = ['dataset', 'date', 'state', 'district', 'metric', 'value', 'expected', 'z']
+    return pd.DataFrame(alerts, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental border-district surge alerts")
+    parser.add_argument('--dataset', choices=list(DATASETS), help="Only this dataset")
+    parser.add_argument('--day-file', help="Cleaned rows for the new day(s), used for this run only and "
+                                           "not saved to the shared date index (requires --dataset)")
+    parser.add_argument('--threshold', type=float, default=ALERT_Z)
+    parser.add_argument('--buffer-km', type=float, default=50)
+    parser.add_argument('--reset', action='store_true', help="Discard saved statistics and replay")
+    args = parser.parse_args()
+    if args.day_file and not args.dataset:
+        parser.error("--day-file requires --dataset")
+
+    print("Updating border surge monitor...")
+    frames = []
+    for name in [args.dataset] if args.dataset else DATASETS:
+        rows = pd.read_csv(args.day_file) if args.day_file else None
+        frames.append(run_monitor(name, buffer_km=args.buffer_km, threshold=args.threshold,
+                                  reset=args.reset, rows=rows))
+    alerts = pd.concat(frames, ignore_index=True)
+
+    print(f"\n{'='*60}")
+    print(f"BORDER SURGE ALERTS (z >= {args.threshold:g})")
+    print('='*60)
+    if alerts.empty:
+        print("  No alerts.")
+        return
+    print(alerts.sort_values('z', ascending=False).head(30).to_string(index=False))
+    alerts.to_csv(ALERT_FILE, mode='a', header=not os.path.exists(ALERT_FILE), index=False)
+    print(f"\n[OK] {len(alerts)} alerts appended to: {ALERT_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,14 @@ import pandas as pd
 import plotly.graph_objects as go
 import glob
 import os
+import sys
+
+from border_districts import FALLBACK_BORDER_DISTRICTS, border_districts_or_fallback
+from district_geometry import canonical_district
+from hotspots import HOTSPOT_TOP_K, hotspot_tooltips, save_hotspots, top_k_from_sketch, top_k_hotspots
+from map_export import export_all_views, write_sharded_html
+from metrics import metric_view
+from sketches import SketchStore
 
 # --- 1. ROBUST DATA LOADING ---
 print("Initializing Border Radar System...")
@@ -18,17 +26,17 @@ def load_dataset(pattern, name):
         return None
     print(f"  - Loading {name} ({len(files)} files)...")
     dfs = [pd.read_csv(f) for f in files]
-    df = pd.concat(dfs, ignore_index=True)
-    df['Dataset_Type'] = name
-    return df
-
-# Load All Datasets
-df_enrol = load_dataset("enrolment_cleaned_part*.csv", "Enrolment")
-df_bio = load_dataset("biometric_cleaned_part*.csv", "Biometric")
-df_demo = load_dataset("demographic_cleaned_part*.csv", "Demographic")
+    return pd.concat(dfs, ignore_index=True)
 
-valid_dfs = [d for d in [df_enrol, df_bio, df_demo] if d is not None]
-if not valid_dfs:
+# All Datasets (each is loaded inside the processing loop, one at a time)
+DATASET_FILES = [
+    ("Enrolment", "enrolment_cleaned_part*.csv"),
+    ("Biometric", "biometric_cleaned_part*.csv"),
+    ("Demographic", "demographic_cleaned_part*.csv"),
+]
+DATASET_FILES = [(name, pattern) for name, pattern in DATASET_FILES
+                 if glob.glob(os.path.join(DATA_DIR, pattern))]
+if not DATASET_FILES:
     raise FileNotFoundError("Critical Error: No Data Found!")
 
 # --- 2. CONFIGURATION & MAPPINGS ---
@@ -39,12 +47,6 @@ METRICS_CONFIG = [
     ('norm_18_plus', 'Age 18+', 'Oranges')
 ]
 
-COLUMN_MAPS = {
-    'Enrolment': {'total': 'total_enrolment', '0-5': 'age_0_5', '5-17': 'age_5_17', '18+': 'age_18_greater'},
-    'Biometric': {'total': 'total_updates', '0-5': None, '5-17': 'bio_age_5_17', '18+': 'bio_age_17_'},
-    'Demographic': {'total': 'total_updates', '0-5': None, '5-17': 'demo_age_5_17', '18+': 'demo_age_17_'}
-}
-
 STATE_NAME_MAPPING = {
     'Andaman and Nicobar Islands': 'Andaman & Nicobar',
     'Dadra and Nagar Haveli and Daman and Diu': 'Dadra and Nagar Haveli and Daman and Diu',
@@ -53,29 +55,18 @@ STATE_NAME_MAPPING = {
     'Uttarakhand': 'Uttarakhand',
     'Ladakh': 'Ladakh',
     'Delhi': 'Delhi',
-    'Telangana': 'Telangana',
-    'INVALID': 'INVALID_EXCLUDE'
+    'Telangana': 'Telangana'
 }
 
-# Border Districts Filter
-border_districts_list = [
-    'Kachchh', 'Kutch', 'Banas Kantha', 'Banaskantha', 'Barmer', 'Jaisalmer', 'Bikaner', 'Ganganagar', 
-    'Fazilka', 'Firozpur', 'Ferozepur', 'Tarn Taran', 'Amritsar', 'Gurdaspur', 'Pathankot',
-    'Kathua', 'Samba', 'Jammu', 'Rajouri', 'Poonch', 'Baramulla', 'Kupwara', 'Bandipore', 'Kargil', 'Leh', 'Ladakh',
-    'Lahaul And Spiti', 'Kinnaur', 'Uttarkashi', 'Chamoli', 'Pithoragarh', 'Champawat', 'Udham Singh Nagar',
-    'Pilibhit', 'Lakhimpur Kheri', 'Bahraich', 'Shrawasti', 'Balrampur', 'Siddharthnagar', 'Maharajganj',
-    'West Champaran', 'East Champaran', 'Sitamarhi', 'Madhubani', 'Supaul', 'Araria', 'Kishanganj',
-    'Darjeeling', 'Jalpaiguri', 'Cooch Behar', 'Alipurduar', 'Uttar Dinajpur', 'Dakshin Dinajpur', 
-    'Maldah', 'Murshidabad', 'Nadia', 'North 24 Parganas', 'South 24 Parganas',
-    'North Sikkim', 'East Sikkim', 'West Sikkim', 'South Sikkim', 'Sikkim',
-    'Dhubri', 'Kokrajhar', 'Chirang', 'Baksa', 'Udalguri', 'Cachar', 'Karimganj', 'Hailakandi',
-    'West Garo Hills', 'South Garo Hills', 'East Khasi Hills', 'West Jaintia Hills',
-    'West Tripura', 'Khowai', 'Sepahijala', 'South Tripura', 'Dhalai', 'Unakoti', 'North Tripura',
-    'Mamit', 'Lunglei', 'Lawngtlai', 'Saiha', 'Champhai', 'Serchhip',
-    'Churachandpur', 'Chandel', 'Tengnoupal', 'Kamjong', 'Ukhrul',
-    'Mon', 'Tuensang', 'Kiphire', 'Phek', 'Noklak',
-    'Tawang', 'West Kameng', 'Upper Subansiri', 'West Siang', 'Upper Siang', 'Anjaw', 'Changlang', 'Tirap', 'Longding'
-]
+# Border Districts: derived from district geometry (districts within
+# BORDER_BUFFER_KM of the international boundary, python borderenroll2.py --buffer-km 80).
+# The hand-typed list (border_districts.py) is only used when the geometry is not vendored.
+BORDER_BUFFER_KM = float(sys.argv[sys.argv.index('--buffer-km') + 1]) if '--buffer-km' in sys.argv else 50
+border_geo = border_districts_or_fallback(BORDER_BUFFER_KM)
+if border_geo is not None:
+    print(f"  - Border districts from geometry: {len(border_geo)} within {BORDER_BUFFER_KM:g} km")
+
+border_districts_list = FALLBACK_BORDER_DISTRICTS
 border_list_norm = [x.title() for x in border_districts_list]
 
 state_coords = {
@@ -89,33 +80,60 @@ state_coords = {
 
 # --- 3. PROCESSING & CACHING ---
 DATA_CACHE = {}
+
+# Top-K hotspot tables per dataset (also written as CSV/JSON side output)
+HOTSPOT_TABLES = {}
+USE_SKETCH_HOTSPOTS = '--sketch-hotspots' in sys.argv
+if border_geo is not None:
+    # Bubble per state at the mean centroid of its border districts
+    border_keys = set(border_geo['district_key'])
+    geo_state_centroids = border_geo.assign(
+        state_mapped=border_geo['state'].replace(STATE_NAME_MAPPING)
+    ).groupby('state_mapped')[['lat', 'lon']].mean()
+    state_coords = {s: (r['lat'], r['lon']) for s, r in geo_state_centroids.iterrows()}
+
 ALL_BORDER_STATES = sorted(list(state_coords.keys()))
 
-for df_raw in valid_dfs:
-    dtype = df_raw['Dataset_Type'].iloc[0]
-    mapping = COLUMN_MAPS[dtype]
+for dtype, pattern in DATASET_FILES:
     DATA_CACHE[dtype] = {}
     
-    # Pre-process
-    df = df_raw.copy()
-    df = df[df['state'] != '100000']
+    # Pre-process: key columns + norm_* metrics (metrics.COLUMN_MAPS) as a
+    # projection sharing the loaded columns; the raw frame is not kept
+    df = metric_view(load_dataset(pattern, dtype), dtype)
     
-    # Normalize Columns
-    if dtype == 'Enrolment':
-        df['norm_total'] = df['age_0_5'] + df['age_5_17'] + df['age_18_greater']
+    # Filter for Border (join on canonical 'State|District' keys before renaming states)
+    if border_geo is not None:
+        df['district_key'] = df['state'] + '|' + df['district'].map(canonical_district)
+        border_mask = df['district_key'].isin(border_keys)
     else:
-        total_col = mapping['total']
-        df['norm_total'] = df[total_col] if total_col in df.columns else (df[mapping['5-17']] + df[mapping['18+']])
-        
-    df['norm_5_17'] = df[mapping['5-17']]
-    df['norm_18_plus'] = df[mapping['18+']]
-    df['norm_0_5'] = df[mapping['0-5']] if mapping['0-5'] else 0
-    
-    df['state'] = df['state'].replace(STATE_NAME_MAPPING)
+        df['district_norm'] = df['district'].astype(str).str.title()
+        border_mask = df['district_norm'].isin(border_list_norm)
+
+    border_df = df[border_mask]  # boolean selection is already a new frame
+    del df
     
-    # Filter for Border
-    df['district_norm'] = df['district'].astype(str).str.title()
-    border_df = df[df['district_norm'].isin(border_list_norm)].copy()
+    # Top-K Hotspots (border districts): one aggregation + vectorised per-state top-K.
+    # --sketch-hotspots answers the pincode list from the streaming sketches instead.
+    metric_cols = [m[0] for m in METRICS_CONFIG]
+    sketch_store = None
+    if USE_SKETCH_HOTSPOTS:
+        try:
+            sketch_store = SketchStore.load(os.path.join(DATA_DIR, f"{dtype.lower()}_cleaned"))
+        except FileNotFoundError:
+            print(f"  [INFO] No sketches for {dtype}; computing exact hotspots")
+    if sketch_store is not None:
+        # Sketch keys carry the cleaned state names, so query before renaming states;
+        # states the sketch cannot vouch for are answered exactly from border_df
+        border_pairs = set(border_df[['state', 'district']].drop_duplicates().astype(str)
+                           .itertuples(index=False, name=None))
+        pin_top = top_k_from_sketch(sketch_store, metric_cols, HOTSPOT_TOP_K,
+                                    district_filter=border_pairs, exact_rows=border_df)
+        pin_top['state'] = pin_top['state'].replace(STATE_NAME_MAPPING)
+    border_df['state'] = border_df['state'].replace(STATE_NAME_MAPPING)
+    if sketch_store is None:
+        pin_top = top_k_hotspots(border_df, 'state', metric_cols, HOTSPOT_TOP_K, level='pincode')
+    dist_top = top_k_hotspots(border_df, 'state', metric_cols, HOTSPOT_TOP_K, level='district')
+    HOTSPOT_TABLES[dtype] = {'pincode': pin_top, 'district': dist_top}
     
     # Calculate Metrics per State
     for m_col, label, _ in METRICS_CONFIG:
@@ -124,14 +142,10 @@ for df_raw in valid_dfs:
         # Align to ALL_BORDER_STATES
         node_agg = node_agg.set_index('state').reindex(ALL_BORDER_STATES, fill_value=0).reset_index()
         
-        # Hotspots
-        hotspot_agg = border_df.groupby(['state', 'district', 'pincode'])[m_col].sum().reset_index()
-        # Get top hotspot per state
-        if not hotspot_agg.empty:
-            idx = hotspot_agg.groupby('state')[m_col].idxmax()
-            top_hotspots = hotspot_agg.loc[idx].set_index('state')
-        else:
-            top_hotspots = pd.DataFrame()
+        # Hotspots: rank-1 pincode + Top-K tooltip lists
+        top_hotspots = pin_top[(pin_top['metric'] == m_col) & (pin_top['rank'] == 1)].set_index('state')
+        top_pins = hotspot_tooltips(pin_top, m_col, 'pincode')
+        top_districts = hotspot_tooltips(dist_top, m_col, 'district')
             
         # Build Arrays for Plotly
         lat_arr = []
@@ -156,7 +170,7 @@ for df_raw in valid_dfs:
                 hs = top_hotspots.loc[state]
                 hs_pincode = hs['pincode']
                 hs_dist = hs['district']
-                hs_val = hs[m_col]
+                hs_val = hs['value']
             else:
                 hs_pincode, hs_dist, hs_val = "N/A", "N/A", 0
                 
@@ -165,7 +179,8 @@ for df_raw in valid_dfs:
             color_arr.append(val)
             size_arr.append((val / max_val * 50) + 15)
             text_arr.append(state)
-            customdata_arr.append([hs_pincode, hs_dist, hs_val, val])
+            customdata_arr.append([hs_pincode, hs_dist, hs_val, val,
+                                   top_pins.get(state, 'N/A'), top_districts.get(state, 'N/A')])
             
         DATA_CACHE[dtype][m_col] = {
             'lat': lat_arr, 'lon': lon_arr, 
@@ -173,6 +188,8 @@ for df_raw in valid_dfs:
             'customdata': customdata_arr, 'text': text_arr
         }
 
+save_hotspots(HOTSPOT_TABLES, os.path.join(SCRIPT_DIR, "border_radar_hotspots"))
+
 # --- 4. VISUALIZATION ---
 fig = go.Figure()
 
@@ -226,7 +243,9 @@ for i, (m_col, label, color_scale) in enumerate(METRICS_CONFIG):
             '<br><b>📍 Hotspot Zone:</b><br>' +
             'District: %{customdata[1]}<br>' +
             'Pincode: %{customdata[0]}<br>' +
-            'Volume: %{customdata[2]:,.0f}' +
+            'Volume: %{customdata[2]:,.0f}<br>' +
+            f'<br><b>Top {HOTSPOT_TOP_K} Pincodes:</b><br>' + '%{customdata[4]}<br>' +
+            f'<br><b>Top {HOTSPOT_TOP_K} Districts:</b><br>' + '%{customdata[5]}' +
             '<extra></extra>'
         ),
         visible=(i == 0),
@@ -346,10 +365,19 @@ html_path = os.path.join(SCRIPT_DIR, "border_radar_visualization.html")
 try:
     fig.write_image(output_path, scale=2, width=1600, height=1200)
     print(f"[OK] Image saved: {output_path}")
-except Exception:
-    pass
+except Exception as e:
+    print(f"[INFO] Image export skipped ({type(e).__name__}: {e})")
+
+# Batch export: every Dataset x Metric view to PNG/SVG (python borderenroll2.py --batch-export)
+if '--batch-export' in sys.argv:
+    export_all_views(fig, os.path.join(SCRIPT_DIR, "map_exports"), "border_radar")
 
-fig.write_html(html_path, config={'responsive': True, 'displayModeBar': False})
+html_config = {'responsive': True, 'displayModeBar': False}
+if '--sharded-html' in sys.argv:
+    # Initial view inline, other Dataset x Metric payloads fetched on demand (serve over HTTP)
+    write_sharded_html(fig, html_path, config=html_config)
+else:
+    fig.write_html(html_path, config=html_config)
 print(f"[OK] Interactive HTML saved: {html_path}")
 
 fig.show(config={'responsive': True})
\ No newline at end of file
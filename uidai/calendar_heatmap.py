@@ -0,0 +1,157 @@
+"""
+State x Day Calendar Heatmaps
+=============================
+Weekly and seasonal patterns per state, which the national daily lines hide.
+- Dense state x day matrix per dataset and metric, taken from the cached
+  prefix-sum date index (built once with one bincount, one np.diff away)
+- 'day' view: states x days, one image for the whole date span
+- 'calendar' view: one weekday x week grid per state, tiled into a single
+  image (one imshow instead of one axes per state)
+- Colours are scaled per state (share of the state's peak day) by default,
+  so small states show their own pattern; --scale log compares levels
+
+Usage:
+  python calendar_heatmap.py [--dataset Enrolment] [--metric norm_total] [--view calendar]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from date_index import load_date_index
+from metrics import DATA_DIR, DATASETS, METRIC_COLUMNS, SCRIPT_DIR
+
+VIEWS = ('day', 'calendar')
+SCALES = ('state', 'log')
+METRIC_LABELS = dict(zip(METRIC_COLUMNS, ['Total Activity', 'Age 0-5', 'Age 5-17', 'Age 18+']))
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+CALENDAR_COLUMNS = 4  # states per row in the calendar view
+
+
+def state_day_matrix(dataset_name, metric='norm_total', data_dir=DATA_DIR):
+    """
+    Daily values for every state of a dataset, busiest state first.
+
+    Returns:
+    --------
+    pd.DataFrame (states x dates), or None if the dataset has no cleaned data
+    """
+    index = load_date_index(dataset_name, 'state', data_dir)
+    if index is None:
+        return None
+    m = index.metrics.index(metric)
+    daily = np.diff(index.cumsum[:, :, m], axis=1)
+    order = np.argsort(-daily.sum(axis=1), kind='stable')
+    return pd.DataFrame(daily[order], index=index.keys[order], columns=index.dates)
+
+
+def scale_matrix(values, scale='state'):
+    """Colour values: share of each row's maximum ('state') or log10(1 + x) ('log')."""
+    if scale == 'log':
+        return np.log10(1 + np.clip(values, 0, None))
+    peak = values.max(axis=1, keepdims=True)
+    return np.divide(values, peak, out=np.zeros_like(values, dtype=float), where=peak > 0)
+
+
+def calendar_grid(dates, values):
+    """
+    Arrange (rows x days) values on a weekday x week calendar.
+
+    Returns:
+    --------
+    (weeks, grid): Monday of each week, array (rows x 7 x weeks) with NaN
+    outside the date span
+    """
+    offset = dates[0].dayofweek  # pad the first week back to Monday
+    n_weeks = (offset + len(dates) + 6) // 7
+    grid = np.full((values.shape[0], n_weeks * 7), np.nan)
+    grid[:, offset:offset + len(dates)] = values
+    weeks = pd.date_range(dates[0] - pd.Timedelta(days=offset), periods=n_weeks, freq='7D')
+    return weeks, grid.reshape(values.shape[0], n_weeks, 7).transpose(0, 2, 1)
+
+
+def plot_calendar_heatmap(dataset_name, metric='norm_total', view='day', scale='state',
+                          data_dir=DATA_DIR, output_file=None):
+    """Draw one dataset/metric as a state x day image or per-state calendars."""
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    matrix = state_day_matrix(dataset_name, metric, data_dir)
+    if matrix is None:
+        print(f"No cleaned data for {dataset_name}.")
+        return None
+    values = scale_matrix(matrix.to_numpy(), scale)
+    dates = matrix.columns
+    cmap = 'YlOrRd'
+    color_label = 'Share of state peak day' if scale == 'state' else 'log10(1 + count)'
+    title = f"{dataset_name}: {METRIC_LABELS.get(metric, metric)} by State and Day"
+
+    if view == 'day':
+        fig, ax = plt.subplots(figsize=(16, max(6, 0.28 * len(matrix))))
+        start, end = mdates.date2num(dates[0]), mdates.date2num(dates[-1] + pd.Timedelta(days=1))
+        im = ax.imshow(values, aspect='auto', cmap=cmap, interpolation='nearest', vmin=0,
+                       extent=(start, end, len(matrix), 0))
+        ax.set_yticks(np.arange(len(matrix)) + 0.5)
+        ax.set_yticklabels(matrix.index, fontsize=8)
+        ax.xaxis_date()
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%b %Y"))
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        fig.colorbar(im, ax=ax, label=color_label, fraction=0.02, pad=0.01)
+    else:
+        weeks, grid = calendar_grid(dates, values)
+        n_cols = CALENDAR_COLUMNS
+        n_rows = int(np.ceil(len(matrix) / n_cols))
+        cell_h, cell_w = 7 + 2, len(weeks) + 3  # calendar plus a blank gutter (title row / gap)
+
+        # Tile every state's calendar into one NaN-padded mosaic
+        mosaic = np.full((n_rows * cell_h, n_cols * cell_w), np.nan)
+        for i, cal in enumerate(grid):
+            r, c = divmod(i, n_cols)
+            mosaic[r * cell_h + 2:r * cell_h + 9, c * cell_w:c * cell_w + len(weeks)] = cal
+
+        fig, ax = plt.subplots(figsize=(4 * n_cols, 1.3 * n_rows + 1))
+        im = ax.imshow(mosaic, aspect='auto', cmap=cmap, interpolation='nearest', vmin=0)
+        for i, state in enumerate(matrix.index):
+            r, c = divmod(i, n_cols)
+            ax.text(c * cell_w, r * cell_h + 1, state, fontsize=8, va='center')
+        ax.set_yticks(np.arange(2, 9))
+        ax.set_yticklabels(WEEKDAYS, fontsize=6)
+        ticks = np.arange(0, len(weeks), max(len(weeks) // 4, 1))
+        ax.set_xticks(ticks)
+        ax.set_xticklabels([f"{w:%d %b %y}" for w in weeks[ticks]], fontsize=7)
+        ax.grid(False)
+        fig.colorbar(im, ax=ax, label=color_label, fraction=0.02, pad=0.01)
+
+    fig.suptitle(title, fontsize=14, fontweight='bold')
+    if output_file:
+        fig.savefig(output_file, dpi=120, bbox_inches='tight')
+        print(f"[OK] Calendar heatmap saved: {output_file}")
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="State x day calendar heatmaps")
+    parser.add_argument('--dataset', choices=list(DATASETS), default='Enrolment')
+    parser.add_argument('--metric', choices=METRIC_COLUMNS, default='norm_total')
+    parser.add_argument('--view', choices=VIEWS, default='day')
+    parser.add_argument('--scale', choices=SCALES, default='state')
+    parser.add_argument('--output', help="Image file (default: calendar_<dataset>_<metric>_<view>.png)")
+    args = parser.parse_args()
+
+    import matplotlib.pyplot as plt
+
+    output = args.output or os.path.join(
+        SCRIPT_DIR, f"calendar_{args.dataset.lower()}_{args.metric}_{args.view}.png")
+    start = time.perf_counter()
+    fig = plot_calendar_heatmap(args.dataset, args.metric, args.view, args.scale, output_file=output)
+    print(f"[OK] Rendered in {time.perf_counter() - start:.2f}s")
+    if fig is not None:
+        plt.show()
+
+
+if __name__ == '__main__':
+    main()
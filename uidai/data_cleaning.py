@@ -2,17 +2,24 @@
 Professional Data Cleaning Script for Aadhaar Datasets
 ======================================================
 Cleans three datasets: Biometric, Demographic, Enrolment
-- State name standardization (66 → 36 official names)
+- State name standardization (66 → 36 official names), with a raw -> official
+  lineage table instead of a per-row original column
 - Duplicate removal
 - Date format standardization
 - Data validation
 """
 
 import pandas as pd
+import numpy as np
 import glob
+import json
 import os
+import re
+import sys
 from datetime import datetime
 
+from sketches import build_sketches
+
 # ============================================================================
 # STATE NAME STANDARDIZATION MAPPING
 # ============================================================================
@@ -226,7 +233,313 @@ def split_and_save(df, output_base, max_rows=EXCEL_MAX_ROWS):
     return files_info
 
 
-def clean_dataset(input_dir, output_base, dataset_name):
+# Stratified preview sample (state x month) for fast exploratory runs
+PREVIEW_FRACTION = 0.02
+PREVIEW_MIN_PER_STRATUM = 30
+
+
+def build_preview_sample(df, output_base, frac=PREVIEW_FRACTION,
+                         min_per_stratum=PREVIEW_MIN_PER_STRATUM, seed=42):
+    """
+    Draw a stratified random sample (state x month) and save it with weights.
+    
+    Each stratum keeps max(min_per_stratum, frac * N_h) rows (all rows if the
+    stratum is smaller). 'sample_weight' = N_h / n_h scales sampled counts
+    back up to population totals; 'stratum_rows' (N_h) is kept so scripts
+    can compute standard errors of the scaled totals.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame - Cleaned dataset
+    output_base : str - Base path of the cleaned output (sample goes to <base>_preview.csv)
+    frac : float - Sampling fraction per stratum
+    min_per_stratum : int - Minimum sampled rows per stratum
+    
+    Returns:
+    --------
+    dict with 'file', 'rows', 'strata'
+    """
+    strata = [df['state'], df['date'].str[:7].fillna('NaT')]
+    grouped = df.groupby(strata, sort=False, dropna=False)
+    stratum_rows = grouped['state'].transform('size').to_numpy()
+    target = np.minimum(stratum_rows, np.maximum(min_per_stratum, np.ceil(frac * stratum_rows)))
+    
+    # Random rank within each stratum; keep the first n_h rows
+    rng = np.random.default_rng(seed)
+    random_key = pd.Series(rng.random(len(df)), index=df.index)
+    rank = random_key.groupby(strata, sort=False, dropna=False).rank(method='first').to_numpy()
+    keep = rank <= target
+    
+    sample = df.loc[keep].copy()
+    sample['stratum_rows'] = stratum_rows[keep]
+    sample['sample_weight'] = stratum_rows[keep] / target[keep]
+    
+    output_file = f"{output_base}_preview.csv"
+    sample.to_csv(output_file, index=False)
+    n_strata = grouped.ngroups
+    print(f"Preview sample: {len(sample):,} rows from {n_strata:,} strata -> {os.path.basename(output_file)}")
+    return {'file': output_file, 'rows': len(sample), 'strata': n_strata}
+
+
+# ============================================================================
+# DATA-QUALITY RULES (QUARANTINE)
+# ============================================================================
+DATE_MIN = '2010-01-01'   # Aadhaar enrolment began in 2010
+COUNT_CAP = 50000         # per pincode per day; anything above is a data error
+PINCODE_PATTERN = r'^[1-9][0-9]{5}$'
+
+# (rule name, description, check) - check returns True for rows that pass
+QUALITY_RULES = [
+    ('state_valid', "state maps to an official state/UT",
+     lambda df, counts: (df['state'] != 'INVALID').to_numpy()),
+    ('date_parsed', "date parsed as DD-MM-YYYY",
+     lambda df, counts: df['date'].notna().to_numpy()),
+    ('date_in_range', f"date between {DATE_MIN} and today",
+     lambda df, counts: (df['date'].isna() | df['date'].between(
+         DATE_MIN, datetime.now().strftime('%Y-%m-%d'))).to_numpy()),
+    ('counts_non_negative', "all counts present and >= 0",
+     lambda df, counts: (counts >= 0).all(axis=1)),
+    ('counts_below_cap', f"all counts <= {COUNT_CAP:,}",
+     lambda df, counts: ~(counts > COUNT_CAP).any(axis=1)),
+    ('pincode_valid', "6-digit pincode not starting with 0",
+     lambda df, counts: df['pincode'].str.match(PINCODE_PATTERN).fillna(False).to_numpy(dtype=bool)),
+]
+
+
+def evaluate_quality_rules(df):
+    """Evaluate every quality rule at once: (rows x rules) boolean matrix, True = passed."""
+    count_cols = [c for c in df.columns if c.startswith(('age_', 'bio_age_', 'demo_age_'))]
+    counts = df[count_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return np.column_stack([check(df, counts) for _, _, check in QUALITY_RULES])
+
+
+def apply_quality_rules(df, output_base, raw_columns=None, passed=None):
+    """
+    Evaluate every quality rule in one pass and move failing rows to quarantine.
+    
+    The rule checks fill one (rows x rules) boolean matrix; a row is kept
+    only if it passes every rule. Failing rows are written to
+    <base>_quarantine.csv with a 'failed_rules' column ('|'-separated rule
+    names) and their raw, pre-standardization values.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame - Standardized rows
+    output_base : str - Base path of the cleaned output
+    raw_columns : dict - Output column name -> raw values before standardization
+                  (Series aligned to df), e.g. {'date_raw': ..., 'state_raw': ...}
+    passed : np.ndarray - Precomputed evaluate_quality_rules(df) result (optional)
+    
+    Returns:
+    --------
+    (pd.DataFrame of passing rows, dict: rule name -> failing row count)
+    """
+    if passed is None:
+        passed = evaluate_quality_rules(df)
+    keep = passed.all(axis=1)
+    failures = {name: int((~passed[:, i]).sum()) for i, (name, _, _) in enumerate(QUALITY_RULES)}
+    
+    quarantine = df.loc[~keep].copy()
+    if len(quarantine):
+        failed = ~passed[~keep]
+        names = np.array([name for name, _, _ in QUALITY_RULES], dtype=object)
+        quarantine.insert(0, 'failed_rules', ['|'.join(names[row]) for row in failed])
+        for i, (column, raw) in enumerate((raw_columns or {}).items()):
+            quarantine.insert(1 + i, column, raw[~keep].to_numpy())
+    quarantine.drop(columns='_source', errors='ignore').to_csv(f"{output_base}_quarantine.csv", index=False)
+    
+    print(f"Quarantined rows: {len(quarantine):,} -> {os.path.basename(output_base)}_quarantine.csv")
+    for name, n_failed in failures.items():
+        if n_failed:
+            print(f"  - {name}: {n_failed:,}")
+    return df.loc[keep], failures
+
+
+# Natural key of a cleaned row; later API dumps may restate the counts for a key
+KEY_COLUMNS = ['date', 'state', 'district', 'pincode']
+CONFLICT_POLICIES = ('latest', 'max', 'flag')
+CONFLICT_POLICY = 'latest'
+# Written by ingest.py next to the raw files; its run order is the dump order
+INGEST_MANIFEST = 'ingest_manifest.json'
+
+
+def resolve_key_conflicts(df, output_base, policy=CONFLICT_POLICY, source_names=None):
+    """
+    Collapse rows that restate the same natural key, in one vectorised pass.
+    
+    Rows are indexed by a 64-bit hash of the key columns and a hash of the
+    value columns; one lexsort groups them. A key is restated when its rows
+    come from more than one source file, and conflicting when a restated
+    key holds more than one distinct value hash. Keys repeated within one
+    source file only (e.g. two raw districts that standardize to the same
+    name) are not restatements: their rows are kept as they are and counted
+    as duplicate keys. Restated keys are resolved by policy:
+      'latest' - the rows from the latest source file of the key win
+      'max'    - one row per key; each count column takes the maximum over
+                 source files of that file's total for the key
+      'flag'   - every distinct version is kept, marked key_conflict=True
+    Restatements with identical values always collapse to one version. All
+    versions of conflicting keys are written to <base>_conflicts.csv.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame - Standardized rows with KEY_COLUMNS and a '_source' column
+    output_base : str - Base path of the cleaned output
+    policy : str - One of CONFLICT_POLICIES
+    source_names : list - Source file names, indexed by '_source'
+    
+    Returns:
+    --------
+    (pd.DataFrame without '_source', dict with conflict statistics)
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy {policy!r}; expected one of {CONFLICT_POLICIES}")
+    
+    df = df.reset_index(drop=True)
+    # ('_row' is the global row order carried by distributed_clean.py partials)
+    value_cols = [c for c in df.columns if c not in KEY_COLUMNS + ['state_original', '_source', '_row']]
+    key_hash = pd.util.hash_pandas_object(df[KEY_COLUMNS], index=False).to_numpy()
+    value_hash = pd.util.hash_pandas_object(df[value_cols], index=False).to_numpy()
+    source = df['_source'].to_numpy()
+    position = np.arange(len(df))
+    
+    # Group by key, then source and position: source files per key, latest file of each key
+    latest = np.lexsort((position, source, key_hash))
+    kl, sl = key_hash[latest], source[latest]
+    key_start = np.r_[True, kl[1:] != kl[:-1]]
+    key_end = np.r_[key_start[1:], True]
+    group = np.cumsum(key_start) - 1
+    sources = np.bincount(group, weights=key_start | np.r_[True, sl[1:] != sl[:-1]]).astype(np.int64)
+    restated = np.empty(len(df), dtype=bool)
+    restated[latest] = sources[group] > 1
+    latest_source = np.empty(len(df), dtype=source.dtype)
+    latest_source[latest] = sl[key_end][group]
+    
+    # Within a key, order versions by value, then source and position
+    order = np.lexsort((position, source, value_hash, key_hash))
+    k, v = key_hash[order], value_hash[order]
+    version_key_start = np.r_[True, k[1:] != k[:-1]]
+    version_start = version_key_start | np.r_[True, v[1:] != v[:-1]]
+    version_group = np.cumsum(version_key_start) - 1
+    versions = np.bincount(version_group, weights=version_start).astype(np.int64)
+    conflict = np.empty(len(df), dtype=bool)
+    conflict[order] = versions[version_group] > 1
+    conflict &= restated
+    
+    if conflict.any():
+        conflicts = df.loc[conflict].copy()
+        if source_names is not None:
+            conflicts['source_file'] = np.asarray(source_names)[conflicts['_source']]
+        conflicts.drop(columns='_source').sort_values(KEY_COLUMNS).to_csv(
+            f"{output_base}_conflicts.csv", index=False)
+    
+    if policy == 'flag':
+        # Restated keys: one row per distinct version (the latest copy of it)
+        version_end = np.r_[version_start[1:], True]
+        keep = ~restated
+        keep[order[version_end]] = True
+        result = df.loc[keep].assign(key_conflict=conflict[keep])
+    elif policy == 'latest':
+        keep = ~restated | (source == latest_source)
+        result = df.loc[keep]
+    else:
+        # Restated keys: the latest row of the key carries the max of per-file totals
+        keep = ~restated
+        keep[latest[key_end & restated[latest]]] = True
+        if restated.any():
+            count_cols = [c for c in value_cols if pd.api.types.is_numeric_dtype(df[c])]
+            totals = df.loc[restated, count_cols].groupby([key_hash[restated], source[restated]]).sum()
+            maxed = totals.groupby(level=0).max()
+            kept = keep & restated
+            df.loc[kept, count_cols] = maxed.reindex(key_hash[kept]).to_numpy()
+        result = df.loc[keep]
+    
+    group_rows = np.bincount(group)
+    stats = {
+        'conflict_policy': policy,
+        'restated_keys': int((sources > 1).sum()),
+        'conflicting_keys': int(np.unique(key_hash[conflict]).size),
+        'restated_rows_removed': int(len(df) - keep.sum()),
+        'duplicate_keys': int(((group_rows > 1) & (sources == 1)).sum()),
+    }
+    print(f"Restated keys: {stats['restated_keys']:,} "
+          f"({stats['conflicting_keys']:,} conflicting, policy '{policy}', "
+          f"{stats['restated_rows_removed']:,} rows removed); "
+          f"keys repeated within one file: {stats['duplicate_keys']:,} (kept)")
+    return result.drop(columns='_source').reset_index(drop=True), stats
+
+
+def standardize_columns(df, keep_state_original=False):
+    """
+    Standardize state, district, date and pincode columns in place.
+    
+    States are mapped once per distinct raw spelling (factorize + lookup).
+    
+    Returns:
+    --------
+    (raw_states, raw_dates): the values before standardization, aligned to df
+    """
+    raw_states = df['state']
+    codes, spellings = pd.factorize(raw_states)
+    canonical = np.array([standardize_state(s) for s in spellings] + ['INVALID'], dtype=object)
+    df['state'] = canonical[codes]  # code -1 (missing) -> 'INVALID'
+    if keep_state_original:
+        df['state_original'] = raw_states
+    
+    # Standardize district names (title case, strip whitespace)
+    df['district'] = df['district'].str.strip().str.title()
+    
+    # Convert date to standard format (YYYY-MM-DD)
+    raw_dates = df['date'].astype(str)
+    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce').dt.strftime('%Y-%m-%d')
+    
+    # Pincode as 6-digit text; via integers, so a float column (any NaN) does not
+    # turn 110001 into '110001.0'. Missing or non-integral values stay missing.
+    pincode = pd.to_numeric(df['pincode'], errors='coerce')
+    pincode = pincode.where(pincode == pincode.round()).astype('Int64')
+    df['pincode'] = pincode.astype(str).where(pincode.notna()).str.zfill(6)
+    return raw_states, raw_dates
+
+
+def state_lineage(raw_states, states):
+    """Raw spelling -> canonical state with row counts (columns: raw_state, state, rows)."""
+    return pd.DataFrame({'raw_state': raw_states, 'state': states}).value_counts(
+        dropna=False).rename('rows').reset_index().sort_values(['state', 'raw_state'], ignore_index=True)
+
+
+def _natural_key(name):
+    """Sort key that compares digit runs as numbers ('x_9.csv' before 'x_10.csv')."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def source_files(input_dir):
+    """
+    Raw CSV files of a dataset, oldest dump first.
+
+    Files not listed in the ingest manifest (hand-downloaded dumps) come
+    first in natural name order, then ingested pages in manifest run order
+    and offset. mtime only breaks ties between names that sort equal, so
+    the numbering (and each row's _row id) is the same on every machine
+    whatever git checkout, cp or rsync did to the timestamps.
+    """
+    manifest_path = os.path.join(input_dir, INGEST_MANIFEST)
+    position = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            runs = json.load(f).get('runs', [])
+        for run_no, run in enumerate(runs):
+            for entry in run.get('files', []):
+                position[entry['file']] = (run_no, entry.get('offset', 0))
+
+    def key(f):
+        name = os.path.basename(f)
+        return (position.get(name, (-1, 0)), _natural_key(name), os.path.getmtime(f))
+
+    return sorted(glob.glob(os.path.join(input_dir, '*.csv')), key=key)
+
+
+def clean_dataset(input_dir, output_base, dataset_name, conflict_policy=CONFLICT_POLICY,
+                  keep_state_original=False):
     """
     Clean a single dataset and split if necessary.
     
@@ -235,6 +548,9 @@ def clean_dataset(input_dir, output_base, dataset_name):
     input_dir : str - Directory containing CSV files
     output_base : str - Base path for cleaned output (without extension)
     dataset_name : str - Name for logging
+    conflict_policy : str - How restated keys are resolved ('latest', 'max', 'flag')
+    keep_state_original : bool - Also keep the raw state per row ('state_original');
+                          the raw -> official lineage table is always returned
     
     Returns:
     --------
@@ -244,13 +560,14 @@ def clean_dataset(input_dir, output_base, dataset_name):
     print(f"Processing: {dataset_name}")
     print('='*60)
     
-    # Load all CSV files
-    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+    # Load all CSV files, oldest dump first (source order decides 'latest' on key conflicts)
+    csv_files = source_files(input_dir)
     print(f"Found {len(csv_files)} CSV files")
     
     dfs = []
-    for f in csv_files:
+    for source, f in enumerate(csv_files):
         df = pd.read_csv(f)
+        df['_source'] = source
         dfs.append(df)
         print(f"  - {os.path.basename(f)}: {len(df):,} rows")
     
@@ -258,28 +575,66 @@ def clean_dataset(input_dir, output_base, dataset_name):
     original_rows = len(df)
     print(f"\nTotal rows loaded: {original_rows:,}")
     
-    # Remove duplicates
-    df_dedup = df.drop_duplicates()
+    # Remove duplicates (exact copies across dumps keep the latest source)
+    df_dedup = df.drop_duplicates(subset=[c for c in df.columns if c != '_source'], keep='last')
     duplicates_removed = original_rows - len(df_dedup)
     print(f"Duplicates removed: {duplicates_removed:,}")
     
-    # Standardize state names
-    df_dedup['state_original'] = df_dedup['state'].copy()
-    df_dedup['state'] = df_dedup['state'].apply(standardize_state)
+    # Standardize state (once per distinct raw spelling), district, date and pincode
+    raw_states, raw_dates = standardize_columns(df_dedup, keep_state_original)
+    
+    # Lineage: raw spelling -> canonical state, with row counts
+    lineage = state_lineage(raw_states, df_dedup['state'])
     
     invalid_count = (df_dedup['state'] == 'INVALID').sum()
     print(f"Invalid state entries: {invalid_count:,}")
     
-    # Standardize district names (title case, strip whitespace)
-    df_dedup['district'] = df_dedup['district'].str.strip().str.title()
+    # Quality rules: failing rows go to the quarantine file, not the cleaned store
+    rows_before_rules = len(df_dedup)
+    df_dedup, rule_failures = apply_quality_rules(
+        df_dedup, output_base, {'date_raw': raw_dates, 'state_raw': raw_states}
+    )
+    quarantined_rows = rows_before_rules - len(df_dedup)
     
-    # Convert date to standard format (YYYY-MM-DD)
-    df_dedup['date'] = pd.to_datetime(df_dedup['date'], format='%d-%m-%Y', errors='coerce')
-    df_dedup['date'] = df_dedup['date'].dt.strftime('%Y-%m-%d')
+    # Keys restated across source files: resolved by policy
+    df_dedup, conflict_stats = resolve_key_conflicts(
+        df_dedup, output_base, conflict_policy, [os.path.basename(f) for f in csv_files]
+    )
+    
+    files_info, preview_info = save_cleaned(df_dedup, output_base, dataset_name)
+    
+    return {
+        'dataset': dataset_name,
+        'original_rows': original_rows,
+        'duplicates_removed': duplicates_removed,
+        'invalid_states': invalid_count,
+        'final_rows': len(df_dedup),
+        'unique_states': df_dedup['state'].nunique(),
+        'files_info': files_info,
+        'preview_rows': preview_info['rows'],
+        **conflict_stats,
+        'quarantined_rows': quarantined_rows,
+        'rule_failures': rule_failures,
+        'state_lineage': lineage,
+    }
+
+
+def save_cleaned(df_dedup, output_base, dataset_name, sketches=None):
+    """
+    Sort the cleaned rows and write part files, preview sample and sketches.
     
-    # Validate pincode (should be 6 digits)
-    df_dedup['pincode'] = df_dedup['pincode'].astype(str).str.zfill(6)
+    Parameters:
+    -----------
+    df_dedup : pd.DataFrame - Final cleaned rows
+    output_base : str - Base path for cleaned output (without extension)
+    dataset_name : str - Dataset name (for the sketches)
+    sketches : SketchStore - Prebuilt sketches of the same rows (e.g. merged
+               from workers); built from the sorted rows when None
     
+    Returns:
+    --------
+    (files_info, preview_info)
+    """
     # ============================================================================
     # SECTION 2.3: LOGICAL SORTING (TIME-SERIES PREPARATION)
     # ============================================================================
@@ -295,27 +650,25 @@ def clean_dataset(input_dir, output_base, dataset_name):
     df_dedup.reset_index(drop=True, inplace=True)
     print(f"Applied time-series sorting (Date→State→District)")
     
-    # Reorder columns (state_original at end for reference)
-    cols = [c for c in df_dedup.columns if c != 'state_original'] + ['state_original']
-    df_dedup = df_dedup[cols]
+    # Reorder columns (optional state_original at end for reference)
+    if 'state_original' in df_dedup.columns:
+        cols = [c for c in df_dedup.columns if c != 'state_original'] + ['state_original']
+        df_dedup = df_dedup[cols]
     
     # Split and save cleaned data
     print(f"\nSaving files (Excel limit: {EXCEL_MAX_ROWS:,} rows)...")
     files_info = split_and_save(df_dedup, output_base)
+    preview_info = build_preview_sample(df_dedup, output_base)
+    
+    # Streaming sketches (hotspots, distinct pincodes/districts) for the map builders
+    if sketches is None:
+        sketches = build_sketches(df_dedup, dataset_name.title())
+    sketches.save(output_base)
     
     print(f"\n[OK] Saved {len(files_info)} file(s)")
     print(f"  Final rows: {len(df_dedup):,}")
     print(f"  Unique states: {df_dedup['state'].nunique()}")
-    
-    return {
-        'dataset': dataset_name,
-        'original_rows': original_rows,
-        'duplicates_removed': duplicates_removed,
-        'invalid_states': invalid_count,
-        'final_rows': len(df_dedup),
-        'unique_states': df_dedup['state'].nunique(),
-        'files_info': files_info,
-    }
+    return files_info, preview_info
 
 
 def generate_report(stats_list, output_file):
@@ -334,18 +687,32 @@ def generate_report(stats_list, output_file):
             f.write(f"  Invalid states:     {stats['invalid_states']:>12,}\n")
             f.write(f"  Final rows:         {stats['final_rows']:>12,}\n")
             f.write(f"  Unique states:      {stats['unique_states']:>12}\n")
+            f.write(f"  Preview sample:     {stats['preview_rows']:>12,}\n")
+            f.write(f"  Quarantined rows:   {stats['quarantined_rows']:>12,}\n")
+            for rule, n_failed in stats['rule_failures'].items():
+                f.write(f"    {rule + ':':<20}{n_failed:>10,}\n")
+            f.write(f"  Restated keys:      {stats['restated_keys']:>12,}\n")
+            f.write(f"  Conflicting keys:   {stats['conflicting_keys']:>12,}"
+                    f"  (policy: {stats['conflict_policy']})\n")
+            f.write(f"  Restated rows removed: {stats['restated_rows_removed']:>9,}\n")
+            f.write(f"  Duplicate keys:     {stats['duplicate_keys']:>12,}  (within one file, kept)\n")
         
         f.write("\n" + "="*70 + "\n")
         f.write("CLEANING OPERATIONS PERFORMED:\n")
         f.write("="*70 + "\n")
         f.write("1. Removed exact duplicate rows\n")
         f.write("2. Standardized state names (66 variations -> official names)\n")
-        f.write("3. Marked invalid state entries (city names, numbers) as 'INVALID'\n")
+        f.write("3. Marked invalid state entries (city names, numbers) as 'INVALID' (quarantined)\n")
         f.write("4. Standardized district names (Title Case)\n")
         f.write("5. Converted dates to YYYY-MM-DD format\n")
         f.write("6. Padded pincodes to 6 digits\n")
-        f.write("7. Added 'state_original' column for reference\n")
+        f.write("7. Saved raw -> official state lineage to state_lineage.csv\n")
         f.write("8. Split large files to comply with Excel row limit\n")
+        f.write("9. Saved stratified preview sample (state x month, with weights)\n")
+        f.write("10. Resolved restated (date, state, district, pincode) keys across dumps\n")
+        f.write("11. Moved rows failing quality rules to <dataset>_quarantine.csv:\n")
+        for name, description, _ in QUALITY_RULES:
+            f.write(f"      {name}: {description}\n")
     
     print(f"\n[OK] Report saved to: {output_file}")
 
@@ -390,16 +757,11 @@ def generate_split_summary(stats_list, output_file):
     print(f"[OK] Split summary saved to: {output_file}")
 
 
-def main():
-    """Main function to clean all datasets."""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Create output directory
+def cleaning_jobs(base_dir):
+    """Raw input directory, cleaned output base and name of every dataset."""
     output_dir = os.path.join(base_dir, 'cleaned_data')
-    os.makedirs(output_dir, exist_ok=True)
-    
     # Define datasets (output_base is path without extension for splitting)
-    datasets = [
+    return [
         {
             'input_dir': os.path.join(base_dir, 'api_data_aadhar_biometric'),
             'output_base': os.path.join(output_dir, 'biometric_cleaned'),
@@ -416,12 +778,16 @@ def main():
             'name': 'ENROLMENT'
         },
     ]
-    
-    # Process each dataset
-    all_stats = []
-    for ds in datasets:
-        stats = clean_dataset(ds['input_dir'], ds['output_base'], ds['name'])
-        all_stats.append(stats)
+
+
+def write_reports(all_stats, output_dir):
+    """Write the state lineage table, cleaning report and split-files summary."""
+    # Raw -> official state spellings, one small table for all datasets
+    lineage_file = os.path.join(output_dir, 'state_lineage.csv')
+    pd.concat(
+        [s['state_lineage'].assign(dataset=s['dataset']) for s in all_stats], ignore_index=True
+    )[['dataset', 'raw_state', 'state', 'rows']].to_csv(lineage_file, index=False)
+    print(f"[OK] State lineage saved to: {lineage_file}")
     
     # Generate reports
     report_file = os.path.join(output_dir, 'cleaning_report.txt')
@@ -430,6 +796,32 @@ def main():
     # Generate split files summary
     split_summary_file = os.path.join(output_dir, 'SPLIT_FILES_SUMMARY.txt')
     generate_split_summary(all_stats, split_summary_file)
+
+
+def main():
+    """Main function to clean all datasets."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    # Create output directory
+    output_dir = os.path.join(base_dir, 'cleaned_data')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    datasets = cleaning_jobs(base_dir)
+    
+    # Process each dataset
+    all_stats = []
+    # python data_cleaning.py --conflict-policy max  (latest | max | flag)
+    conflict_policy = (sys.argv[sys.argv.index('--conflict-policy') + 1]
+                       if '--conflict-policy' in sys.argv else CONFLICT_POLICY)
+    # python data_cleaning.py --keep-state-original  (also keep the raw state on every row)
+    keep_state_original = '--keep-state-original' in sys.argv
+    
+    for ds in datasets:
+        stats = clean_dataset(ds['input_dir'], ds['output_base'], ds['name'], conflict_policy,
+                              keep_state_original)
+        all_stats.append(stats)
+    
+    write_reports(all_stats, output_dir)
     
     print("\n" + "="*60)
     print("DATA CLEANING COMPLETE!")
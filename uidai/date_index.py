@@ -0,0 +1,257 @@
+"""
+Prefix-Sum Date-Range Index
+===========================
+Cumulative per-day sums for state x day and district x day, per metric,
+so the total over any date range is two lookups and a subtraction instead
+of re-filtering rows and regrouping.
+- Dense (key, day, metric) cumulative-sum array with a leading zero day
+- range_total(start, end) costs O(keys), independent of row count
+- Cached per dataset as .npz; rows of newer part files for days after the
+  cached span are appended to the prefix sums, and the index is rebuilt
+  only when new rows touch indexed days
+- Newly cleaned rows that are not in any part file yet (e.g. one day's
+  file) are an in-memory overlay only: the shared cache read by
+  indiafinal.py, anomalies.py and forecast.py never holds them
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from district_geometry import canonical_district
+from metrics import DATA_DIR, DATASETS, METRIC_COLUMNS, add_norm_columns, load_cleaned, part_files
+
+INDEX_LEVELS = ('state', 'district')
+
+
+class DateRangeIndex:
+    """
+    Prefix sums of metric values per key and day.
+
+    cumsum[k, d, m] holds the total of metric m for key k over the first d
+    days (cumsum[:, 0] is zero), so a range [s, e] is cumsum[:, e + 1] - cumsum[:, s].
+    """
+
+    def __init__(self, keys, start_date, cumsum, metrics=METRIC_COLUMNS):
+        self.keys = pd.Index(keys)
+        self.start_date = pd.Timestamp(start_date)
+        self.cumsum = cumsum
+        self.metrics = list(metrics)
+
+    @classmethod
+    def from_frame(cls, df, key_col, metrics=METRIC_COLUMNS):
+        """Build the index from rows with key_col, 'date' and the metric columns."""
+        days = pd.to_datetime(df['date']).to_numpy().astype('datetime64[D]')
+        start = days.min()
+        day = (days - start).astype(np.int64)
+        n_days = int(day.max()) + 1
+
+        codes, keys = pd.factorize(df[key_col], sort=True)
+        valid = codes >= 0
+        flat = codes[valid] * n_days + day[valid]
+        dense = np.stack([
+            np.bincount(flat, weights=np.nan_to_num(df[m].to_numpy(dtype=float)[valid]),
+                        minlength=len(keys) * n_days)
+            for m in metrics
+        ], axis=-1).reshape(len(keys), n_days, len(metrics))
+
+        cumsum = np.zeros((len(keys), n_days + 1, len(metrics)))
+        np.cumsum(dense, axis=1, out=cumsum[:, 1:])
+        return cls(keys, start, cumsum, metrics)
+
+    @property
+    def n_days(self):
+        return self.cumsum.shape[1] - 1
+
+    @property
+    def dates(self):
+        return pd.date_range(self.start_date, periods=self.n_days, freq='D')
+
+    def _offset(self, date, default):
+        if date is None:
+            return default
+        return int(np.clip((pd.Timestamp(date) - self.start_date).days, -1, self.n_days))
+
+    def range_total(self, start=None, end=None):
+        """
+        Per-key totals over the inclusive date range [start, end].
+
+        Either bound may be None (open); dates outside the indexed span are clamped.
+
+        Returns:
+        --------
+        pd.DataFrame indexed by key with one column per metric
+        """
+        s = max(self._offset(start, 0), 0)
+        e = min(self._offset(end, self.n_days - 1) + 1, self.n_days)
+        totals = self.cumsum[:, e] - self.cumsum[:, min(s, e)]
+        return pd.DataFrame(totals, index=self.keys, columns=self.metrics)
+
+    @property
+    def end_date(self):
+        """First day after the indexed span."""
+        return self.start_date + pd.Timedelta(days=self.n_days)
+
+    def append(self, df, key_col):
+        """
+        Extend the index with rows of days after the indexed span.
+
+        Keys seen for the first time get zero history; days between the span
+        and the first new day carry the last totals forward.
+
+        Returns:
+        --------
+        DateRangeIndex covering the old and the new days
+        """
+        new = DateRangeIndex.from_frame(df, key_col, self.metrics)
+        gap = (new.start_date - self.end_date).days
+        if gap < 0:
+            raise ValueError(f"rows from {new.start_date.date()} overlap the index "
+                             f"(through {(self.end_date - pd.Timedelta(days=1)).date()})")
+        keys = self.keys.union(new.keys)
+        old_rows, new_rows = keys.get_indexer(self.keys), keys.get_indexer(new.keys)
+
+        first_new = self.n_days + gap + 1
+        cumsum = np.zeros((len(keys), first_new + new.n_days, len(self.metrics)))
+        cumsum[old_rows, :self.n_days + 1] = self.cumsum
+        cumsum[old_rows, self.n_days + 1:] = self.cumsum[:, -1:]
+        cumsum[new_rows, first_new:] += new.cumsum[:, 1:]
+        return DateRangeIndex(keys, self.start_date, cumsum, self.metrics)
+
+    def save(self, path):
+        np.savez_compressed(path, keys=np.asarray(self.keys, dtype=str),
+                            start_date=str(self.start_date.date()),
+                            metrics=np.asarray(self.metrics), cumsum=self.cumsum)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['keys'], str(data['start_date']), data['cumsum'], list(data['metrics']))
+
+
+def _index_path(dataset_name, level, data_dir):
+    return os.path.join(data_dir, f"{DATASETS[dataset_name]}_{level}_days.npz")
+
+
+def _keyed_rows(df, dataset_name):
+    """Add the norm_* metrics and the 'State|District' key (canonical district) to rows."""
+    add_norm_columns(df, dataset_name)
+    df['district_key'] = df['state'] + '|' + df['district'].map(canonical_district)
+    return df
+
+
+def _save_indexes(dataset_name, indexes, data_dir):
+    for level, index in indexes.items():
+        index.save(_index_path(dataset_name, level, data_dir))
+
+
+def build_date_indexes(dataset_name, data_dir=DATA_DIR):
+    """
+    Build and save the state x day and district x day indexes of a dataset.
+
+    District keys are 'State|District' with canonical district names.
+
+    Returns:
+    --------
+    dict: level -> DateRangeIndex, or None if the dataset has no part files
+    """
+    df = load_cleaned(dataset_name, data_dir)
+    if df is None:
+        return None
+    df = _keyed_rows(df, dataset_name)
+
+    indexes = {
+        'state': DateRangeIndex.from_frame(df, 'state'),
+        'district': DateRangeIndex.from_frame(df, 'district_key'),
+    }
+    _save_indexes(dataset_name, indexes, data_dir)
+    print(f"[OK] Date-range index built for {dataset_name}: "
+          f"{len(indexes['state'].keys)} states, {len(indexes['district'].keys)} districts, "
+          f"{indexes['state'].n_days} days")
+    return indexes
+
+
+def update_date_indexes(dataset_name, rows=None, data_dir=DATA_DIR):
+    """
+    Bring a dataset's cached indexes up to date, appending days where possible.
+
+    Only part files newer than the cache are read. Their rows are appended
+    and saved when they all fall after the indexed span; otherwise the
+    indexes are rebuilt from the part files.
+
+    `rows` (newly cleaned rows not yet in the part files, e.g. one day's
+    file) are laid over the returned indexes but never saved, so the shared
+    cache only ever covers the cleaned store. Overlay rows of days the
+    store already indexes are dropped: the part files hold those days.
+
+    Parameters:
+    -----------
+    dataset_name : str - Key of DATASETS
+    rows : pd.DataFrame - Newly cleaned rows to overlay, not saved (optional)
+    data_dir : str - Cleaned store directory
+
+    Returns:
+    --------
+    dict: level -> DateRangeIndex, or None if there is nothing to index
+    """
+    paths = {level: _index_path(dataset_name, level, data_dir) for level in INDEX_LEVELS}
+    if all(os.path.exists(p) for p in paths.values()):
+        indexes = {level: DateRangeIndex.load(p) for level, p in paths.items()}
+        cached = min(os.path.getmtime(p) for p in paths.values())
+        sources = part_files(dataset_name, data_dir)
+        newer = [f for f in sources if os.path.getmtime(f) > cached]
+        if len(newer) == len(sources) and newer:
+            indexes = build_date_indexes(dataset_name, data_dir)  # whole store rewritten
+        elif newer:
+            new_rows = pd.concat([pd.read_csv(f) for f in newer], ignore_index=True)
+            indexes = _append_rows(dataset_name, indexes, _keyed_rows(new_rows, dataset_name), data_dir)
+    else:
+        indexes = build_date_indexes(dataset_name, data_dir)
+
+    if rows is not None and len(rows):
+        rows = _keyed_rows(rows.copy(), dataset_name)
+        if indexes is None:
+            return {'state': DateRangeIndex.from_frame(rows, 'state'),
+                    'district': DateRangeIndex.from_frame(rows, 'district_key')}
+        indexed = pd.to_datetime(rows['date']) < indexes['state'].end_date
+        if indexed.any():
+            print(f"[WARN] {indexed.sum():,} new {dataset_name} row(s) fall on days the cleaned store "
+                  f"already indexes; using the part files for those days")
+            rows = rows[~indexed]
+        if len(rows):
+            indexes = {'state': indexes['state'].append(rows, 'state'),
+                       'district': indexes['district'].append(rows, 'district_key')}
+    return indexes
+
+
+def _append_rows(dataset_name, indexes, rows, data_dir):
+    """Append keyed rows to the cached indexes and save them, or rebuild if they touch indexed days."""
+    end = indexes['state'].end_date
+    if (pd.to_datetime(rows['date']) < end).any():
+        print(f"[INFO] New {dataset_name} rows restate indexed days; rebuilding the date index")
+        return build_date_indexes(dataset_name, data_dir)
+    n_days = indexes['state'].n_days
+    indexes = {'state': indexes['state'].append(rows, 'state'),
+               'district': indexes['district'].append(rows, 'district_key')}
+    _save_indexes(dataset_name, indexes, data_dir)
+    print(f"[OK] Date-range index of {dataset_name} extended by "
+          f"{indexes['state'].n_days - n_days} day(s) from {len(rows):,} new rows")
+    return indexes
+
+
+def load_date_index(dataset_name, level='state', data_dir=DATA_DIR):
+    """Load a dataset's date-range index, updating it if the cleaned store is newer."""
+    if level not in INDEX_LEVELS:
+        raise ValueError(f"level must be one of {INDEX_LEVELS}, got {level!r}")
+    path = _index_path(dataset_name, level, data_dir)
+    sources = part_files(dataset_name, data_dir)
+    if os.path.exists(path) and all(os.path.getmtime(f) <= os.path.getmtime(path) for f in sources):
+        return DateRangeIndex.load(path)
+    indexes = update_date_indexes(dataset_name, data_dir=data_dir)
+    return indexes[level] if indexes else None
+
+
+if __name__ == '__main__':
+    for name in DATASETS:
+        build_date_indexes(name)
@@ -0,0 +1,377 @@
+"""
+Map/Reduce Cleaning Across Several Workers
+==========================================
+Runs data_cleaning.py as three phases over a shared directory, so raw dumps
+can be split across machines instead of one process reading everything.
+- map:    each worker reads its share of the raw files (every n-th file in
+          dump order), removes exact duplicates within that share,
+          standardizes states/districts/dates/pincodes and evaluates the
+          quality rules. Rows are then written to buckets by a hash of
+          (state, district, pincode), so every version of a key and every
+          copy of a raw row land in the same bucket.
+- reduce: each bucket is deduplicated across workers (by raw-row
+          fingerprint) and quarantined, and its restated keys are resolved.
+          The reduce also writes the bucket's cleaned rows, sketches and
+          report counters.
+- merge:  concatenates the buckets in original row order, writes the cleaned
+          store with the same sort/split/preview as data_cleaning.py, merges
+          the sketches and writes the reports
+
+Rows carry a global '_row' number (source file index << 32 | line), so
+'latest' always means the same row as in a single-process run. The cleaned
+parts, quarantine, conflicts and report counters are identical. Sketches
+are merged from per-bucket sketches (same error guarantees).
+
+Partials are pickles (pandas and numpy versions must match across workers);
+each is written to a temporary name and renamed, so a phase never reads a
+half-written file.
+
+Usage:
+  python distributed_clean.py map    --shared /mnt/job --worker 0 --workers 3 [--buckets 16]
+  python distributed_clean.py reduce --shared /mnt/job --worker 0 --workers 2 [--conflict-policy max]
+  python distributed_clean.py merge  --shared /mnt/job
+  python distributed_clean.py local  --workers 4      (all phases as local processes)
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_cleaning import (CONFLICT_POLICIES, CONFLICT_POLICY, KEY_COLUMNS, QUALITY_RULES, apply_quality_rules,
+                           cleaning_jobs, evaluate_quality_rules, resolve_key_conflicts, save_cleaned,
+                           source_files, standardize_columns, state_lineage, write_reports)
+from sketches import SketchStore, build_sketches
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+N_BUCKETS = 16
+BUCKET_COLUMNS = ['state', 'district', 'pincode']  # subset of the natural key
+SOURCE_SHIFT = 32                                  # _row = source << 32 | line in file
+MAP_MARKERS = 'map-[0-9][0-9][0-9].json'
+REDUCE_MARKERS = 'reduce-[0-9][0-9][0-9].json'
+
+
+def _job_dir(shared_dir, dataset_name):
+    path = os.path.join(shared_dir, dataset_name.lower())
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_atomic(path, write):
+    """Write via a temporary file in the same directory, then rename into place."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_json(path, payload):
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(payload, f, indent=1, default=int)
+    _write_atomic(path, write)
+
+
+def _read_json(pattern, expected, phase):
+    """Read every marker file of a phase; fail if any worker has not finished."""
+    files = sorted(glob.glob(pattern))
+    if len(files) != expected:
+        raise RuntimeError(f"{phase} phase incomplete: {len(files)} of {expected} partials in "
+                           f"{os.path.dirname(pattern)}")
+    markers = []
+    for f in files:
+        with open(f) as fh:
+            markers.append(json.load(fh))
+    return markers
+
+
+# ============================================================================
+# MAP
+# ============================================================================
+def map_worker(input_dir, job_dir, worker, n_workers, n_buckets=N_BUCKETS, keep_state_original=False):
+    """
+    Clean every n-th raw file of a dataset up to the key-dependent steps.
+
+    Writes map-<worker>-<bucket>.pkl partials and a map-<worker>.json marker.
+    """
+    csv_files = source_files(input_dir)
+    mine = [(source, f) for source, f in enumerate(csv_files) if source % n_workers == worker]
+
+    dfs = []
+    for source, f in mine:
+        df = pd.read_csv(f)
+        df['_row'] = (np.int64(source) << SOURCE_SHIFT) | np.arange(len(df), dtype=np.int64)
+        dfs.append(df)
+        print(f"  - {os.path.basename(f)}: {len(df):,} rows")
+    original_rows = sum(len(df) for df in dfs)
+
+    if dfs:
+        df = pd.concat(dfs, ignore_index=True)
+        # Raw-row fingerprint: exact duplicates are removed here and again across workers
+        raw_cols = [c for c in df.columns if c != '_row']
+        df['_fp'] = pd.util.hash_pandas_object(df[raw_cols], index=False).to_numpy()
+        df = df.drop_duplicates('_fp', keep='last').reset_index(drop=True)
+
+        raw_states, raw_dates = standardize_columns(df, keep_state_original)
+        df['state_raw'] = raw_states
+        df['date_raw'] = raw_dates
+        failed = ~evaluate_quality_rules(df)
+        df['_failed'] = failed.astype(np.int64) @ (1 << np.arange(len(QUALITY_RULES), dtype=np.int64))
+        bucket = pd.util.hash_pandas_object(df[BUCKET_COLUMNS], index=False).to_numpy() % n_buckets
+    else:
+        df, bucket = None, np.zeros(0, dtype=np.uint64)
+
+    for b in range(n_buckets):
+        part = df[bucket == b] if df is not None else pd.DataFrame()
+        _write_atomic(os.path.join(job_dir, f"map-{worker:03d}-{b:03d}.pkl"), part.to_pickle)
+
+    _write_json(os.path.join(job_dir, f"map-{worker:03d}.json"), {
+        'worker': worker,
+        'workers': n_workers,
+        'buckets': n_buckets,
+        'files': [os.path.basename(f) for _, f in mine],
+        'sources': [os.path.basename(f) for f in csv_files],
+        'original_rows': original_rows,
+        'rows_out': 0 if df is None else len(df),
+    })
+    print(f"[OK] Map worker {worker}/{n_workers}: {len(mine)} file(s), {original_rows:,} rows "
+          f"-> {n_buckets} buckets")
+
+
+# ============================================================================
+# REDUCE
+# ============================================================================
+def reduce_bucket(job_dir, bucket, dataset_name, conflict_policy=CONFLICT_POLICY):
+    """
+    Deduplicate, quarantine and resolve restated keys for one bucket.
+
+    Writes reduce-<bucket>.pkl (cleaned rows with '_row'), its quarantine,
+    conflicts and sketches, and a reduce-<bucket>.json marker with counters.
+    """
+    maps = _read_json(os.path.join(job_dir, MAP_MARKERS), _expected_workers(job_dir), 'map')
+    sources = maps[0]['sources']
+    if any(m['sources'] != sources for m in maps):
+        # _row ids are source<<SOURCE_SHIFT, so every worker must number the dumps alike
+        raise RuntimeError("Map workers saw different source file lists; rerun the map phase on identical inputs")
+    base = os.path.join(job_dir, f"reduce-{bucket:03d}")
+
+    parts = [pd.read_pickle(f) for f in sorted(glob.glob(os.path.join(job_dir, f"map-*-{bucket:03d}.pkl")))]
+    parts = [p for p in parts if len(p)]
+    df = (pd.concat(parts, ignore_index=True) if parts else pd.DataFrame())
+    if df.empty:
+        _write_json(f"{base}.json", {'bucket': bucket, 'deduped_rows': 0, 'empty': True})
+        return
+
+    # Exact duplicates across workers: keep the globally last copy
+    df = df.sort_values('_row', kind='mergesort')
+    df = df.drop_duplicates('_fp', keep='last').reset_index(drop=True)
+    deduped_rows = len(df)
+
+    lineage = state_lineage(df['state_raw'], df['state'])
+    invalid_count = int((df['state'] == 'INVALID').sum())
+
+    failed_bits = df['_failed'].to_numpy()
+    passed = (failed_bits[:, None] >> np.arange(len(QUALITY_RULES))) & 1 == 0
+    raw_columns = {'date_raw': df['date_raw'], 'state_raw': df['state_raw']}
+    rows = df.drop(columns=['_fp', '_failed', 'state_raw', 'date_raw'])
+    rows, rule_failures = apply_quality_rules(rows, base, raw_columns, passed=passed)
+
+    rows = rows.assign(_source=rows['_row'].to_numpy() >> SOURCE_SHIFT)
+    rows, conflict_stats = resolve_key_conflicts(rows, base, conflict_policy, sources)
+
+    rows.to_pickle(f"{base}.pkl")
+    build_sketches(rows.drop(columns='_row'), dataset_name.title()).save(base)
+    _write_json(f"{base}.json", {
+        'bucket': bucket,
+        'deduped_rows': deduped_rows,
+        'invalid_states': invalid_count,
+        'quarantined_rows': deduped_rows - len(rows) - conflict_stats['restated_rows_removed'],
+        'rule_failures': rule_failures,
+        'state_lineage': lineage.astype(object).where(lineage.notna(), None).to_dict('list'),
+        **conflict_stats,
+    })
+    print(f"[OK] Reduce bucket {bucket}: {deduped_rows:,} rows -> {len(rows):,} cleaned")
+
+
+def _expected_workers(job_dir):
+    markers = glob.glob(os.path.join(job_dir, MAP_MARKERS))
+    if not markers:
+        raise RuntimeError(f"map phase has not run: no partials in {job_dir}")
+    with open(markers[0]) as f:
+        return json.load(f)['workers']
+
+
+def _n_buckets(job_dir):
+    with open(glob.glob(os.path.join(job_dir, MAP_MARKERS))[0]) as f:
+        return json.load(f)['buckets']
+
+
+# ============================================================================
+# MERGE
+# ============================================================================
+def _concat_csv_partials(paths, output_file, sort_cols=None):
+    """Concatenate partial CSVs text-for-text in '_row' order (then sort_cols) and drop '_row'."""
+    frames = [pd.read_csv(p, dtype=str, keep_default_na=False) for p in paths]
+    frames = [f for f in frames if len(f.columns)]
+    if not frames:
+        return False
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined.iloc[np.argsort(combined['_row'].astype(np.int64).to_numpy(), kind='stable')]
+    if sort_cols:
+        combined = combined.sort_values(sort_cols)
+    combined.drop(columns='_row').to_csv(output_file, index=False)
+    return True
+
+
+def merge_dataset(job_dir, output_base, dataset_name, conflict_policy=CONFLICT_POLICY):
+    """
+    Merge every bucket of a dataset into the cleaned store.
+
+    Returns:
+    --------
+    dict with the same cleaning statistics as clean_dataset()
+    """
+    print(f"\n{'='*60}")
+    print(f"Merging: {dataset_name}")
+    print('='*60)
+    n_workers = _expected_workers(job_dir)
+    maps = _read_json(os.path.join(job_dir, MAP_MARKERS), n_workers, 'map')
+    n_buckets = maps[0]['buckets']
+    reduces = [r for r in _read_json(os.path.join(job_dir, REDUCE_MARKERS), n_buckets, 'reduce')
+               if not r.get('empty')]
+    buckets = [r['bucket'] for r in reduces]
+
+    # Cleaned rows in original row order, then the usual sort/split/preview
+    frames = [pd.read_pickle(os.path.join(job_dir, f"reduce-{b:03d}.pkl")) for b in buckets]
+    df = pd.concat(frames, ignore_index=True)
+    df = df.iloc[np.argsort(df['_row'].to_numpy(), kind='stable')].drop(columns='_row')
+    df.reset_index(drop=True, inplace=True)
+
+    sketches = SketchStore(dataset_name.title())
+    for b in buckets:
+        sketches.merge(SketchStore.load(os.path.join(job_dir, f"reduce-{b:03d}")))
+
+    _concat_csv_partials([os.path.join(job_dir, f"reduce-{b:03d}_quarantine.csv") for b in buckets],
+                         f"{output_base}_quarantine.csv")
+    conflict_files = [p for b in buckets
+                      if os.path.exists(p := os.path.join(job_dir, f"reduce-{b:03d}_conflicts.csv"))]
+    if conflict_files:
+        _concat_csv_partials(conflict_files, f"{output_base}_conflicts.csv", KEY_COLUMNS)
+
+    lineage = pd.concat([pd.DataFrame(r['state_lineage']) for r in reduces], ignore_index=True)
+    lineage = lineage.groupby(['raw_state', 'state'], dropna=False, as_index=False)['rows'].sum()
+    lineage = lineage.sort_values(['state', 'raw_state'], ignore_index=True)
+
+    files_info, preview_info = save_cleaned(df, output_base, dataset_name, sketches)
+
+    original_rows = sum(m['original_rows'] for m in maps)
+    deduped_rows = sum(r['deduped_rows'] for r in reduces)
+    return {
+        'dataset': dataset_name,
+        'original_rows': original_rows,
+        'duplicates_removed': original_rows - deduped_rows,
+        'invalid_states': sum(r['invalid_states'] for r in reduces),
+        'final_rows': len(df),
+        'unique_states': df['state'].nunique(),
+        'files_info': files_info,
+        'preview_rows': preview_info['rows'],
+        'conflict_policy': conflict_policy,
+        'restated_keys': sum(r['restated_keys'] for r in reduces),
+        'conflicting_keys': sum(r['conflicting_keys'] for r in reduces),
+        'restated_rows_removed': sum(r['restated_rows_removed'] for r in reduces),
+        'duplicate_keys': sum(r['duplicate_keys'] for r in reduces),
+        'quarantined_rows': sum(r['quarantined_rows'] for r in reduces),
+        'rule_failures': {name: sum(r['rule_failures'][name] for r in reduces)
+                          for name, _, _ in QUALITY_RULES},
+        'state_lineage': lineage,
+    }
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+def _jobs(base_dir, dataset=None):
+    """Dataset jobs that have raw files (optionally only one dataset)."""
+    jobs = [j for j in cleaning_jobs(base_dir) if dataset in (None, j['name'])]
+    return [j for j in jobs if source_files(j['input_dir'])]
+
+
+def run_phase(args):
+    jobs = _jobs(args.base_dir, args.dataset)
+    if not jobs:
+        raise FileNotFoundError(f"No raw CSV files under {args.base_dir}")
+
+    if args.phase == 'map':
+        for job in jobs:
+            print(f"\nMap {job['name']} (worker {args.worker}/{args.workers})")
+            map_worker(job['input_dir'], _job_dir(args.shared, job['name']), args.worker, args.workers,
+                       args.buckets, args.keep_state_original)
+    elif args.phase == 'reduce':
+        for job in jobs:
+            job_dir = _job_dir(args.shared, job['name'])
+            for bucket in range(args.worker, _n_buckets(job_dir), args.workers):
+                reduce_bucket(job_dir, bucket, job['name'], args.conflict_policy)
+    elif args.phase == 'merge':
+        output_dir = os.path.join(args.base_dir, 'cleaned_data')
+        os.makedirs(output_dir, exist_ok=True)
+        all_stats = [merge_dataset(_job_dir(args.shared, job['name']), job['output_base'], job['name'],
+                                   args.conflict_policy) for job in jobs]
+        write_reports(all_stats, output_dir)
+        print(f"\n[OK] Merged {len(all_stats)} dataset(s) from {args.shared} into {output_dir}")
+
+
+def run_local(args):
+    """Run map and reduce as args.workers local processes each, then merge in-process."""
+    shared = args.shared or tempfile.mkdtemp(prefix='uidai_clean_')
+    common = ['--shared', shared, '--base-dir', args.base_dir, '--workers', str(args.workers)]
+    if args.dataset:
+        common += ['--dataset', args.dataset]
+    phases = [
+        ('map', ['--buckets', str(args.buckets)] + (['--keep-state-original'] if args.keep_state_original else [])),
+        ('reduce', ['--conflict-policy', args.conflict_policy]),
+    ]
+    for phase, extra in phases:
+        print(f"\n--- {phase}: {args.workers} worker processes ---")
+        procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), phase, '--worker', str(w)]
+                                  + common + extra)
+                 for w in range(args.workers)]
+        if any(p.wait() != 0 for p in procs):
+            raise RuntimeError(f"{phase} worker failed; partials left in {shared}")
+    args.phase, args.shared = 'merge', shared
+    run_phase(args)
+    if not args.keep_partials:
+        shutil.rmtree(shared)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map/reduce cleaning across worker processes or machines")
+    parser.add_argument('phase', choices=['map', 'reduce', 'merge', 'local'])
+    parser.add_argument('--shared', help="Shared directory for partial results (local: temp dir)")
+    parser.add_argument('--base-dir', default=SCRIPT_DIR,
+                        help="Directory holding api_data_aadhar_* and cleaned_data")
+    parser.add_argument('--dataset', choices=[j['name'] for j in cleaning_jobs(SCRIPT_DIR)])
+    parser.add_argument('--worker', type=int, default=0, help="This worker's index (map/reduce)")
+    parser.add_argument('--workers', type=int, default=1, help="Number of workers in this phase")
+    parser.add_argument('--buckets', type=int, default=N_BUCKETS, help="Shuffle buckets (map)")
+    parser.add_argument('--conflict-policy', choices=CONFLICT_POLICIES, default=CONFLICT_POLICY)
+    parser.add_argument('--keep-state-original', action='store_true')
+    parser.add_argument('--keep-partials', action='store_true', help="local: keep the shared directory")
+    args = parser.parse_args()
+    if args.phase == 'local':
+        run_local(args)
+        return
+    if not args.shared:
+        parser.error("--shared is required for map, reduce and merge")
+    if not 0 <= args.worker < args.workers:
+        parser.error("--worker must be in [0, --workers)")
+    run_phase(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Precomputed District Aggregates
+===============================
+Builds one small table of per-district metric totals for all three
+datasets so district-level maps do not regroup millions of raw rows on
+every build.
+- One row per (dataset, state, district) with norm_* totals
+- Canonical district names and 'State|District' join keys
+- Rebuilt only when a cleaned part file is newer than the aggregate
+"""
+
+import os
+
+import pandas as pd
+
+from district_geometry import canonical_district
+from metrics import DATA_DIR, DATASETS, METRIC_COLUMNS, add_norm_columns, load_cleaned, part_files
+
+DISTRICT_AGG_FILE = os.path.join(DATA_DIR, "district_aggregates.csv")
+
+
+def build_district_aggregates(data_dir=DATA_DIR, output_file=DISTRICT_AGG_FILE):
+    """
+    Aggregate every cleaned dataset to district level and save the result.
+
+    Returns:
+    --------
+    pd.DataFrame with columns: dataset, state, district, district_key,
+    norm_total, norm_0_5, norm_5_17, norm_18_plus, records, pincodes
+    """
+    print("Building district aggregates...")
+    frames = []
+    for name in DATASETS:
+        df = load_cleaned(name, data_dir)
+        if df is None:
+            continue
+        add_norm_columns(df, name)
+        df['district'] = df['district'].map(canonical_district)
+
+        agg = df.groupby(['state', 'district']).agg(
+            **{m: (m, 'sum') for m in METRIC_COLUMNS},
+            records=('norm_total', 'size'),
+            pincodes=('pincode', 'nunique'),
+        ).reset_index()
+        agg.insert(0, 'dataset', name)
+        frames.append(agg)
+
+    if not frames:
+        raise FileNotFoundError(f"No cleaned data found in {data_dir}")
+
+    result = pd.concat(frames, ignore_index=True)
+    result.insert(3, 'district_key', result['state'] + '|' + result['district'])
+    result.to_csv(output_file, index=False)
+    print(f"[OK] District aggregates saved: {output_file} ({len(result):,} rows)")
+    return result
+
+
+def load_district_aggregates(data_dir=DATA_DIR, output_file=DISTRICT_AGG_FILE):
+    """Load the district aggregates, rebuilding them if the cleaned store is newer."""
+    sources = [f for name in DATASETS for f in part_files(name, data_dir)]
+    if os.path.exists(output_file) and all(
+        os.path.getmtime(f) <= os.path.getmtime(output_file) for f in sources
+    ):
+        return pd.read_csv(output_file)
+    return build_district_aggregates(data_dir, output_file)
+
+
+if __name__ == '__main__':
+    build_district_aggregates()
@@ -0,0 +1,198 @@
+"""
+District Geometry & Canonical District Names
+============================================
+Local (vendored) district boundaries for district-level maps.
+- Canonical district/state names shared by data and geometry joins
+- One-off simplification of a source district GeoJSON into geo/
+- Loader for the simplified, vendored geometry
+
+Usage (one-off, to vendor a new boundary file):
+  python district_geometry.py <source_districts.geojson>
+"""
+
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from data_cleaning import standardize_state
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GEO_DIR = os.path.join(SCRIPT_DIR, "geo")
+DISTRICT_GEOJSON = os.path.join(GEO_DIR, "india_districts_simplified.geojson")
+
+# ============================================================================
+# CANONICAL NAMES
+# ============================================================================
+# Spelling variants seen in the API dumps and boundary files -> canonical name
+DISTRICT_ALIASES = {
+    'Kutch': 'Kachchh',
+    'Banaskantha': 'Banas Kantha',
+    'Sabarkantha': 'Sabar Kantha',
+    'Panchmahal': 'Panch Mahals',
+    'Ferozepur': 'Firozpur',
+    'Sri Ganganagar': 'Ganganagar',
+    'Lahul And Spiti': 'Lahaul And Spiti',
+    'Leh Ladakh': 'Leh',
+    'Purbi Champaran': 'East Champaran',
+    'Pashchim Champaran': 'West Champaran',
+    'Malda': 'Maldah',
+    'Koch Bihar': 'Cooch Behar',
+    'Coochbehar': 'Cooch Behar',
+    'Darjiling': 'Darjeeling',
+    'North Twenty Four Parganas': 'North 24 Parganas',
+    'South Twenty Four Parganas': 'South 24 Parganas',
+    'Shravasti': 'Shrawasti',
+    'Siddharth Nagar': 'Siddharthnagar',
+    'Kheri': 'Lakhimpur Kheri',
+    'Gurgaon': 'Gurugram',
+    'Bandipora': 'Bandipore',
+    'Baramula': 'Baramulla',
+    'Punch': 'Poonch',
+    'Y.S.R.': 'Y.S.R. Kadapa',
+    'Cuddapah': 'Y.S.R. Kadapa',
+}
+
+# Boundary-file state spellings not covered by data_cleaning.STATE_MAPPING
+GEO_STATE_ALIASES = {
+    'andaman & nicobar': 'Andaman and Nicobar Islands',
+    'andaman & nicobar island': 'Andaman and Nicobar Islands',
+    'nct of delhi': 'Delhi',
+    'dadra & nagar haveli and daman & diu': 'Dadra and Nagar Haveli and Daman and Diu',
+}
+
+
+def canonical_district(name):
+    """Canonical district name: trimmed, single-spaced, Title Case, aliases resolved."""
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ''
+    text = re.sub(r'\s+', ' ', str(name).replace('&', ' And ')).strip().title()
+    return DISTRICT_ALIASES.get(text, text)
+
+
+def canonical_state(name):
+    """Canonical (cleaned-data) state name for a data or boundary-file spelling."""
+    state = standardize_state(name)
+    if state == 'INVALID':
+        state = GEO_STATE_ALIASES.get(str(name).strip().lower(), 'INVALID')
+    return state
+
+
+def district_key(state, district):
+    """Join key shared by district aggregates and geometry: 'State|District'."""
+    return f"{state}|{canonical_district(district)}"
+
+
+# ============================================================================
+# GEOMETRY SIMPLIFICATION
+# ============================================================================
+def _simplify_ring(coords, tolerance):
+    """Douglas-Peucker simplification of one ring (iterative, vectorised distances)."""
+    pts = np.asarray(coords, dtype=float)
+    if len(pts) <= 4:
+        return pts
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = pts[end] - pts[start]
+        seg_len = np.hypot(seg[0], seg[1])
+        rel = pts[start + 1:end] - pts[start]
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    simplified = pts[keep]
+    # A ring needs at least 4 points (closed triangle)
+    return simplified if len(simplified) >= 4 else pts[[0, len(pts) // 3, 2 * len(pts) // 3, -1]]
+
+
+def simplify_geojson(src_path, dst_path=DISTRICT_GEOJSON, tolerance=0.01, precision=3,
+                     district_prop='DISTRICT', state_prop='ST_NM'):
+    """
+    Simplify a district boundary GeoJSON and keep only the join properties.
+
+    Parameters:
+    -----------
+    src_path : str - Source district GeoJSON (full resolution)
+    dst_path : str - Output path (default: vendored file in geo/)
+    tolerance : float - Douglas-Peucker tolerance in degrees (~1 km at 0.01)
+    precision : int - Decimal places kept per coordinate
+    district_prop, state_prop : str - Property names in the source file
+
+    Returns:
+    --------
+    dict with 'features', 'points_before', 'points_after'
+    """
+    with open(src_path) as f:
+        src = json.load(f)
+
+    features = []
+    points_before = points_after = 0
+    for feat in src['features']:
+        props = feat.get('properties') or {}
+        geom = feat.get('geometry')
+        if not geom:
+            continue
+
+        polygons = geom['coordinates'] if geom['type'] == 'MultiPolygon' else [geom['coordinates']]
+        new_polygons = []
+        for polygon in polygons:
+            new_rings = []
+            for ring in polygon:
+                points_before += len(ring)
+                simplified = np.round(_simplify_ring(ring, tolerance), precision)
+                points_after += len(simplified)
+                new_rings.append(simplified.tolist())
+            new_polygons.append(new_rings)
+
+        state = canonical_state(props.get(state_prop))
+        district = canonical_district(props.get(district_prop))
+        features.append({
+            'type': 'Feature',
+            'properties': {
+                'state': state,
+                'district': district,
+                'district_key': f"{state}|{district}",
+            },
+            'geometry': {'type': 'MultiPolygon', 'coordinates': new_polygons},
+        })
+
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    with open(dst_path, 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f, separators=(',', ':'))
+
+    print(f"[OK] {len(features)} districts: {points_before:,} -> {points_after:,} points")
+    print(f"  Saved: {dst_path} ({os.path.getsize(dst_path) / (1024 * 1024):.2f} MB)")
+    return {'features': len(features), 'points_before': points_before, 'points_after': points_after}
+
+
+def load_district_geojson(path=DISTRICT_GEOJSON):
+    """Load the vendored, simplified district GeoJSON."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"District geometry not found: {path}\n"
+            f"Vendor it once with: python district_geometry.py <source_districts.geojson>"
+        )
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    simplify_geojson(sys.argv[1])
@@ -0,0 +1,215 @@
+"""
+Streaming Sort-Merge Join at District-Day Granularity
+=====================================================
+Joins Enrolment, Biometric and Demographic on (date, state, district)
+without loading any dataset fully.
+- Relies on the cleaned store's Date -> State -> District sort order
+- Reads each dataset in chunks and aggregates complete key groups only
+- Advances all three streams together up to a common watermark key
+- Writes the joined table incrementally (bounded memory per chunk)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from district_geometry import canonical_district
+from metrics import DATA_DIR, METRIC_COLUMNS, add_norm_columns, part_files
+
+JOIN_FILE = os.path.join(DATA_DIR, "district_day_joined.csv")
+CHUNK_ROWS = 250_000
+
+KEY_COLS = ['date', 'state', 'district']
+
+# Dataset -> (column prefix, metrics carried into the join)
+JOIN_DATASETS = {
+    'Enrolment': ('enrol', METRIC_COLUMNS),
+    'Biometric': ('bio', ['norm_total', 'norm_5_17', 'norm_18_plus']),
+    'Demographic': ('demo', ['norm_total', 'norm_5_17', 'norm_18_plus']),
+}
+
+# Sorts after every real value, matching pandas' NaN-last sort in the cleaner
+_NA_KEY = '\uffff'
+
+
+def _prefixed(prefix, metric):
+    return f"{prefix}_{metric.replace('norm_', '')}"
+
+
+def iter_district_days(dataset_name, data_dir=DATA_DIR, chunk_rows=CHUNK_ROWS):
+    """
+    Yield district-day aggregates of one dataset, in key order, chunk by chunk.
+
+    The last (date, state) group of each chunk is held back and prepended to
+    the next chunk, so every yielded frame contains complete groups only.
+    Districts are canonicalised inside a (date, state) group, which keeps
+    the stream sorted on (date, state).
+    """
+    prefix, metrics = JOIN_DATASETS[dataset_name]
+    out_cols = [_prefixed(prefix, m) for m in metrics]
+    carry = None
+
+    for path in part_files(dataset_name, data_dir):
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype={'pincode': str}):
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            dates = chunk['date'].fillna(_NA_KEY).to_numpy()
+            states = chunk['state'].fillna(_NA_KEY).to_numpy()
+            # Start of the trailing (date, state) group
+            tail = len(chunk) - 1
+            while tail > 0 and dates[tail - 1] == dates[-1] and states[tail - 1] == states[-1]:
+                tail -= 1
+            carry = chunk.iloc[tail:]
+            if tail:
+                yield _aggregate(chunk.iloc[:tail], dataset_name, metrics, out_cols)
+
+    if carry is not None and len(carry):
+        yield _aggregate(carry, dataset_name, metrics, out_cols)
+
+
+def _aggregate(rows, dataset_name, metrics, out_cols):
+    rows = add_norm_columns(rows.copy(), dataset_name)
+    rows['date'] = rows['date'].fillna(_NA_KEY)
+    rows['state'] = rows['state'].fillna(_NA_KEY)
+    rows['district'] = rows['district'].map(canonical_district)
+    agg = rows.groupby(KEY_COLS, sort=True)[metrics].sum()
+    agg.columns = out_cols
+    return agg
+
+
+class _Stream:
+    """Buffered district-day stream with a 'last complete key' watermark."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.buffer = None
+        self.done = False
+
+    def fill(self):
+        """Read one more frame; returns False once the stream is exhausted."""
+        try:
+            frame = next(self.frames)
+        except StopIteration:
+            self.done = True
+            return False
+        self.buffer = frame if self.buffer is None else pd.concat([self.buffer, frame])
+        return True
+
+    def last_key(self):
+        return self.buffer.index[-1][:2] if self.buffer is not None and len(self.buffer) else None
+
+    def take_through(self, watermark):
+        """Pop all rows whose (date, state) <= watermark."""
+        if self.buffer is None or not len(self.buffer):
+            return None
+        dates = self.buffer.index.get_level_values('date')
+        states = self.buffer.index.get_level_values('state')
+        mask = (dates < watermark[0]) | ((dates == watermark[0]) & (states <= watermark[1]))
+        taken, self.buffer = self.buffer[mask], self.buffer[~mask]
+        return taken
+
+
+def _join_frames(frames):
+    joined = pd.concat([f for f in frames if f is not None and len(f)], axis=1, sort=True)
+    return joined.fillna(0)
+
+
+def _add_ratios(joined):
+    enrol = joined['enrol_total'].where(joined['enrol_total'] > 0)
+    joined['bio_per_enrolment'] = joined['bio_total'] / enrol
+    joined['demo_per_enrolment'] = joined['demo_total'] / enrol
+    return joined
+
+
+def merge_join(data_dir=DATA_DIR, output_file=JOIN_FILE, chunk_rows=CHUNK_ROWS):
+    """
+    Stream-join the three cleaned datasets into one district-day table.
+
+    Parameters:
+    -----------
+    data_dir : str - Cleaned store directory
+    output_file : str - Output CSV (written incrementally)
+    chunk_rows : int - Rows read per chunk and dataset (memory budget)
+
+    Returns:
+    --------
+    dict with 'rows' written and 'output_file'
+    """
+    print(f"\n{'='*60}")
+    print("Sort-merge join: Enrolment x Biometric x Demographic")
+    print('='*60)
+
+    streams = {name: _Stream(iter_district_days(name, data_dir, chunk_rows)) for name in JOIN_DATASETS}
+    columns = [_prefixed(prefix, m) for prefix, metrics in JOIN_DATASETS.values() for m in metrics]
+    columns += ['bio_per_enrolment', 'demo_per_enrolment']
+
+    rows_written = 0
+    header = True
+    while True:
+        for stream in streams.values():
+            while not stream.done and stream.last_key() is None:
+                stream.fill()
+        active = [s for s in streams.values() if not s.done]
+        if active:
+            # Everything up to the smallest last key of the live streams is complete
+            watermark = min(s.last_key() for s in active)
+        else:
+            watermark = (_NA_KEY + _NA_KEY, _NA_KEY + _NA_KEY)
+
+        parts = [s.take_through(watermark) for s in streams.values()]
+        if any(p is not None and len(p) for p in parts):
+            joined = _join_frames(parts).reindex(columns=columns[:-2], fill_value=0)
+            joined = _add_ratios(joined).reset_index()
+            joined['date'] = joined['date'].replace(_NA_KEY, np.nan)
+            joined['state'] = joined['state'].replace(_NA_KEY, np.nan)
+            joined.to_csv(output_file, mode='w' if header else 'a', header=header, index=False)
+            header = False
+            rows_written += len(joined)
+
+        if not active:
+            break
+
+    print(f"[OK] Joined {rows_written:,} district-days -> {output_file}")
+    return {'rows': rows_written, 'output_file': output_file}
+
+
+def load_district_day_join(data_dir=DATA_DIR, output_file=JOIN_FILE):
+    """Load the joined district-day table, rebuilding it if the cleaned store is newer."""
+    sources = [f for name in JOIN_DATASETS for f in part_files(name, data_dir)]
+    if not (os.path.exists(output_file) and all(
+        os.path.getmtime(f) <= os.path.getmtime(output_file) for f in sources
+    )):
+        merge_join(data_dir, output_file)
+    return pd.read_csv(output_file, parse_dates=['date'])
+
+
+def join_district_days(frames):
+    """
+    Join in-memory cleaned rows (e.g. preview samples) the same way as merge_join.
+
+    Parameters:
+    -----------
+    frames : dict - Dataset name (key of JOIN_DATASETS) -> cleaned rows
+
+    Returns:
+    --------
+    pd.DataFrame with the columns of the joined district-day table
+    """
+    parts = []
+    columns = []
+    for name, (prefix, metrics) in JOIN_DATASETS.items():
+        out_cols = [_prefixed(prefix, m) for m in metrics]
+        columns += out_cols
+        if frames.get(name) is not None and len(frames[name]):
+            parts.append(_aggregate(frames[name], name, metrics, out_cols))
+    joined = _join_frames(parts).reindex(columns=columns, fill_value=0)
+    joined = _add_ratios(joined).reset_index()
+    joined['date'] = joined['date'].replace(_NA_KEY, np.nan)
+    joined['state'] = joined['state'].replace(_NA_KEY, np.nan)
+    return joined
+
+
+if __name__ == '__main__':
+    merge_join(chunk_rows=int(sys.argv[1]) if len(sys.argv) > 1 else CHUNK_ROWS)
@@ -0,0 +1,141 @@
+import os
+import sys
+
+import plotly.graph_objects as go
+
+from district_agg import load_district_aggregates
+from district_geometry import load_district_geojson
+from metrics import METRIC_COLUMNS
+
+# --- 1. DATA LOADING (PRECOMPUTED) ---
+print("Initializing District Drill-Down Map...")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Geometry first (cheap, and without it there is nothing to draw), then the
+# aggregates, which may have to be rebuilt from the whole cleaned store.
+# No state-level fallback: a district map without polygons would be empty.
+try:
+    geojson = load_district_geojson()
+    district_agg = load_district_aggregates()
+except FileNotFoundError as e:
+    print(f"  [WARN] No district map written. {e}")
+    sys.exit(1)
+
+# Format: (InternalKey, DisplayName, ColorScale)
+METRICS_CONFIG = [
+    ('norm_total', 'Total Activity', 'Viridis'),
+    ('norm_0_5', 'Age 0-5', 'RdPu'),
+    ('norm_5_17', 'Age 5-17', 'Blues'),
+    ('norm_18_plus', 'Age 18+', 'Oranges')
+]
+
+# --- 2. JOIN AGGREGATES TO GEOMETRY ---
+# Every district polygon gets a value (0 if the dataset has no rows there),
+# so the location array is shared by all views and only 'z' changes.
+ALL_KEYS = [f['properties']['district_key'] for f in geojson['features']]
+LABELS = [f"{f['properties']['district']}, {f['properties']['state']}" for f in geojson['features']]
+
+DATA_CACHE = {}
+unmatched = {}
+for dtype, group in district_agg.groupby('dataset', sort=False):
+    by_key = group.set_index('district_key')
+    aligned = by_key[METRIC_COLUMNS + ['records', 'pincodes']].reindex(ALL_KEYS, fill_value=0)
+    DATA_CACHE[dtype] = {
+        m_col: aligned[m_col].tolist() for m_col in METRIC_COLUMNS
+    }
+    DATA_CACHE[dtype]['customdata'] = list(zip(LABELS, aligned['records'], aligned['pincodes']))
+    unmatched[dtype] = sorted(set(by_key.index) - set(ALL_KEYS))
+
+for dtype, keys in unmatched.items():
+    if keys:
+        print(f"  [WARN] {dtype}: {len(keys)} districts without geometry (e.g. {keys[:3]})")
+
+# --- 3. SINGLE-TRACE CHOROPLETH ---
+# The district GeoJSON is embedded once; all 12 dataset x metric views only
+# swap 'z' and the colour scale on this one trace, which keeps the page
+# responsive with ~750 polygons.
+init_dataset = list(DATA_CACHE.keys())[0]
+init_metric, init_label, init_scale = METRICS_CONFIG[0]
+
+fig = go.Figure(go.Choropleth(
+    geojson=geojson,
+    featureidkey='properties.district_key',
+    locations=ALL_KEYS,
+    z=DATA_CACHE[init_dataset][init_metric],
+    customdata=DATA_CACHE[init_dataset]['customdata'],
+    colorscale=init_scale,
+    colorbar=dict(title=dict(text=init_label, font=dict(size=12)), len=0.5, thickness=15),
+    marker_line_width=0.2,
+    marker_line_color='#ffffff',
+    hovertemplate=(
+        '<b>%{customdata[0]}</b><br>' +
+        'Value: %{z:,.0f}<br>' +
+        'Records: %{customdata[1]:,.0f}<br>' +
+        'Pincodes: %{customdata[2]:,.0f}' +
+        '<extra></extra>'
+    )
+))
+
+# --- 4. VIEW DROPDOWN (DATASET x METRIC) ---
+view_buttons = []
+for dtype in DATA_CACHE:
+    for m_col, label, color_scale in METRICS_CONFIG:
+        view_buttons.append(dict(
+            label=f"{dtype} - {label}",
+            method="update",
+            args=[
+                {
+                    'z': [DATA_CACHE[dtype][m_col]],
+                    'customdata': [DATA_CACHE[dtype]['customdata']],
+                    'colorscale': [color_scale],
+                    'colorbar.title.text': label,
+                },
+                {"title": f"<b>District Drill-Down: {dtype}</b>"}
+            ]
+        ))
+
+fig.update_layout(
+    autosize=True,
+    title=dict(
+        text=f"<b>District Drill-Down: {init_dataset}</b>",
+        x=0.02, y=0.98,
+        xanchor='left', yanchor='top',
+        font=dict(size=20, color='#1a1a2e', family='Arial Black')
+    ),
+    paper_bgcolor='#ffffff',
+    geo=dict(
+        fitbounds="locations",
+        visible=False,
+        bgcolor='rgba(0,0,0,0)',
+        domain=dict(x=[0.0, 1.0], y=[0.0, 1.0])
+    ),
+    margin=dict(l=0, r=0, t=60, b=0),
+    updatemenus=[
+        dict(
+            active=0,
+            buttons=view_buttons,
+            x=0.70, y=0.98,
+            xanchor='left', yanchor='top',
+            bgcolor='#ffffff', bordercolor='#e0e0e0', borderwidth=1,
+            pad=dict(r=10, t=10),
+            font=dict(size=12, color='#1a1a2e', family='Arial')
+        )
+    ]
+)
+
+fig.add_annotation(
+    text="<i>Aadhaar District Analytics</i>",
+    x=0.98, y=0.02,
+    showarrow=False,
+    xref="paper", yref="paper",
+    xanchor='right',
+    font=dict(size=10, color='#9ca3af', family='Arial')
+)
+
+# --- 5. EXPORT ---
+html_path = os.path.join(SCRIPT_DIR, "district_map_visualization.html")
+fig.write_html(html_path, config={'responsive': True, 'displayModeBar': False})
+print(f"[OK] Interactive HTML saved: {html_path}")
+
+fig.show(config={'responsive': True})
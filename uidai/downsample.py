@@ -0,0 +1,132 @@
+"""
+Shape-Preserving Downsampling for Line & Area Plots
+===================================================
+Caps the number of points a daily (or district-level) series contributes
+to a figure, so render time and output size stay flat as history grows.
+- Largest-Triangle-Three-Buckets (LTTB): keeps the visually dominant point
+  of each bucket, so peaks and dips survive
+- Min/max bucketing: keeps each bucket's extremes (fully vectorised)
+- Opt-in with --downsample on the command line or UIDAI_DOWNSAMPLE=1;
+  otherwise series are passed through unchanged
+- Multi-column frames (stacked areas, age-group lines) share one set of
+  kept dates, so stacks stay aligned
+
+Usage in a plotting script:
+  daily = thin(daily, 400)             # Series or DataFrame indexed by date
+  ax.plot(daily.index, daily.values)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+DOWNSAMPLE = '--downsample' in sys.argv or os.environ.get('UIDAI_DOWNSAMPLE') == '1'
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+DEFAULT_POINTS = 500
+
+
+def _as_float(index):
+    """Numeric x positions for an index (datetimes become seconds)."""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8 / 1e9
+    return np.asarray(index, dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; each of the n_out - 2
+    buckets in between contributes the point forming the largest triangle
+    with the previously kept point and the mean of the next bucket.
+
+    Returns:
+    --------
+    np.ndarray of sorted integer positions (len <= n_out)
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # Mean of each bucket (the last bucket's successor is the final point)
+    counts = np.diff(edges)
+    bucket_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    bucket_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    next_x = np.r_[bucket_x[1:], x[-1]]
+    next_y = np.r_[bucket_y[1:], y[-1]]
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[prev] - next_x[b]) * (y[lo:hi] - y[prev])
+                      - (x[prev] - x[lo:hi]) * (next_y[b] - y[prev]))
+        prev = lo + int(np.argmax(area))
+        kept[b + 1] = prev
+    return kept
+
+
+def minmax_indices(y, n_out):
+    """
+    Positions of each bucket's minimum and maximum, plus the end points
+    ((n_out - 2) // 2 buckets).
+
+    Returns:
+    --------
+    np.ndarray of sorted unique integer positions (len <= n_out)
+    """
+    n = len(y)
+    n_buckets = (n_out - 2) // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    bucket = np.arange(n) * n_buckets // n
+
+    # Sort by (bucket, value): the first and last entry of each bucket are its extremes
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.r_[0, order[starts], order[ends], n - 1])
+
+
+def downsample(data, n_points=DEFAULT_POINTS, method='lttb'):
+    """
+    Reduce a Series or DataFrame to about n_points rows.
+
+    For a DataFrame each column gets an equal share of the budget and the
+    union of the kept rows is returned, so all columns keep the same x.
+
+    Parameters:
+    -----------
+    data : pd.Series or pd.DataFrame - Sorted by index (usually dates)
+    n_points : int - Target number of rows in the result
+    method : str - 'lttb' or 'minmax'
+
+    Returns:
+    --------
+    Same type as data, a row subset in the original order
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"method must be one of {DOWNSAMPLE_METHODS}, got {method!r}")
+    if len(data) <= n_points:
+        return data
+
+    columns = [data] if isinstance(data, pd.Series) else [data[c] for c in data.columns]
+    budget = max(n_points // len(columns), 4)
+    x = _as_float(data.index)
+    kept = np.unique(np.concatenate([
+        lttb_indices(x, col.to_numpy(), budget) if method == 'lttb'
+        else minmax_indices(col.to_numpy(), budget)
+        for col in columns
+    ]))
+    return data.iloc[kept]
+
+
+def thin(data, n_points=DEFAULT_POINTS, method='lttb'):
+    """downsample() when downsampling is enabled, otherwise data unchanged."""
+    return downsample(data, n_points, method) if DOWNSAMPLE else data
@@ -0,0 +1,135 @@
+"""
+Batched District Demand Forecasts
+=================================
+Forecasts daily enrolment/update demand for every district and age group
+for centre capacity planning.
+- One seasonal linear model per series: intercept + trend + weekday effects
+- All series share the same design matrix, so every model is fitted with a
+  single least-squares solve (series are columns of one matrix)
+- Prediction intervals from each series' residual variance
+- Long-format output: one row per district, metric and forecast day
+
+Usage:
+  python forecast.py [--horizon 28] [--fit-days 90]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from date_index import load_date_index
+from metrics import DATA_DIR, DATASETS, SCRIPT_DIR
+
+HORIZON_DAYS = 28
+FIT_DAYS = 90            # fit on the most recent days only, so the trend stays local
+INTERVAL_Z = 1.96        # 95% prediction interval
+FORECAST_FILE = os.path.join(SCRIPT_DIR, "district_forecasts.csv")
+
+
+def design_matrix(dates, origin):
+    """Columns: intercept, trend (days since origin), Tue..Sun indicators (Monday is the base)."""
+    trend = (dates - origin).days.to_numpy(dtype=float)
+    weekday = dates.dayofweek.to_numpy()
+    dummies = (weekday[:, None] == np.arange(1, 7)[None, :]).astype(float)
+    return np.column_stack([np.ones(len(dates)), trend, dummies])
+
+
+def fit_forecast(series, dates, horizon=HORIZON_DAYS, z=INTERVAL_Z):
+    """
+    Fit the seasonal model to every row of a (series x days) matrix at once.
+
+    Returns:
+    --------
+    (future_dates, forecast, lower, upper): forecast arrays are (series x horizon)
+    """
+    X = design_matrix(dates, dates[0])
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    X_future = design_matrix(future, dates[0])
+
+    # One solve for all series: coef is (params x series)
+    coef, _, rank, _ = np.linalg.lstsq(X, series.T, rcond=None)
+    residuals = series.T - X @ coef
+    dof = max(len(dates) - rank, 1)
+    sigma = np.sqrt((residuals ** 2).sum(axis=0) / dof)
+
+    # Parameter uncertainty at each future day (shared across series)
+    leverage = np.einsum('ij,jk,ik->i', X_future, np.linalg.pinv(X.T @ X), X_future)
+    se = sigma[:, None] * np.sqrt(1 + leverage)[None, :]
+
+    forecast = np.clip((X_future @ coef).T, 0, None)
+    lower = np.clip(forecast - z * se, 0, None)
+    upper = forecast + z * se
+    return future, forecast, lower, upper
+
+
+def forecast_dataset(dataset_name, horizon=HORIZON_DAYS, fit_days=FIT_DAYS, data_dir=DATA_DIR):
+    """
+    Forecasts for every district and metric of one dataset.
+
+    Returns:
+    --------
+    pd.DataFrame with columns: dataset, state, district, metric, date,
+    forecast, lower, upper
+    """
+    index = load_date_index(dataset_name, 'district', data_dir)
+    if index is None:
+        return None
+    daily = np.diff(index.cumsum, axis=1)[:, -fit_days:]  # districts x days x metrics
+    dates = index.dates[-fit_days:]
+
+    # Stack every (district, metric) series as one row
+    n_keys, n_days, n_metrics = daily.shape
+    series = daily.transpose(0, 2, 1).reshape(n_keys * n_metrics, n_days)
+    future, forecast, lower, upper = fit_forecast(series, dates, horizon)
+
+    keys = np.repeat(np.asarray(index.keys), n_metrics)
+    parts = pd.Index(keys).str.split('|', n=1)
+    return pd.DataFrame({
+        'dataset': dataset_name,
+        'state': np.repeat(parts.str[0], horizon),
+        'district': np.repeat(parts.str[1], horizon),
+        'metric': np.repeat(np.tile(index.metrics, n_keys), horizon),
+        'date': np.tile(future, len(series)),
+        'forecast': forecast.ravel().round(1),
+        'lower': lower.ravel().round(1),
+        'upper': upper.ravel().round(1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched per-district demand forecasts")
+    parser.add_argument('--horizon', type=int, default=HORIZON_DAYS, help="Days to forecast")
+    parser.add_argument('--fit-days', type=int, default=FIT_DAYS, help="Recent days used for fitting")
+    parser.add_argument('--output', default=FORECAST_FILE)
+    args = parser.parse_args()
+
+    print("Forecasting district demand...")
+    start = time.perf_counter()
+    frames = []
+    for name in DATASETS:
+        result = forecast_dataset(name, args.horizon, args.fit_days)
+        if result is not None:
+            n_series = len(result) // args.horizon
+            print(f"  - {name}: {n_series:,} series fitted")
+            frames.append(result)
+    if not frames:
+        raise FileNotFoundError(f"No cleaned data found in {DATA_DIR}")
+    forecasts = pd.concat(frames, ignore_index=True)
+    elapsed = time.perf_counter() - start
+
+    forecasts.to_csv(args.output, index=False)
+    # Per-series intervals do not add up, so the state summary shows point forecasts only
+    summary = forecasts[forecasts['metric'] == 'norm_total'].pivot_table(
+        index='state', columns='dataset', values='forecast', aggfunc='sum')
+    print(f"\n{'='*60}")
+    print(f"FORECAST: total activity over the next {args.horizon} days per state")
+    print('='*60)
+    print(summary.round(0).to_string())
+    print(f"\n[OK] {len(forecasts):,} forecast rows in {elapsed:.2f}s, saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Exact Top-K Hotspots
+====================
+Top-K busiest pincodes and districts per state for every metric, from a
+single aggregation instead of one groupby + idxmax per metric.
+- Vectorised per-group selection (one lexsort, rank = position in group)
+- Long-format result: state, metric, rank, district, pincode, value
+- Tooltip text for the map customdata and CSV/JSON side outputs
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+HOTSPOT_TOP_K = 3
+
+
+def top_k_per_group(frame, group_col, value_col, k):
+    """
+    Rows holding the k largest values of value_col within each group.
+
+    Groups are ordered by one lexsort on (group code, -value); a row's rank is
+    its position minus the position of its group's first row. Ties keep the
+    original row order.
+
+    Returns:
+    --------
+    pd.DataFrame (subset of frame) with an added 1-based 'rank' column
+    """
+    if frame.empty:
+        return frame.assign(rank=pd.Series(dtype=int))
+    codes, _ = pd.factorize(frame[group_col], sort=True)
+    values = frame[value_col].to_numpy(dtype=float)
+    order = np.lexsort((np.arange(len(frame)), -values, codes))
+
+    sorted_codes = codes[order]
+    is_start = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    group_start = np.maximum.accumulate(np.where(is_start, np.arange(len(order)), 0))
+    rank = np.arange(len(order)) - group_start
+
+    keep = order[rank < k]
+    result = frame.iloc[keep].copy()
+    result['rank'] = rank[rank < k] + 1
+    return result
+
+
+def top_k_hotspots(df, state_col, metrics, k=HOTSPOT_TOP_K, level='pincode'):
+    """
+    Exact top-k hotspots per state for every metric.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame - Rows with state_col, 'district', 'pincode' and metric columns
+    state_col : str - State column to group by (e.g. 'state_mapped')
+    metrics : list - Metric columns (e.g. METRIC_COLUMNS)
+    k : int - Hotspots kept per state and metric
+    level : str - 'pincode' or 'district'
+
+    Returns:
+    --------
+    pd.DataFrame with columns: state, metric, rank, district, pincode, value
+    """
+    keys = [state_col, 'district', 'pincode'] if level == 'pincode' else [state_col, 'district']
+    agg = df.groupby(keys, sort=False)[metrics].sum().reset_index()
+
+    frames = []
+    for m_col in metrics:
+        top = top_k_per_group(agg[agg[m_col] > 0], state_col, m_col, k)
+        frames.append(pd.DataFrame({
+            'state': top[state_col].to_numpy(),
+            'metric': m_col,
+            'rank': top['rank'].to_numpy(),
+            'district': top['district'].to_numpy(),
+            'pincode': top['pincode'].to_numpy() if level == 'pincode' else None,
+            'value': top[m_col].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True).sort_values(['metric', 'state', 'rank'], ignore_index=True)
+
+
+def top_k_from_sketch(sketch_store, metrics, k=HOTSPOT_TOP_K, district_filter=None, exact_rows=None):
+    """
+    Same long format as top_k_hotspots, answered from a SketchStore (approximate).
+
+    The sketch keeps HEAVY_HITTER_K keys per whole state, before any
+    district filter, so a filtered state can lose its real hotspots. With
+    exact_rows, a state is answered exactly instead when fewer than k
+    candidates survive the filter, or when its k-th count is below the
+    state's error bound (a key the summary dropped could outrank it).
+
+    Parameters:
+    -----------
+    sketch_store : SketchStore - Sketches of the dataset
+    metrics : list - Metric columns
+    k : int - Hotspots kept per state and metric
+    district_filter : set of (state, district) pairs, with cleaned state names
+    exact_rows : pd.DataFrame - Rows with 'state' (cleaned names), 'district',
+                 'pincode' and the metric columns, for the exact fallback
+
+    Returns:
+    --------
+    pd.DataFrame with columns: state, metric, rank, district, pincode, value
+    """
+    columns = ['state', 'metric', 'rank', 'district', 'pincode', 'value']
+    frames, n_exact = [], 0
+    for m_col in metrics:
+        top = sketch_store.top_hotspots(m_col, n=k, district_filter=district_filter)
+        top['rank'] = top.groupby('state').cumcount() + 1
+        top = top.assign(metric=m_col)
+        if exact_rows is not None:
+            kth = top[top['rank'] == k]
+            answered = kth.loc[kth['count'] >= kth['upper_bound'] - kth['count'], 'state']
+            exact_states = exact_rows['state'][~exact_rows['state'].isin(answered)].unique()
+            if len(exact_states):
+                n_exact += len(exact_states)
+                exact = top_k_hotspots(exact_rows[exact_rows['state'].isin(exact_states)],
+                                       'state', [m_col], k, level='pincode')
+                top = pd.concat([top[top['state'].isin(answered)].rename(columns={'count': 'value'}),
+                                 exact.assign(pincode=exact['pincode'].astype(str))], ignore_index=True)
+        frames.append(top.rename(columns={'count': 'value'})[columns])
+    if n_exact:
+        print(f"  [INFO] Sketch hotspots: {n_exact} state-metric(s) answered exactly "
+              f"(too few sketch candidates to vouch for the top {k})")
+    return pd.concat(frames, ignore_index=True).sort_values(['metric', 'state', 'rank'], ignore_index=True)
+
+
+def hotspot_tooltips(top, metric, level='pincode'):
+    """
+    One HTML list per state for a metric, e.g. '1. Patna (800001): 6,301<br>2. ...'.
+
+    Returns:
+    --------
+    dict: state -> tooltip string
+    """
+    rows = top[top['metric'] == metric]
+    if level == 'pincode':
+        label = rows['district'].astype(str) + ' (' + rows['pincode'].astype(str) + ')'
+    else:
+        label = rows['district'].astype(str)
+    text = rows['rank'].astype(str) + '. ' + label + ': ' + rows['value'].map('{:,.0f}'.format)
+    return text.groupby(rows['state']).agg('<br>'.join).to_dict()
+
+
+def save_hotspots(tables, output_base):
+    """
+    Write the top-k tables as <base>.csv and <base>.json.
+
+    tables : dict - dataset name -> {'pincode': frame, 'district': frame}
+    """
+    frames = [
+        frame.assign(dataset=dataset, level=level)
+        for dataset, levels in tables.items() for level, frame in levels.items()
+    ]
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined[['dataset', 'level', 'metric', 'state', 'rank', 'district', 'pincode', 'value']]
+    combined.to_csv(f"{output_base}.csv", index=False)
+
+    nested = {}
+    for (dataset, level, metric, state), group in combined.groupby(
+        ['dataset', 'level', 'metric', 'state'], sort=False
+    ):
+        nested.setdefault(dataset, {}).setdefault(level, {}).setdefault(metric, {})[state] = (
+            group[['rank', 'district', 'pincode', 'value']].to_dict('records')
+        )
+    with open(f"{output_base}.json", 'w') as f:
+        json.dump(nested, f, indent=1, default=str)
+    print(f"[OK] Top-K hotspots saved: {output_base}.csv / .json")
@@ -1,8 +1,16 @@
 import pandas as pd
 import plotly.graph_objects as go
 import os
+import sys
 import glob
 
+from date_index import DateRangeIndex
+from hotspots import HOTSPOT_TOP_K, hotspot_tooltips, save_hotspots, top_k_from_sketch, top_k_hotspots
+from map_export import export_all_views, write_sharded_html
+from metrics import metric_view
+from pincode_index import PincodeRollup, prefix_tooltips
+from sketches import SketchStore
+
 # --- 1. ROBUST DATA LOADING ---
 print("Initializing Spatiotemporal Analytics Engine...")
 
@@ -18,19 +26,20 @@ def load_dataset(pattern, name):
         return None
     print(f"  - Loading {name} ({len(files)} files)...")
     dfs = [pd.read_csv(f) for f in files]
-    df = pd.concat(dfs, ignore_index=True)
-    df['Dataset_Type'] = name
-    return df
+    return pd.concat(dfs, ignore_index=True)
 
-# Load all three datasets
+# The three datasets, loaded one at a time inside the processing loop so only
+# one of them is in memory at once
 # The glob pattern *_cleaned_part*.csv matches ALL part files (part1, part2, etc.)
 # The load_dataset function automatically concatenates them
-df_enrol = load_dataset("enrolment_cleaned_part*.csv", "Enrolment")
-df_bio = load_dataset("biometric_cleaned_part*.csv", "Biometric")
-df_demo = load_dataset("demographic_cleaned_part*.csv", "Demographic")
-
-valid_dfs = [d for d in [df_enrol, df_bio, df_demo] if d is not None]
-if not valid_dfs:
+DATASET_FILES = [
+    ("Enrolment", "enrolment_cleaned_part*.csv"),
+    ("Biometric", "biometric_cleaned_part*.csv"),
+    ("Demographic", "demographic_cleaned_part*.csv"),
+]
+DATASET_FILES = [(name, pattern) for name, pattern in DATASET_FILES
+                 if glob.glob(os.path.join(DATA_DIR, pattern))]
+if not DATASET_FILES:
     raise FileNotFoundError("No data files found!")
 
 # --- 2. DATA NORMALIZATION & INSIGHT CALCULATION ---
@@ -45,13 +54,6 @@ METRICS_CONFIG = [
     ('norm_18_plus', 'Age 18+', 'Oranges')
 ]
 
-# Column Mappings for each file type
-COLUMN_MAPS = {
-    'Enrolment': {'total': 'total_enrolment', '0-5': 'age_0_5', '5-17': 'age_5_17', '18+': 'age_18_greater'},
-    'Biometric': {'total': 'total_updates', '0-5': None, '5-17': 'bio_age_5_17', '18+': 'bio_age_17_'},
-    'Demographic': {'total': 'total_updates', '0-5': None, '5-17': 'demo_age_5_17', '18+': 'demo_age_17_'}
-}
-
 STATE_NAME_MAPPING = {
     # Data file names -> GeoJSON feature keys (jbrobst map)
     'Andaman and Nicobar Islands': 'Andaman & Nicobar',
@@ -61,8 +63,7 @@ STATE_NAME_MAPPING = {
     'Uttarakhand': 'Uttarakhand',
     'Ladakh': 'Ladakh',
     'Delhi': 'Delhi',
-    'Telangana': 'Telangana',
-    'INVALID': 'INVALID_EXCLUDE'
+    'Telangana': 'Telangana'
 }
 
 # Dictionary to store pre-calculated arrays for the plot
@@ -70,34 +71,25 @@ STATE_NAME_MAPPING = {
 DATA_CACHE = {}
 ALL_STATES = []
 
+# Top-K hotspot tables per dataset (also written as CSV/JSON side output)
+HOTSPOT_TABLES = {}
+USE_SKETCH_HOTSPOTS = '--sketch-hotspots' in sys.argv
+
+# Date-range slider: trailing windows of WINDOW_DAYS, one step every WINDOW_STEP_DAYS
+WINDOW_DAYS = int(sys.argv[sys.argv.index('--window-days') + 1]) if '--window-days' in sys.argv else 30
+WINDOW_STEP_DAYS = 7
+DATE_INDEX = {}
+
 # --- PROCESSING LOOP ---
-for df_raw in valid_dfs:
-    dtype = df_raw['Dataset_Type'].iloc[0]
-    mapping = COLUMN_MAPS[dtype]
+for dtype, pattern in DATASET_FILES:
     DATA_CACHE[dtype] = {}
     
     # A. Pre-processing
-    df = df_raw.copy()
-    df = df[df['state'] != '100000']
-    
-    # Normalize Columns
-    # 1. Total
-    if dtype == 'Enrolment':
-        df['norm_total'] = df['age_0_5'] + df['age_5_17'] + df['age_18_greater']
-    else:
-        # Calculate total if not present, else use map
-        total_col = mapping['total']
-        if total_col not in df.columns:
-            df['norm_total'] = df[mapping['5-17']] + df[mapping['18+']]
-        else:
-            df['norm_total'] = df[total_col]
-
-    # 2. Age Groups
-    df['norm_5_17'] = df[mapping['5-17']]
-    df['norm_18_plus'] = df[mapping['18+']]
-    df['norm_0_5'] = df[mapping['0-5']] if mapping['0-5'] else 0
-
-    # 3. State & Date
+    # Key columns + norm_* metrics (metrics.COLUMN_MAPS) as a projection that
+    # shares the loaded columns; the raw frame is not kept beyond this
+    df = metric_view(load_dataset(pattern, dtype), dtype)
+
+    # State & Date
     df['state_mapped'] = df['state'].replace(STATE_NAME_MAPPING)
     df['date'] = pd.to_datetime(df['date'])
     
@@ -115,6 +107,9 @@ for df_raw in valid_dfs:
     # Align to ALL_STATES to ensure index match
     state_agg = state_agg.set_index('state_mapped').reindex(ALL_STATES, fill_value=0).reset_index()
 
+    # Prefix-sum index over state x day: any window total is two lookups per state
+    DATE_INDEX[dtype] = DateRangeIndex.from_frame(df, 'state_mapped', [m[0] for m in METRICS_CONFIG])
+
     # Algorithm 2: Temporal Peaks (Busiest Date)
     # We calculate the peak date for the TOTAL metric and apply it to others for simplicity.
     peak_data_map = {}
@@ -126,31 +121,63 @@ for df_raw in valid_dfs:
         peaks['date_str'] = peaks['date'].dt.strftime('%Y-%m-%d')
         peak_data_map[m_col] = peaks.set_index('state_mapped')['date_str'].to_dict()
 
-    # Algorithm 3: Hyper-Local Hotspots (Busiest Pincode)
+    # Algorithm 3: Hyper-Local Hotspots (Top-K Pincodes and Districts)
+    # One aggregation for all metrics + vectorised per-state top-K selection.
+    # --sketch-hotspots answers the pincode list from the streaming sketches
+    # saved by data_cleaning.py instead (approximate, no regroup).
+    metric_cols = [m[0] for m in METRICS_CONFIG]
+    sketch_store = None
+    if USE_SKETCH_HOTSPOTS:
+        try:
+            sketch_store = SketchStore.load(os.path.join(DATA_DIR, f"{dtype.lower()}_cleaned"))
+        except FileNotFoundError:
+            print(f"  [INFO] No sketches for {dtype}; computing exact hotspots")
+    if sketch_store is not None:
+        pin_top = top_k_from_sketch(sketch_store, metric_cols, HOTSPOT_TOP_K, exact_rows=df)
+        pin_top['state'] = pin_top['state'].replace(STATE_NAME_MAPPING)
+    else:
+        pin_top = top_k_hotspots(df, 'state_mapped', metric_cols, HOTSPOT_TOP_K, level='pincode')
+    dist_top = top_k_hotspots(df, 'state_mapped', metric_cols, HOTSPOT_TOP_K, level='district')
+    HOTSPOT_TABLES[dtype] = {'pincode': pin_top, 'district': dist_top}
+
+    # Pincode prefix roll-up: sorting districts (3-digit) drilled down to their top pincode
+    pin_rollup = PincodeRollup.from_frame(df, 'state_mapped', metric_cols)
+
     hotspot_data_map = {}
+    hotspot_text_map = {}
     for m_col, _, _ in METRICS_CONFIG:
-        pin_agg = df.groupby(['state_mapped', 'district', 'pincode'])[m_col].sum().reset_index()
-        idx = pin_agg.groupby('state_mapped')[m_col].idxmax()
-        hotspots = pin_agg.loc[idx]
-        hotspot_data_map[m_col] = hotspots.set_index('state_mapped')[['pincode', 'district', m_col]].to_dict('index')
+        best = pin_top[(pin_top['metric'] == m_col) & (pin_top['rank'] == 1)]
+        hotspot_data_map[m_col] = best.rename(columns={'value': m_col}).set_index('state')[
+            ['pincode', 'district', m_col]
+        ].to_dict('index')
+        hotspot_text_map[m_col] = (
+            hotspot_tooltips(pin_top, m_col, 'pincode'),
+            hotspot_tooltips(dist_top, m_col, 'district'),
+            prefix_tooltips(pin_rollup, m_col, digits=3, k=HOTSPOT_TOP_K),
+        )
 
     # --- STORE RESULTS ---
     for m_col, _, _ in METRICS_CONFIG:
         z_values = state_agg[m_col].tolist()
         
-        # Build Custom Data: [Pincode, District, HotspotVal, PeakDate]
+        # Build Custom Data: [Pincode, District, HotspotVal, PeakDate, TopPincodes, TopDistricts, TopRegions]
         custom_data = []
         for state in ALL_STATES:
             # Hotspots
             hs = hotspot_data_map[m_col].get(state, {'pincode': 'N/A', 'district': 'N/A', m_col: 0})
             # Peaks
             pk = peak_data_map[m_col].get(state, 'N/A')
+            # Top-K lists
+            top_pins, top_districts, top_regions = hotspot_text_map[m_col]
             
             custom_data.append([
                 hs['pincode'],
                 hs['district'],
                 hs[m_col],
-                pk
+                pk,
+                top_pins.get(state, 'N/A'),
+                top_districts.get(state, 'N/A'),
+                top_regions.get(state, 'N/A')
             ])
             
         DATA_CACHE[dtype][m_col] = {
@@ -158,6 +185,11 @@ for df_raw in valid_dfs:
             'customdata': custom_data
         }
 
+    # Only the aggregates above are kept; release the rows before the next dataset loads
+    del df
+
+save_hotspots(HOTSPOT_TABLES, os.path.join(SCRIPT_DIR, "india_map_hotspots"))
+
 # --- 3. MAP CONFIGURATION ---
 # Reverted to Original Map (jbrobst) as requested
 geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
@@ -187,7 +219,10 @@ for i, (m_col, label, color_scale) in enumerate(METRICS_CONFIG):
             f'{label}: ' + '%{z:,.0f}<br>' +
             '<br><b>📅 Peak Date:</b> %{customdata[3]}<br>' +
             '<b>🔥 Hotspot:</b> %{customdata[1]} (%{customdata[0]})<br>' +
-            '<b>💥 Max Vol:</b> %{customdata[2]:,.0f}' +
+            '<b>💥 Max Vol:</b> %{customdata[2]:,.0f}<br>' +
+            f'<br><b>Top {HOTSPOT_TOP_K} Pincodes:</b><br>' + '%{customdata[4]}<br>' +
+            f'<br><b>Top {HOTSPOT_TOP_K} Districts:</b><br>' + '%{customdata[5]}<br>' +
+            f'<br><b>Top {HOTSPOT_TOP_K} Sorting Districts (PIN prefix):</b><br>' + '%{customdata[6]}' +
             '<extra></extra>'
         )
     ))
@@ -228,6 +263,36 @@ fig.add_trace(go.Scattergeo(
 
 # --- 4. DROPDOWN LOGIC ---
 
+# Date-Range Slider (per dataset)
+# Each step restyles the 4 metric traces with totals for one trailing window,
+# read from the dataset's prefix-sum index (O(states) per step).
+def build_date_slider(dtype):
+    index = DATE_INDEX[dtype]
+    metric_cols = [m[0] for m in METRICS_CONFIG]
+    steps = [dict(
+        label='All dates',
+        method='restyle',
+        args=[{'z': [DATA_CACHE[dtype][m]['z'] for m in metric_cols]}, [0, 1, 2, 3]]
+    )]
+    window = pd.Timedelta(days=WINDOW_DAYS - 1)
+    for end in index.dates[::-1][::WINDOW_STEP_DAYS][::-1]:
+        totals = index.range_total(end - window, end).reindex(ALL_STATES, fill_value=0)
+        steps.append(dict(
+            label=f"{max(end - window, index.start_date):%d %b} - {end:%d %b %Y}",
+            method='restyle',
+            args=[{'z': [totals[m].tolist() for m in metric_cols]}, [0, 1, 2, 3]]
+        ))
+    return dict(
+        active=0,
+        steps=steps,
+        x=0.02, y=0.02, len=0.6,
+        xanchor='left', yanchor='bottom',
+        currentvalue=dict(prefix=f"{WINDOW_DAYS}-day window: ", font=dict(size=12, color='#1a1a2e')),
+        pad=dict(t=10, b=10),
+        font=dict(size=9, color='#6b7280')
+    )
+
+
 # Dropdown A: Dataset Selector
 # This updates the Z (values) and CustomData (Insights) for ALL 4 metric traces
 dataset_buttons = []
@@ -244,7 +309,8 @@ for dtype in list(DATA_CACHE.keys()):
         method="update",
         args=[
             {'z': new_z, 'customdata': new_custom}, # Update Data
-            {"title": f"{dtype}: Spatiotemporal Analysis"}, # Update Title
+            {"title": f"{dtype}: Spatiotemporal Analysis", # Update Title
+             "sliders": [build_date_slider(dtype)]}, # Swap in this dataset's date slider
             [0, 1, 2, 3] # Apply to the first 4 traces only
         ]
     ))
@@ -302,6 +368,9 @@ fig.update_layout(
     
     # Tight margins to prevent scrolling (only top needs space for title/controls)
     margin=dict(l=0, r=0, t=60, b=0),
+
+    # Date-range slider - Floating bottom left
+    sliders=[build_date_slider(init_dataset)],
     
     # Controls - Compact and positioned top-right
     updatemenus=[
@@ -364,14 +433,20 @@ try:
     fig.write_image(output_path, scale=2, width=1600, height=1200)
     print(f"\n[OK] Image saved for PDF: {output_path}")
 except Exception as e:
-    print(f"\n[INFO] Image export skipped (install kaleido: pip install kaleido)")
+    print(f"\n[INFO] Image export skipped ({type(e).__name__}: {e})")
+
+# Batch export: every Dataset x Metric view to PNG/SVG (python indiafinal.py --batch-export)
+if '--batch-export' in sys.argv:
+    export_all_views(fig, os.path.join(SCRIPT_DIR, "map_exports"), "india_map")
 
 # Save as interactive HTML with responsive config
 html_path = os.path.join(SCRIPT_DIR, "india_map_visualization.html")
-fig.write_html(
-    html_path, 
-    config={'responsive': True, 'displayModeBar': False} # Essential for no-scroll responsiveness
-)
+html_config = {'responsive': True, 'displayModeBar': False} # Essential for no-scroll responsiveness
+if '--sharded-html' in sys.argv:
+    # Initial view inline, other Dataset x Metric payloads fetched on demand (serve over HTTP)
+    write_sharded_html(fig, html_path, config=html_config)
+else:
+    fig.write_html(html_path, config=html_config)
 print(f"[OK] Interactive HTML saved: {html_path}")
 
 fig.show(config={'responsive': True})
\ No newline at end of file
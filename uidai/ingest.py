@@ -0,0 +1,453 @@
+"""
+Paged Ingestion from the Aadhaar Open-Data API
+==============================================
+Fills api_data_aadhar_<dataset>/ with raw CSV part files straight from the
+paged JSON API (data.gov.in style: ?offset=&limit=&format=json&api-key=,
+responses carry 'total' and 'records'), so cleaning can start from an
+empty checkout.
+- asyncio with bounded concurrency: the first page gives the total, then
+  every remaining page is requested at once behind one shared semaphore
+  (blocking urllib calls run in a thread pool sized to the concurrency)
+- Retry with exponential backoff and jitter on timeouts, connection errors
+  and 429/5xx (Retry-After is honoured); other HTTP errors fail the run
+- Each page is written as its own CSV as soon as it arrives (temporary
+  name, then rename) into a staging directory, .ingest-<resource>/, next
+  to a cursor file listing the completed offsets. The cursor is saved off
+  the event loop every CURSOR_SAVE_EVERY pages and whenever a run stops; an
+  interrupted run resumes from it and only requests the missing pages
+- When every page is in, the page files are renamed into the raw directory
+  in one step and the run is appended to ingest_manifest.json (files, rows,
+  bytes, timing); cleaning numbers dumps in manifest order, so a snapshot
+  sorts by offset and after all older dumps whatever the file mtimes are
+- --mock-server serves deterministic synthetic pages (optional latency and
+  injected failures) for local testing
+
+Usage:
+  python ingest.py --resource enrolment=<resource-id> [--api-key KEY] [--concurrency 16]
+  python ingest.py --mock-server [--port 8060] [--rows 200000] [--fail-rate 0.05]
+  python ingest.py --base-url http://127.0.0.1:8060/resource --resource enrolment=mock-enrolment
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import urlopen
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_URL = 'https://api.data.gov.in/resource'
+PAGE_SIZE = 1000
+CONCURRENCY = 8
+RETRIES = 5
+BACKOFF = 0.5            # seconds before the first retry; doubles per attempt
+TIMEOUT = 60             # seconds per request
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MANIFEST = 'ingest_manifest.json'
+CURSOR_SAVE_EVERY = 25   # finished pages between cursor saves
+
+# Raw column layout of each dataset (as read by data_cleaning.py)
+RAW_FIELDS = {
+    'biometric': ['date', 'state', 'district', 'pincode', 'bio_age_5_17', 'bio_age_17_'],
+    'demographic': ['date', 'state', 'district', 'pincode', 'demo_age_5_17', 'demo_age_17_'],
+    'enrolment': ['date', 'state', 'district', 'pincode', 'age_0_5', 'age_5_17', 'age_18_greater'],
+}
+
+
+def raw_dir(dataset, base_dir=SCRIPT_DIR):
+    return os.path.join(base_dir, f"api_data_aadhar_{dataset}")
+
+
+def page_url(base_url, resource, offset, limit, api_key=None):
+    query = {'format': 'json', 'offset': offset, 'limit': limit}
+    if api_key:
+        query['api-key'] = api_key
+    return f"{base_url.rstrip('/')}/{resource}?{urlencode(query)}"
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp, path)
+
+
+# ============================================================================
+# FETCHING
+# ============================================================================
+def _get_json(url, timeout):
+    with urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _retry_after(error, default):
+    try:
+        return float(error.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return default
+
+
+async def fetch_page(url, retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+    """
+    GET one page as JSON, retrying transient failures with exponential backoff.
+
+    Raises the last error once retries are exhausted, or at once for
+    non-retryable HTTP errors (e.g. 403 for a bad API key).
+    """
+    for attempt in range(retries + 1):
+        delay = backoff * 2 ** attempt
+        try:
+            return await asyncio.to_thread(_get_json, url, timeout)
+        except HTTPError as e:
+            if e.code not in RETRYABLE_STATUS or attempt == retries:
+                raise
+            delay = _retry_after(e, delay)
+        except (URLError, OSError, json.JSONDecodeError):
+            if attempt == retries:
+                raise
+        await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def write_page(path, records, fields):
+    """Write one page of records as CSV (temporary name, then rename)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+# ============================================================================
+# RESUMABLE CURSOR
+# ============================================================================
+class IngestCursor:
+    """
+    Progress of one ingestion run, persisted in <staging>/cursor.json.
+
+    Pages complete out of order, so the cursor is the set of finished
+    offsets (with their row and byte counts) rather than a single position.
+    """
+
+    def __init__(self, staging_dir, state):
+        self.staging_dir = staging_dir
+        self.state = state
+        self.unsaved = 0
+        self._saving = asyncio.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.staging_dir, 'cursor.json')
+
+    @classmethod
+    def start(cls, staging_dir, resource, page_size, total, fields):
+        os.makedirs(staging_dir, exist_ok=True)
+        cursor = cls(staging_dir, {
+            'run_id': time.strftime('%Y%m%dT%H%M%S'),
+            'resource': resource,
+            'page_size': page_size,
+            'total': total,
+            'fields': fields,
+            'started': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'done': {},
+        })
+        cursor.save()
+        return cursor
+
+    @classmethod
+    def resume(cls, staging_dir, resource, page_size):
+        """The unfinished run in staging_dir, or None if there is none to resume."""
+        path = os.path.join(staging_dir, 'cursor.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            state = json.load(f)
+        if state['resource'] != resource or state['page_size'] != page_size:
+            print(f"  Discarding unfinished run {state['run_id']} (page size or resource changed)")
+            return None
+        cursor = cls(staging_dir, state)
+        # A page counts only if its file made it to disk
+        state['done'] = {o: info for o, info in state['done'].items()
+                         if os.path.exists(cursor.page_path(int(o)))}
+        return cursor
+
+    def page_path(self, offset):
+        return os.path.join(self.staging_dir, f"page-{offset:09d}.csv")
+
+    def offsets(self):
+        return range(0, self.state['total'], self.state['page_size'])
+
+    def pending(self):
+        return [o for o in self.offsets() if str(o) not in self.state['done']]
+
+    def mark_done(self, offset, rows, size):
+        self.state['done'][str(offset)] = {'rows': rows, 'bytes': size}
+        self.unsaved += 1
+
+    async def checkpoint(self, force=False):
+        """Save the cursor in a worker thread once CURSOR_SAVE_EVERY pages are unsaved (or now if forced)."""
+        if not self.unsaved or (self.unsaved < CURSOR_SAVE_EVERY and not force):
+            return
+        self.unsaved = 0
+        snapshot = {**self.state, 'done': dict(self.state['done'])}
+        async with self._saving:
+            await asyncio.to_thread(_write_json, self.path, snapshot)
+
+    def save(self):
+        self.unsaved = 0
+        _write_json(self.path, self.state)
+
+
+# ============================================================================
+# INGESTION
+# ============================================================================
+def publish(cursor, dataset, out_dir, base_url, elapsed):
+    """Move a finished run's pages into the raw directory and record it in the manifest."""
+    state = cursor.state
+    files = []
+    for offset in cursor.offsets():
+        name = f"{dataset}_{state['run_id']}_{offset:09d}.csv"
+        path = os.path.join(out_dir, name)
+        os.replace(cursor.page_path(offset), path)
+        files.append({'file': name, 'offset': offset, **state['done'][str(offset)]})
+    shutil.rmtree(cursor.staging_dir)
+
+    rows = sum(f['rows'] for f in files)
+    run = {
+        'run_id': state['run_id'],
+        'dataset': dataset,
+        'resource': state['resource'],
+        'base_url': base_url,
+        'started': state['started'],
+        'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'total': state['total'],
+        'rows': rows,
+        'bytes': sum(f['bytes'] for f in files),
+        'page_size': state['page_size'],
+        'seconds': round(elapsed, 2),
+        'files': files,
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {'runs': []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    manifest['runs'].append(run)
+    _write_json(manifest_path, manifest)
+    return run
+
+
+async def ingest_dataset(dataset, resource, limiter, base_dir=SCRIPT_DIR, base_url=BASE_URL,
+                         api_key=None, page_size=PAGE_SIZE, retries=RETRIES, fresh=False):
+    """
+    Pull every page of one resource into api_data_aadhar_<dataset>/.
+
+    Parameters:
+    -----------
+    dataset : str - 'biometric', 'demographic' or 'enrolment'
+    resource : str - API resource id
+    limiter : asyncio.Semaphore - Shared bound on requests in flight
+    fresh : bool - Discard an unfinished run instead of resuming it
+
+    Returns:
+    --------
+    dict: the manifest entry of the run
+    """
+    start = time.perf_counter()
+    out_dir = raw_dir(dataset, base_dir)
+    staging_dir = os.path.join(out_dir, f".ingest-{resource}")
+    os.makedirs(out_dir, exist_ok=True)
+    if fresh and os.path.isdir(staging_dir):
+        shutil.rmtree(staging_dir)
+
+    def url(offset):
+        return page_url(base_url, resource, offset, page_size, api_key)
+
+    async def pull(offset):
+        async with limiter:
+            payload = await fetch_page(url(offset), retries)
+        records = payload.get('records', [])
+        if int(payload.get('total', cursor.state['total'])) != cursor.state['total']:
+            print(f"  Warning: {dataset} total changed during the run (page {offset})")
+        size = await asyncio.to_thread(write_page, cursor.page_path(offset), records, cursor.state['fields'])
+        cursor.mark_done(offset, len(records), size)
+        await cursor.checkpoint()
+
+    cursor = IngestCursor.resume(staging_dir, resource, page_size)
+    if cursor is None:
+        async with limiter:
+            first = await fetch_page(url(0), retries)
+        records = first.get('records', [])
+        fields = list(records[0]) if records else RAW_FIELDS[dataset]
+        missing = set(RAW_FIELDS[dataset]) - set(fields)
+        if missing:
+            print(f"  Warning: {dataset} records lack expected columns {sorted(missing)}")
+        cursor = IngestCursor.start(staging_dir, resource, page_size, int(first.get('total', 0)), fields)
+        if cursor.state['total']:
+            cursor.mark_done(0, len(records), write_page(cursor.page_path(0), records, fields))
+    else:
+        print(f"  Resuming {dataset} run {cursor.state['run_id']}: "
+              f"{len(cursor.state['done']):,} of {len(cursor.offsets()):,} pages done")
+
+    pending = cursor.pending()
+    print(f"  {dataset}: {cursor.state['total']:,} records, {len(pending):,} page(s) to fetch")
+    try:
+        await asyncio.gather(*(pull(offset) for offset in pending))
+    finally:
+        # Pages that made it to disk stay done for the next run
+        await cursor.checkpoint(force=True)
+
+    run = publish(cursor, dataset, out_dir, base_url, time.perf_counter() - start)
+    print(f"[OK] {dataset}: {run['rows']:,} rows in {len(run['files']):,} part file(s) "
+          f"({run['bytes'] / 1e6:.1f} MB, {run['seconds']:.1f}s) -> {out_dir}")
+    return run
+
+
+async def ingest_all(resources, concurrency=CONCURRENCY, **kwargs):
+    """Ingest several datasets at once; all share one concurrency limit."""
+    limiter = asyncio.Semaphore(concurrency)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 1))
+    return await asyncio.gather(*(ingest_dataset(dataset, resource, limiter, **kwargs)
+                                  for dataset, resource in resources.items()))
+
+
+# ============================================================================
+# MOCK SERVER
+# ============================================================================
+MOCK_PLACES = [
+    ('Bihar', 'Patna', 800001), ('Bihar', 'Gaya', 823001), ('Delhi', 'New Delhi', 110001),
+    ('Gujarat', 'Ahmedabad', 380001), ('Rajasthan', 'Jaipur', 302001),
+    ('West Bengal', 'Kolkata', 700001), ('Jammu and Kashmir', 'Srinagar', 190001),
+]
+
+
+def mock_records(dataset, n_rows, seed=0):
+    """Deterministic synthetic raw rows for a dataset, as column arrays."""
+    rng = np.random.default_rng(seed)
+    place = rng.integers(0, len(MOCK_PLACES), n_rows)
+    dates = np.datetime64('2025-03-01') + rng.integers(0, 300, n_rows).astype('timedelta64[D]')
+    columns = {
+        'date': np.datetime_as_string(dates).astype(object),
+        'state': np.array([p[0] for p in MOCK_PLACES], dtype=object)[place],
+        'district': np.array([p[1] for p in MOCK_PLACES], dtype=object)[place],
+        'pincode': np.array([p[2] for p in MOCK_PLACES])[place] + rng.integers(0, 60, n_rows),
+    }
+    # dd-mm-yyyy, as in the published dumps
+    columns['date'] = np.array([f"{d[8:10]}-{d[5:7]}-{d[:4]}" for d in columns['date']], dtype=object)
+    for field in RAW_FIELDS[dataset][4:]:
+        columns[field] = rng.poisson(20, n_rows)
+    return columns
+
+
+def make_mock_handler(n_rows, latency=0.0, fail_rate=0.0, seed=0):
+    """Request handler serving /resource/mock-<dataset>?offset=&limit= pages."""
+    data = {dataset: {field: values.tolist() for field, values in mock_records(dataset, n_rows, seed).items()}
+            for dataset in RAW_FIELDS}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=()):
+            body = json.dumps(payload, separators=(',', ':')).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            dataset = url.path.rstrip('/').rsplit('/', 1)[-1].removeprefix('mock-')
+            if not url.path.startswith('/resource/') or dataset not in data:
+                self._send(404, {'error': f"Unknown resource: {url.path}"})
+                return
+            if latency:
+                time.sleep(latency)
+            if random.random() < fail_rate:
+                self._send(503, {'error': 'injected failure'}, [('Retry-After', '0.1')])
+                return
+            offset, limit = int(query.get('offset', 0)), int(query.get('limit', 10))
+            columns = data[dataset]
+            stop = min(offset + limit, n_rows)
+            fields = RAW_FIELDS[dataset]
+            records = [dict(zip(fields, row))
+                       for row in zip(*(columns[field][offset:stop] for field in fields))]
+            self._send(200, {'total': n_rows, 'count': len(records), 'offset': offset,
+                             'limit': limit, 'records': records})
+
+    return Handler
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve_mock(host='127.0.0.1', port=8060, n_rows=100_000, latency=0.0, fail_rate=0.0):
+    server = MockServer((host, port), make_mock_handler(n_rows, latency, fail_rate))
+    print(f"[OK] Mock API on http://{host}:{port}/resource/mock-<dataset> "
+          f"({n_rows:,} rows per dataset, latency {latency * 1000:.0f} ms, fail rate {fail_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paged ingestion from the Aadhaar open-data API")
+    parser.add_argument('--resource', action='append', default=[], metavar='DATASET=ID',
+                        help=f"Dataset and API resource id to ingest ({', '.join(RAW_FIELDS)}); repeatable")
+    parser.add_argument('--api-key', default=os.environ.get('UIDAI_API_KEY'),
+                        help="API key (default: $UIDAI_API_KEY)")
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--base-dir', default=SCRIPT_DIR, help="Directory holding api_data_aadhar_*")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="Requests in flight")
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    parser.add_argument('--fresh', action='store_true', help="Discard unfinished runs instead of resuming")
+    parser.add_argument('--mock-server', action='store_true', help="Serve synthetic pages instead")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--rows', type=int, default=100_000, help="Mock rows per dataset")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mock seconds per request")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Mock share of 503 responses")
+    args = parser.parse_args()
+
+    if args.mock_server:
+        serve_mock(args.host, args.port, args.rows, args.latency, args.fail_rate)
+        return
+
+    resources = dict(r.split('=', 1) for r in args.resource)
+    unknown = set(resources) - set(RAW_FIELDS)
+    if not resources or unknown:
+        parser.error(f"--resource DATASET=ID is required (datasets: {', '.join(RAW_FIELDS)})")
+
+    print(f"\n{'='*60}")
+    print(f"INGESTING {len(resources)} dataset(s) from {args.base_url} (concurrency {args.concurrency})")
+    print('='*60)
+    try:
+        asyncio.run(ingest_all(resources, args.concurrency, base_dir=args.base_dir, base_url=args.base_url,
+                               api_key=args.api_key, page_size=args.page_size, retries=args.retries,
+                               fresh=args.fresh))
+    except (URLError, OSError, ValueError) as e:
+        raise SystemExit(f"Ingestion stopped: {e}\nCompleted pages are kept; run the same command again to resume.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+"""
+Batch Static Export for the Interactive Maps
+============================================
+Renders every Dataset x Metric view of a dropdown-driven map figure
+(indiafinal.py, borderenroll2.py) to static images.
+- Replays the dropdown button args on a copy of the figure
+- Reuses one Kaleido renderer process for all images
+- Reports per-image timings and failures instead of swallowing them
+
+Also writes the interactive HTML in a sharded form: only the initial view
+is inline, and each Dataset x Metric payload is a JSON shard fetched on
+first selection and cached in the page. Slider step payloads (e.g. the
+date-range windows) go to one shard per dataset and slider the same way.
+"""
+
+import copy
+import json
+import os
+import time
+
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+
+def _button_parts(button, n_traces):
+    """Split a button's args into (trace_style, layout_update, trace_indices)."""
+    method = button.get('method', 'update')
+    args = list(button.get('args', []))
+    trace_style = args[0] if args and method in ('update', 'restyle') else {}
+    layout_update = args[1] if method == 'update' and len(args) > 1 else {}
+    if method == 'relayout' and args:
+        layout_update = args[0]
+    trace_indices = args[2] if method == 'update' and len(args) > 2 else None
+    if method == 'restyle' and len(args) > 1:
+        trace_indices = args[1]
+
+    if trace_indices is None:
+        trace_indices = list(range(n_traces))
+    elif isinstance(trace_indices, int):
+        trace_indices = [trace_indices]
+    return trace_style or {}, layout_update or {}, list(trace_indices)
+
+
+def _trace_values(trace_style, trace_indices):
+    """Per-trace property values of a trace update: {trace_idx: {prop: value}}."""
+    values = {idx: {} for idx in trace_indices}
+    for prop, value in trace_style.items():
+        if isinstance(value, (list, tuple)):
+            # One value per targeted trace
+            for trace_idx, trace_value in zip(trace_indices, value):
+                if trace_value is not None:
+                    values[trace_idx][prop] = trace_value
+        else:
+            for trace_idx in trace_indices:
+                values[trace_idx][prop] = value
+    return values
+
+
+def apply_button(fig, button, menu_index=None, button_index=None):
+    """
+    Apply an updatemenu button's args to a figure, the way plotly.js would.
+
+    Only the "update", "restyle" and "relayout" methods used by the map
+    scripts are supported. A None entry in a per-trace list leaves that
+    trace untouched.
+
+    Parameters:
+    -----------
+    fig : go.Figure - Figure to modify in place
+    button : dict - Button definition (method + args)
+    menu_index, button_index : int - If given, mark the button as active so
+                               the dropdown label matches the exported view
+    """
+    trace_style, layout_update, trace_indices = _button_parts(button, len(fig.data))
+
+    for trace_idx, props in _trace_values(trace_style, trace_indices).items():
+        for prop, value in props.items():
+            fig.data[trace_idx][prop] = value
+
+    for prop, value in layout_update.items():
+        fig.layout[prop] = value
+
+    if menu_index is not None and button_index is not None:
+        fig.layout.updatemenus[menu_index].active = button_index
+
+
+def iter_views(fig, dataset_menu=0, metric_menu=1):
+    """
+    Yield (dataset_label, metric_label, figure) for every dropdown combination.
+
+    Each yielded figure is an independent copy; the input figure is not changed.
+    """
+    menus = fig.layout.updatemenus
+    dataset_buttons = menus[dataset_menu].buttons
+    metric_buttons = menus[metric_menu].buttons
+
+    for d_idx, d_button in enumerate(dataset_buttons):
+        for m_idx, m_button in enumerate(metric_buttons):
+            view = copy.deepcopy(fig)
+            apply_button(view, d_button.to_plotly_json(), dataset_menu, d_idx)
+            apply_button(view, m_button.to_plotly_json(), metric_menu, m_idx)
+            yield d_button.label, m_button.label, view
+
+
+def _slug(text):
+    """Filesystem-safe lowercase name for a dropdown label."""
+    return ''.join(c if c.isalnum() else '_' for c in str(text).lower()).strip('_')
+
+
+def _start_renderer():
+    """
+    Start a persistent Kaleido renderer if the installed version needs one.
+
+    Kaleido >= 1.0 launches a fresh browser per write_image call unless a
+    sync server is running. Kaleido 0.2.x keeps its own scope alive, so
+    nothing needs starting. Returns a callable that stops the renderer.
+    """
+    try:
+        import kaleido
+    except ImportError:
+        return lambda: None
+
+    if hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server(silence_warnings=True)
+        return kaleido.stop_sync_server
+    return lambda: None
+
+
+def export_all_views(fig, output_dir, prefix, formats=('png', 'svg'),
+                     dataset_menu=0, metric_menu=1,
+                     scale=2, width=1600, height=1200):
+    """
+    Export every Dataset x Metric view of a map figure.
+
+    Parameters:
+    -----------
+    fig : go.Figure - Map figure with dataset and metric dropdowns
+    output_dir : str - Directory for the exported images
+    prefix : str - File name prefix (e.g., 'india_map')
+    formats : tuple - Image formats to write ('png', 'svg', 'pdf', ...)
+    dataset_menu, metric_menu : int - Indices of the two updatemenus
+
+    Returns:
+    --------
+    list of dicts: [{'file': path, 'seconds': t, 'error': str or None}, ...]
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+
+    try:
+        stop_renderer = _start_renderer()
+    except Exception as e:
+        print(f"[ERROR] Could not start image renderer: {e}")
+        return results
+
+    try:
+        for dataset_label, metric_label, view in iter_views(fig, dataset_menu, metric_menu):
+            for fmt in formats:
+                file_name = f"{prefix}_{_slug(dataset_label)}_{_slug(metric_label)}.{fmt}"
+                output_file = os.path.join(output_dir, file_name)
+                start = time.perf_counter()
+                error = None
+                try:
+                    pio.write_image(view, output_file, format=fmt,
+                                    scale=scale, width=width, height=height)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                results.append({
+                    'file': output_file,
+                    'seconds': time.perf_counter() - start,
+                    'error': error,
+                })
+    finally:
+        stop_renderer()
+
+    print_export_report(results)
+    return results
+
+
+def print_export_report(results):
+    """Print timings and failures for a batch export."""
+    failed = [r for r in results if r['error']]
+    total_time = sum(r['seconds'] for r in results)
+
+    print(f"\n{'='*60}")
+    print("BATCH IMAGE EXPORT")
+    print('='*60)
+    for r in results:
+        status = 'FAIL' if r['error'] else 'OK'
+        print(f"  [{status}] {os.path.basename(r['file'])} ({r['seconds']:.2f}s)")
+        if r['error']:
+            print(f"         {r['error']}")
+    print(f"\n  Images: {len(results) - len(failed)}/{len(results)} written "
+          f"in {total_time:.1f}s")
+    if failed:
+        print(f"  Failures: {len(failed)} (see errors above)")
+
+
+# ============================================================================
+# SHARDED HTML (LAZY DATASET PAYLOADS)
+# ============================================================================
+_SHARD_SCRIPT = """
+(function() {
+    var gd = document.getElementById('{plot_id}');
+    var cfg = %s;
+    var cache = {};    // shard file -> promise of payload
+    var applied = {};  // trace index -> dataset button whose payload it shows
+    var current = cfg.active;
+    var steps = {};    // slider index -> active step, for the current dataset
+    cfg.initial.forEach(function(t) { applied[t] = current; });
+
+    function load(file) {
+        if (!cache[file]) {
+            cache[file] = fetch(cfg.dir + '/' + file).then(function(r) {
+                if (!r.ok) { throw new Error(file + ': HTTP ' + r.status); }
+                return r.json();
+            });
+            cache[file].catch(function() { delete cache[file]; });
+        }
+        return cache[file];
+    }
+
+    function refresh() {
+        var idx = current;
+        var files = cfg.shards[idx];
+        Object.keys(files).forEach(function(key) {
+            var t = +key;
+            if (applied[t] === idx || gd.data[t].visible === false) { return; }
+            applied[t] = idx;
+            load(files[key]).then(function(payload) {
+                if (current !== idx) {
+                    if (applied[t] === idx) { delete applied[t]; }
+                    return;
+                }
+                var update = {};
+                Object.keys(payload).forEach(function(prop) { update[prop] = [payload[prop]]; });
+                Plotly.restyle(gd, update, [t]).then(function() {
+                    // Keep a selected slider step (e.g. a date window) over the dataset payload
+                    Object.keys(steps).forEach(function(s) { if (steps[s]) { applyStep(+s); } });
+                });
+            }).catch(function(err) {
+                delete applied[t];
+                console.error('Map shard failed to load (serve the page over HTTP):', err);
+            });
+        });
+    }
+
+    function applyStep(s) {
+        var file = (cfg.sliders[current] || {})[s];
+        if (!file) { return; }
+        var idx = current, k = steps[s];
+        load(file).then(function(payload) {
+            var step = payload[k];
+            if (current !== idx || steps[s] !== k || !step || step.method === 'skip') { return; }
+            Plotly[step.method].apply(null, [gd].concat(step.args));
+        }).catch(function(err) {
+            console.error('Slider shard failed to load (serve the page over HTTP):', err);
+        });
+    }
+
+    gd.on('plotly_buttonclicked', function(e) {
+        if (e.menu._index === cfg.menu) { current = e.active; steps = {}; }
+        refresh();
+    });
+
+    gd.on('plotly_sliderchange', function(e) {
+        steps[e.slider._index] = e.step._index;
+        applyStep(e.slider._index);
+    });
+})();
+"""
+
+
+def _write_shard(shard_dir, file_name, payload):
+    """Write one JSON shard, returning its size in bytes."""
+    path = os.path.join(shard_dir, file_name)
+    with open(path, 'w') as f:
+        json.dump(payload, f, cls=PlotlyJSONEncoder, separators=(',', ':'))
+    return os.path.getsize(path)
+
+
+def _strip_steps(steps):
+    """Split slider steps into (per-step method/args payload, steps that only fire events)."""
+    payload, stripped = [], []
+    for step in steps:
+        payload.append(dict(method=step.get('method', 'restyle'), args=step.get('args', [])))
+        stripped.append({**step, 'method': 'skip', 'args': [None]})
+    return payload, stripped
+
+
+def write_sharded_html(fig, html_path, dataset_menu=0, config=None):
+    """
+    Write the map HTML with per-view data shards loaded on demand.
+
+    The dataset dropdown's trace updates are moved out of the page into
+    <html name>_shards/<dataset>_<metric>.json (one file per dataset and
+    trace). Only the visible traces of the initial view keep their data
+    inline, so page weight does not grow with the number of views. Slider
+    steps, both in the layout and in each dataset button's layout update,
+    move to <dataset>_slider<n>.json and only fire events inline. Shards
+    are fetched on first selection and cached, which needs the page to be
+    served over HTTP (e.g. python -m http.server) rather than opened as a file.
+
+    Parameters:
+    -----------
+    fig : go.Figure - Map figure with a dataset dropdown (not modified)
+    html_path : str - Output HTML path
+    dataset_menu : int - Index of the dataset updatemenu
+    config : dict - Plotly config passed to write_html
+
+    Returns:
+    --------
+    str: shard directory
+    """
+    fig = copy.deepcopy(fig)
+    menu = fig.layout.updatemenus[dataset_menu]
+    active = menu.active or 0
+
+    # Label traces by the metric button that shows them, for readable shard names
+    trace_labels = {}
+    for other_idx, other in enumerate(fig.layout.updatemenus):
+        if other_idx == dataset_menu:
+            continue
+        for button in other.buttons:
+            visible = (button.args[0] or {}).get('visible') if button.args else None
+            if isinstance(visible, (list, tuple)):
+                for trace_idx, is_visible in enumerate(visible):
+                    if is_visible is True:
+                        trace_labels.setdefault(trace_idx, set()).add(button.label)
+    trace_labels = {t: labels.pop() for t, labels in trace_labels.items() if len(labels) == 1}
+
+    base = os.path.splitext(html_path)[0]
+    shard_dir = base + '_shards'
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shards, slider_shards, shard_bytes, stripped = [], [], 0, set()
+    buttons = []
+    for b_idx, button in enumerate(menu.buttons):
+        spec = button.to_plotly_json()
+        trace_style, layout_update, trace_indices = _button_parts(spec, len(fig.data))
+        files = {}
+        for trace_idx, payload in _trace_values(trace_style, trace_indices).items():
+            if not payload:
+                continue
+            metric = trace_labels.get(trace_idx, f"trace{trace_idx}")
+            file_name = f"{_slug(button.label)}_{_slug(metric)}.json"
+            shard_bytes += _write_shard(shard_dir, file_name, payload)
+            files[trace_idx] = file_name
+            if fig.data[trace_idx].visible is False:
+                stripped.update((trace_idx, prop) for prop in payload)
+        shards.append(files)
+
+        # Slider steps swapped in by this button fire events only; their data is a shard
+        slider_files = {}
+        for s_idx, slider in enumerate(layout_update.get('sliders') or []):
+            payload, slider['steps'] = _strip_steps(slider.get('steps', []))
+            file_name = f"{_slug(button.label)}_slider{s_idx}.json"
+            shard_bytes += _write_shard(shard_dir, file_name, payload)
+            slider_files[s_idx] = file_name
+        slider_shards.append(slider_files)
+
+        # The button keeps only its layout change; trace data comes from the shards
+        if layout_update:
+            buttons.append(dict(label=button.label, method='relayout', args=[layout_update]))
+        else:
+            buttons.append(dict(label=button.label, method='skip', args=[None]))
+
+    # Hidden traces start empty and are filled from their shard when shown
+    for trace_idx, prop in stripped:
+        fig.data[trace_idx][prop] = None
+    menu.buttons = buttons
+
+    # The initial sliders belong to the active dataset; reuse its shard when it has one
+    sliders = []
+    for s_idx, slider in enumerate(fig.layout.sliders):
+        slider = slider.to_plotly_json()
+        payload, slider['steps'] = _strip_steps(slider.get('steps', []))
+        if s_idx not in slider_shards[active]:
+            file_name = f"{_slug(menu.buttons[active].label)}_slider{s_idx}.json"
+            shard_bytes += _write_shard(shard_dir, file_name, payload)
+            slider_shards[active][s_idx] = file_name
+        sliders.append(slider)
+    fig.layout.sliders = sliders
+
+    initial = [t for t in shards[active] if fig.data[t].visible is not False]
+    manifest = {
+        'dir': os.path.basename(shard_dir),
+        'menu': dataset_menu,
+        'active': active,
+        'initial': initial,
+        'shards': [{str(t): f for t, f in files.items()} for files in shards],
+        'sliders': [{str(s): f for s, f in files.items()} for files in slider_shards],
+    }
+    fig.write_html(html_path, config=config,
+                   post_script=_SHARD_SCRIPT % json.dumps(manifest, separators=(',', ':')))
+
+    n_shards = sum(len(files) for files in shards + slider_shards)
+    print(f"[OK] Sharded HTML: {os.path.getsize(html_path) / 1024:.0f} KB inline, "
+          f"{n_shards} shards ({shard_bytes / 1024:.0f} KB) in {shard_dir}")
+    return shard_dir
@@ -0,0 +1,119 @@
+"""
+Shared Dataset Loading & Metric Normalization
+=============================================
+Common definitions for the analysis modules built on the cleaned store:
+- Dataset names and their cleaned part-file patterns
+- Column mappings to the normalized metrics (norm_total, norm_0_5, ...)
+- A loader that concatenates all part files of a dataset
+- The norm_* metrics either added as columns or as a copy-free projection
+  (metric_view) that shares the loaded frame's column buffers
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "cleaned_data")
+
+# Dataset name -> cleaned part-file base name
+DATASETS = {
+    'Enrolment': 'enrolment_cleaned',
+    'Biometric': 'biometric_cleaned',
+    'Demographic': 'demographic_cleaned',
+}
+
+# Normalized metric columns, in METRICS_CONFIG order
+METRIC_COLUMNS = ['norm_total', 'norm_0_5', 'norm_5_17', 'norm_18_plus']
+
+# Column Mappings for each file type
+COLUMN_MAPS = {
+    'Enrolment': {'total': 'total_enrolment', '0-5': 'age_0_5', '5-17': 'age_5_17', '18+': 'age_18_greater'},
+    'Biometric': {'total': 'total_updates', '0-5': None, '5-17': 'bio_age_5_17', '18+': 'bio_age_17_'},
+    'Demographic': {'total': 'total_updates', '0-5': None, '5-17': 'demo_age_5_17', '18+': 'demo_age_17_'}
+}
+
+
+def part_files(dataset_name, data_dir=DATA_DIR):
+    """Sorted list of cleaned part files for a dataset."""
+    pattern = os.path.join(data_dir, f"{DATASETS[dataset_name]}_part*.csv")
+    return sorted(glob.glob(pattern))
+
+
+def load_cleaned(dataset_name, data_dir=DATA_DIR, usecols=None):
+    """
+    Load and concatenate all cleaned part files of a dataset.
+
+    Returns None (with a warning) if no part files exist.
+    """
+    files = part_files(dataset_name, data_dir)
+    if not files:
+        print(f"Warning: No files found for {dataset_name}")
+        return None
+    print(f"  - Loading {dataset_name} ({len(files)} files)...")
+    dfs = [pd.read_csv(f, usecols=usecols, dtype={'pincode': str}) for f in files]
+    return pd.concat(dfs, ignore_index=True)
+
+
+def norm_columns(df, dataset_name):
+    """
+    The norm_* metrics of a cleaned dataset frame, without copying it.
+
+    Metrics that exist as dataset columns are those columns; a metric the
+    dataset does not have (norm_0_5 of the update datasets) is a zero-stride
+    array of zeros. Only a missing total allocates: the column-wise sum of
+    the age groups (cleaned counts are never missing).
+
+    Returns:
+    --------
+    dict: metric name -> pd.Series aligned to df, in METRIC_COLUMNS order
+    """
+    mapping = COLUMN_MAPS[dataset_name]
+    age_cols = [mapping[k] for k in ('0-5', '5-17', '18+') if mapping[k]]
+
+    if mapping['total'] in df.columns:
+        total = df[mapping['total']]
+    else:
+        total = df[age_cols[0]]
+        for col in age_cols[1:]:
+            total = total + df[col]
+    zeros = pd.Series(np.broadcast_to(np.int64(0), len(df)), index=df.index, copy=False)
+    return {
+        'norm_total': total,
+        'norm_0_5': df[mapping['0-5']] if mapping['0-5'] else zeros,
+        'norm_5_17': df[mapping['5-17']],
+        'norm_18_plus': df[mapping['18+']],
+    }
+
+
+def add_norm_columns(df, dataset_name):
+    """
+    Add the norm_* metric columns to a cleaned dataset frame (in place).
+
+    The total is the dataset's total column when present, otherwise the
+    sum of its age-group columns.
+    """
+    norms = norm_columns(df, dataset_name)
+    if not COLUMN_MAPS[dataset_name]['0-5']:
+        norms['norm_0_5'] = 0  # a writable column, not the read-only zero-stride one
+    for name, values in norms.items():
+        df[name] = values
+    return df
+
+
+def metric_view(df, dataset_name, columns=('date', 'state', 'district', 'pincode')):
+    """
+    Project a cleaned dataset frame onto key columns plus the norm_* metrics.
+
+    The projection is built with copy=False, so its columns share df's
+    buffers and only a computed total is new memory. Treat the shared
+    columns as read-only: derive new columns by assignment (which replaces
+    the column) and drop df once the projection is built.
+
+    Returns:
+    --------
+    pd.DataFrame with columns: *columns, norm_total, norm_0_5, norm_5_17, norm_18_plus
+    """
+    return pd.DataFrame({**{c: df[c] for c in columns}, **norm_columns(df, dataset_name)}, copy=False)
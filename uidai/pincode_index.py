@@ -0,0 +1,249 @@
+"""
+Pincode Prefix Roll-ups
+=======================
+Pincode prefixes follow the postal hierarchy (2 digits: postal region,
+3 digits: sorting district, 6 digits: delivery office), which sits between
+the exact-pincode hotspots and the whole-state totals of the maps.
+- One pass over integer pincodes: exact pincodes are aggregated once, then
+  every coarser level comes from integer division and np.add.reduceat
+  over the already-sorted keys (no string slicing, no regroup)
+- Each prefix carries its dominant state (by rows) and, for exact pincodes,
+  its dominant district
+- Prefix totals are index lookups; drilling down to a finer level is a
+  searchsorted range over the sorted child keys
+- Cached per dataset as <base>_pincode_rollup.csv, rebuilt when a cleaned
+  part file is newer
+
+Usage:
+  python pincode_index.py [--dataset Enrolment] [--prefix 80] [--metric norm_total]
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from hotspots import top_k_per_group
+from metrics import DATA_DIR, DATASETS, METRIC_COLUMNS, add_norm_columns, load_cleaned, part_files
+
+PREFIX_DIGITS = (2, 3, 4, 6)
+PINCODE_DIGITS = 6
+
+
+def _weighted_mode(groups, codes, weights):
+    """Per group, the code with the largest total weight (ties -> smallest code)."""
+    n_codes = int(codes.max()) + 1
+    pairs, inverse = np.unique(groups * n_codes + codes, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights)
+    order = np.lexsort((-totals, pairs // n_codes))
+    pair_groups = pairs[order] // n_codes
+    first = np.r_[True, pair_groups[1:] != pair_groups[:-1]]
+    return pairs[order][first] % n_codes
+
+
+class PincodeRollup:
+    """
+    Metric totals per pincode prefix at 2-, 3-, 4- and 6-digit levels.
+
+    levels[d] is a DataFrame indexed by the integer prefix (sorted) with
+    columns: state, [district,] pincodes, records and one per metric.
+    """
+
+    def __init__(self, levels, metrics=METRIC_COLUMNS):
+        self.levels = levels
+        self.metrics = list(metrics)
+
+    @classmethod
+    def from_frame(cls, df, state_col='state', metrics=METRIC_COLUMNS):
+        """Build every level from rows with state_col, 'district', 'pincode' and the metrics."""
+        pins = pd.to_numeric(df['pincode'], errors='coerce').to_numpy()
+        valid = ~np.isnan(pins)
+        pins = pins[valid].astype(np.int64)
+
+        # Exact pincodes: one unique + bincount per metric
+        keys, inverse = np.unique(pins, return_inverse=True)
+        records = np.bincount(inverse, minlength=len(keys)).astype(float)
+        values = np.column_stack([
+            np.bincount(inverse, weights=np.nan_to_num(df[m].to_numpy(dtype=float)[valid]),
+                        minlength=len(keys))
+            for m in metrics
+        ])
+        state_codes, states = pd.factorize(df[state_col].to_numpy()[valid])
+        district_codes, districts = pd.factorize(df['district'].to_numpy()[valid])
+        pin_state = _weighted_mode(inverse, state_codes, np.ones(len(pins)))
+        pin_district = _weighted_mode(inverse, district_codes, np.ones(len(pins)))
+
+        levels = {}
+        for digits in sorted(PREFIX_DIGITS, reverse=True):
+            prefix = keys // 10 ** (PINCODE_DIGITS - digits)
+            # keys are sorted, so each prefix is a contiguous run
+            starts = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            sizes = np.diff(np.r_[starts, len(prefix)])
+            run = np.repeat(np.arange(len(starts)), sizes)
+            level = pd.DataFrame({
+                'state': states[_weighted_mode(run, pin_state, records)],
+                'district': districts[pin_district] if digits == PINCODE_DIGITS else None,
+                'pincodes': sizes,
+                'records': np.add.reduceat(records, starts).astype(np.int64),
+            }, index=pd.Index(prefix[starts], name='prefix'))
+            level[metrics] = np.add.reduceat(values, starts, axis=0)
+            levels[digits] = level if digits == PINCODE_DIGITS else level.drop(columns='district')
+        return cls(levels, metrics)
+
+    @staticmethod
+    def _digits(prefix, digits=None):
+        return digits or len(str(prefix))
+
+    def lookup(self, prefix, digits=None):
+        """
+        Totals of one prefix, e.g. lookup(80) or lookup('800001').
+
+        Returns:
+        --------
+        pd.Series (state, pincodes, records, metrics), or None if unseen
+        """
+        digits = self._digits(prefix, digits)
+        level = self.levels[digits]
+        prefix = int(prefix)
+        return level.loc[prefix] if prefix in level.index else None
+
+    def children(self, prefix, digits=None, child_digits=None):
+        """
+        Rows of the next (or a given) finer level that lie under a prefix.
+
+        The child keys are sorted, so this is a searchsorted range, not a filter.
+        """
+        digits = self._digits(prefix, digits)
+        finer = [d for d in PREFIX_DIGITS if d > digits]
+        if not finer:
+            return self.levels[digits].iloc[:0]
+        child_digits = child_digits or finer[0]
+        scale = 10 ** (child_digits - digits)
+        level = self.levels[child_digits]
+        lo, hi = np.searchsorted(level.index.to_numpy(), [int(prefix) * scale, (int(prefix) + 1) * scale])
+        return level.iloc[lo:hi]
+
+    def top_prefixes(self, metric='norm_total', digits=3, k=3, states=None):
+        """
+        The k busiest prefixes of a level per state, each with its busiest pincode.
+
+        Returns:
+        --------
+        pd.DataFrame with columns: state, rank, prefix, value, pincode,
+        district, pincode_value
+        """
+        level = self.levels[digits].reset_index()
+        if states is not None:
+            level = level[level['state'].isin(states)]
+        top = top_k_per_group(level[level[metric] > 0], 'state', metric, k)
+
+        # Drill each prefix to its busiest exact pincode (one per prefix, vectorised)
+        pins = self.levels[PINCODE_DIGITS].reset_index()
+        pins['parent'] = pins['prefix'] // 10 ** (PINCODE_DIGITS - digits)
+        best = top_k_per_group(pins[pins['parent'].isin(top['prefix'])], 'parent', metric, 1)
+        best = best.set_index('parent')
+        return pd.DataFrame({
+            'state': top['state'].to_numpy(),
+            'rank': top['rank'].to_numpy(),
+            'prefix': top['prefix'].to_numpy(),
+            'value': top[metric].to_numpy(),
+            'pincode': best['prefix'].reindex(top['prefix']).to_numpy(),
+            'district': best['district'].reindex(top['prefix']).to_numpy(),
+            'pincode_value': best[metric].reindex(top['prefix']).to_numpy(),
+        }).sort_values(['state', 'rank'], ignore_index=True)
+
+    def save(self, path):
+        frames = [level.reset_index().assign(digits=d) for d, level in self.levels.items()]
+        pd.concat(frames, ignore_index=True).to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path, metrics=METRIC_COLUMNS):
+        table = pd.read_csv(path)
+        levels = {}
+        for d in PREFIX_DIGITS:
+            level = table[table['digits'] == d].drop(columns='digits').set_index('prefix')
+            if d != PINCODE_DIGITS:
+                level = level.drop(columns='district')
+            levels[d] = level
+        return cls(levels, metrics)
+
+
+def prefix_tooltips(rollup, metric, digits=3, k=3):
+    """
+    One HTML list per state, e.g. '1. 800xxx: 12,301 (top 800001, Patna)<br>2. ...'.
+
+    Returns:
+    --------
+    dict: state -> tooltip string
+    """
+    top = rollup.top_prefixes(metric, digits, k)
+    if top.empty:
+        return {}
+    mask = 'x' * (PINCODE_DIGITS - digits)
+    text = (top['rank'].astype(str) + '. ' + top['prefix'].astype(str) + mask + ': '
+            + top['value'].map('{:,.0f}'.format) + ' (top ' + top['pincode'].astype(str)
+            + ', ' + top['district'].astype(str) + ')')
+    return text.groupby(top['state']).agg('<br>'.join).to_dict()
+
+
+def _rollup_path(dataset_name, data_dir):
+    return os.path.join(data_dir, f"{DATASETS[dataset_name]}_pincode_rollup.csv")
+
+
+def build_pincode_rollup(dataset_name, data_dir=DATA_DIR):
+    """Build and save a dataset's prefix roll-up; None if it has no part files."""
+    df = load_cleaned(dataset_name, data_dir)
+    if df is None:
+        return None
+    add_norm_columns(df, dataset_name)
+    rollup = PincodeRollup.from_frame(df)
+    rollup.save(_rollup_path(dataset_name, data_dir))
+    sizes = ', '.join(f"{len(rollup.levels[d]):,} x {d}-digit" for d in PREFIX_DIGITS)
+    print(f"[OK] Pincode roll-up built for {dataset_name}: {sizes}")
+    return rollup
+
+
+def load_pincode_rollup(dataset_name, data_dir=DATA_DIR):
+    """Load a dataset's prefix roll-up, rebuilding it if the cleaned store is newer."""
+    path = _rollup_path(dataset_name, data_dir)
+    sources = part_files(dataset_name, data_dir)
+    if os.path.exists(path) and all(os.path.getmtime(f) <= os.path.getmtime(path) for f in sources):
+        return PincodeRollup.load(path)
+    return build_pincode_rollup(dataset_name, data_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pincode prefix roll-ups and drill-down")
+    parser.add_argument('--dataset', choices=list(DATASETS), default='Enrolment')
+    parser.add_argument('--metric', choices=METRIC_COLUMNS, default='norm_total')
+    parser.add_argument('--prefix', help="Prefix to drill into (2-6 digits); omit for all regions")
+    parser.add_argument('--top', type=int, default=15, help="Rows to print")
+    args = parser.parse_args()
+
+    rollup = load_pincode_rollup(args.dataset)
+    if rollup is None:
+        raise FileNotFoundError(f"No cleaned data found for {args.dataset} in {DATA_DIR}")
+
+    columns = ['state', 'pincodes', 'records', args.metric]
+    print(f"\n{'='*60}")
+    if args.prefix:
+        row = rollup.lookup(args.prefix)
+        if row is None:
+            print(f"Prefix {args.prefix} not found.")
+            return
+        print(f"{args.dataset} prefix {args.prefix}: {row[args.metric]:,.0f} "
+              f"({row['state']}, {row['pincodes']} pincodes)")
+        print('='*60)
+        rows = rollup.children(args.prefix)
+        if 'district' in rows.columns:
+            columns.insert(1, 'district')
+    else:
+        print(f"{args.dataset}: postal regions ({PREFIX_DIGITS[0]}-digit prefixes)")
+        print('='*60)
+        rows = rollup.levels[PREFIX_DIGITS[0]]
+    print(rows.nlargest(args.top, args.metric)[columns].to_string(float_format='{:,.0f}'.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Preview Mode (Stratified Sample)
+================================
+Lets the exploratory scripts run against the small stratified sample that
+data_cleaning.py writes next to each cleaned dataset (<base>_preview.csv).
+- Enabled with --preview on the command line or UIDAI_PREVIEW=1
+- Count columns are scaled by the sampling weights, so totals estimate
+  the full dataset without any change to the plotting code
+- Standard errors of state-level totals for error bars
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from metrics import COLUMN_MAPS, DATA_DIR, DATASETS
+
+PREVIEW = '--preview' in sys.argv or os.environ.get('UIDAI_PREVIEW') == '1'
+
+STRATUM_COLS = ['state', 'month']
+
+
+def count_columns(base_name, columns):
+    """Count (age-group) columns of a dataset that are present in a frame."""
+    dataset = {v: k for k, v in DATASETS.items()}[base_name]
+    return [c for c in COLUMN_MAPS[dataset].values() if c and c in columns]
+
+
+def load_preview_csv(base_name, data_dir=DATA_DIR):
+    """
+    Load a dataset's preview sample with counts scaled to population totals.
+
+    Each count column y is replaced by sample_weight * y (Horvitz-Thompson),
+    so plain sums over the frame estimate full-dataset totals.
+    """
+    path = os.path.join(data_dir, f"{base_name}_preview.csv")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No preview sample for {base_name}; re-run data_cleaning.py")
+
+    df = pd.read_csv(path)
+    print(f"[PREVIEW] {base_name}: {len(df):,} sampled rows "
+          f"(represents {int(df['stratum_rows'].groupby([df['state'], df['date'].str[:7]]).first().sum()):,})")
+    for col in count_columns(base_name, df.columns):
+        df[col] = df[col] * df['sample_weight']
+    df['month'] = df['date'].str[:7]
+    return df
+
+
+def stratified_total_se(df, value, by='state'):
+    """
+    Standard error of the estimated total of `value` per `by` group.
+
+    `df` must come from load_preview_csv (values already weight-scaled).
+    With scaled values the stratified variance of a stratum total is
+    (1 - n_h/N_h) * n_h * s_h^2. Strata are nested within states, so `by`
+    must be 'state' (or None for the grand total).
+
+    Returns:
+    --------
+    pd.Series of standard errors indexed by `by` (or a float if by is None)
+    """
+    values = df[value] if isinstance(value, str) else value
+    grouped = values.groupby([df[c] for c in STRATUM_COLS])
+    n_h = grouped.size()
+    N_h = df['stratum_rows'].groupby([df[c] for c in STRATUM_COLS]).first()
+    var_h = (1 - n_h / N_h) * n_h * grouped.var(ddof=1).fillna(0)
+
+    if by is None:
+        return float(np.sqrt(var_h.sum()))
+    return np.sqrt(var_h.groupby(level=by).sum())
@@ -0,0 +1,129 @@
+"""
+Embedded SQL Query Layer
+========================
+Ad-hoc SQL over the cleaned store with an in-process DuckDB engine. The
+part files are scanned in place, so filters and aggregations run inside
+the scan instead of loading full frames into pandas.
+
+Views:
+  enrolment, biometric, demographic  - cleaned rows + norm_total, norm_0_5,
+                                       norm_5_17, norm_18_plus
+  states(state)                      - canonical state names
+  state_aliases(raw_state, state)    - raw spelling -> canonical state
+  district_aliases(raw_district, district)
+  districts(state, district, district_key) - when geometry or district
+                                       aggregates are available
+
+Usage:
+  python query.py "SELECT state, SUM(norm_total) FROM biometric
+                   WHERE state = 'Bihar' AND month(date) = 3 GROUP BY state"
+  python query.py --tables
+  python query.py --file question.sql --csv answer.csv
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from data_cleaning import STATE_MAPPING
+from district_agg import DISTRICT_AGG_FILE
+from district_geometry import DISTRICT_ALIASES, DISTRICT_GEOJSON, load_district_geojson
+from metrics import COLUMN_MAPS, DATA_DIR, DATASETS, part_files
+
+try:
+    import duckdb
+except ImportError:  # optional dependency, only needed for SQL queries
+    duckdb = None
+
+
+def _norm_expressions(dataset_name, columns):
+    """SQL expressions for the norm_* metric columns of a dataset."""
+    mapping = COLUMN_MAPS[dataset_name]
+    age_cols = [mapping[k] for k in ('0-5', '5-17', '18+') if mapping[k]]
+    total = mapping['total'] if mapping['total'] in columns else ' + '.join(age_cols)
+    return [
+        f"{total} AS norm_total",
+        f"{mapping['0-5'] or 0} AS norm_0_5",
+        f"{mapping['5-17']} AS norm_5_17",
+        f"{mapping['18+']} AS norm_18_plus",
+    ]
+
+
+def connect(data_dir=DATA_DIR):
+    """
+    Open an in-memory DuckDB connection with all views registered.
+
+    Returns:
+    --------
+    duckdb.DuckDBPyConnection
+    """
+    if duckdb is None:
+        raise ImportError("SQL queries require DuckDB (install with: pip install duckdb)")
+
+    con = duckdb.connect()
+    for name, base_name in DATASETS.items():
+        files = part_files(name, data_dir)
+        if not files:
+            print(f"Warning: No files found for {name}")
+            continue
+        file_list = ', '.join(f"'{f}'" for f in files)
+        scan = (f"read_csv([{file_list}], header=true, union_by_name=true, "
+                f"types={{'date': 'DATE', 'pincode': 'VARCHAR'}})")
+        columns = [row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {scan}").fetchall()]
+        con.execute(f"CREATE VIEW {name.lower()} AS "
+                    f"SELECT *, {', '.join(_norm_expressions(name, columns))} FROM {scan}")
+
+    # Canonical name tables (small, registered from Python)
+    con.register('states', pd.DataFrame({'state': sorted(set(STATE_MAPPING.values()))}))
+    con.register('state_aliases', pd.DataFrame(
+        sorted(STATE_MAPPING.items()), columns=['raw_state', 'state']))
+    con.register('district_aliases', pd.DataFrame(
+        sorted(DISTRICT_ALIASES.items()), columns=['raw_district', 'district']))
+
+    if os.path.exists(DISTRICT_GEOJSON):
+        props = [f['properties'] for f in load_district_geojson()['features']]
+        con.register('districts', pd.DataFrame(props)[['state', 'district', 'district_key']])
+    elif os.path.exists(DISTRICT_AGG_FILE):
+        con.execute(f"CREATE VIEW districts AS SELECT DISTINCT state, district, district_key "
+                    f"FROM read_csv('{DISTRICT_AGG_FILE}', header=true)")
+    return con
+
+
+def run_query(sql, data_dir=DATA_DIR):
+    """Run one SQL statement against the cleaned store and return a DataFrame."""
+    return connect(data_dir).execute(sql).df()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL queries over the cleaned Aadhaar store")
+    parser.add_argument('sql', nargs='?', help="SQL statement to run")
+    parser.add_argument('--file', help="Read the SQL statement from a file")
+    parser.add_argument('--csv', help="Write the result to a CSV file instead of printing")
+    parser.add_argument('--tables', action='store_true', help="List the available views")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Cleaned data directory")
+    args = parser.parse_args()
+
+    if args.tables:
+        con = connect(args.data_dir)
+        print(con.execute("SELECT table_name, table_type FROM information_schema.tables "
+                          "ORDER BY table_name").df().to_string(index=False))
+        return
+
+    sql = open(args.file).read() if args.file else args.sql
+    if not sql:
+        parser.print_help()
+        sys.exit(1)
+
+    result = run_query(sql, args.data_dir)
+    if args.csv:
+        result.to_csv(args.csv, index=False)
+        print(f"[OK] {len(result):,} rows saved to: {args.csv}")
+    else:
+        with pd.option_context('display.max_rows', 200, 'display.width', 200):
+            print(result.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Mergeable Streaming Sketches
+============================
+Summaries maintained chunk by chunk while cleaning, saved next to the
+cleaned output and queried by the map builders instead of regrouping
+millions of rows.
+- Heavy hitters (weighted Misra-Gries, top-k) of (district, pincode) per
+  state and metric -> hotspots
+- HyperLogLog distinct counts of pincodes and districts per state and
+  per state-day
+- Every sketch is mergeable, so per-chunk or per-worker sketches combine
+  into the same answer as one pass over all rows
+- Size grows with the number of state-days, not rows: each state-day HLL is
+  256 registers, so the saved sketches are ~300 KB for ~50k cleaned rows
+  (~150 dates x 36 states) and stay near that for the full dataset
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRIC_COLUMNS, add_norm_columns
+
+HEAVY_HITTER_K = 64
+HLL_PRECISION = 8          # 2^8 registers per sketch (~6.5% standard error)
+HLL_STATE_PRECISION = 12   # 2^12 registers for whole-period state sketches (~1.6%)
+
+
+# ============================================================================
+# HEAVY HITTERS (WEIGHTED MISRA-GRIES)
+# ============================================================================
+class HeavyHitters:
+    """
+    Weighted Misra-Gries summaries for many groups at once, held in one frame.
+
+    For each (metric, state) group at most k keys are kept. A kept estimate
+    f_hat satisfies f_hat <= f <= f_hat + offset, where offset is the total
+    weight subtracted from the group so far. Merging two summaries and
+    reducing again keeps the same guarantee (Agarwal et al., mergeable
+    summaries).
+    """
+
+    GROUP_COLS = ['metric', 'state']
+
+    def __init__(self, k=HEAVY_HITTER_K):
+        self.k = k
+        self.counts = pd.DataFrame({'metric': pd.Series(dtype=str), 'state': pd.Series(dtype=str),
+                                    'key': pd.Series(dtype=str), 'count': pd.Series(dtype=float)})
+        self.offsets = pd.Series(dtype=float, index=pd.MultiIndex.from_tuples([], names=self.GROUP_COLS))
+
+    def update(self, counts):
+        """Fold exact per-key counts (metric, state, key, count) into the summary."""
+        combined = pd.concat([self.counts, counts], ignore_index=True)
+        combined = combined.groupby(self.GROUP_COLS + ['key'], as_index=False)['count'].sum()
+        self._reduce(combined)
+
+    def merge(self, other):
+        """Merge another HeavyHitters summary into this one."""
+        self.offsets = self.offsets.add(other.offsets, fill_value=0)
+        self.update(other.counts)
+
+    def _reduce(self, combined):
+        combined = combined[combined['count'] > 0]
+        combined = combined.sort_values(self.GROUP_COLS + ['count'], ascending=[True, True, False])
+        rank = combined.groupby(self.GROUP_COLS).cumcount().to_numpy()
+
+        # Subtract the (k+1)-th largest count of each over-full group
+        threshold = combined.loc[rank == self.k].set_index(self.GROUP_COLS)['count']
+        if len(threshold):
+            group_index = pd.MultiIndex.from_frame(combined[self.GROUP_COLS])
+            subtract = threshold.reindex(group_index).fillna(0).to_numpy()
+            combined = combined.assign(count=combined['count'].to_numpy() - subtract)
+            combined = combined[combined['count'] > 0]
+            self.offsets = self.offsets.add(threshold, fill_value=0)
+
+        self.counts = combined.reset_index(drop=True)
+
+    def top(self, metric, n=1, key_filter=None):
+        """
+        Top-n keys per state for one metric.
+
+        key_filter : set of (state, key) pairs - only consider these
+
+        Returns:
+        --------
+        pd.DataFrame with columns: state, key, count, upper_bound
+        """
+        rows = self.counts[self.counts['metric'] == metric]
+        if key_filter is not None:
+            rows = rows[pd.MultiIndex.from_arrays([rows['state'], rows['key']]).isin(list(key_filter))]
+        rows = rows.sort_values(['state', 'count'], ascending=[True, False])
+        rows = rows.groupby('state').head(n).copy()
+        # A metric that never had a group trimmed (or no rows at all) has no offsets
+        in_metric = self.offsets.index.get_level_values('metric') == metric
+        offsets = self.offsets[in_metric].droplevel('metric')
+        rows['upper_bound'] = rows['count'] + rows['state'].map(offsets).fillna(0)
+        return rows[['state', 'key', 'count', 'upper_bound']].reset_index(drop=True)
+
+
+# ============================================================================
+# DISTINCT COUNTS (HYPERLOGLOG)
+# ============================================================================
+class HyperLogLogSet:
+    """
+    A named collection of HyperLogLog sketches stored as one register matrix.
+
+    Row i holds the 2^p registers of sketch names[i]; updates and merges are
+    element-wise maxima, so they are vectorised over all sketches at once.
+    """
+
+    def __init__(self, p=HLL_PRECISION):
+        self.p = p
+        self.names = []
+        self.index = {}
+        self.registers = np.zeros((0, 1 << p), dtype=np.uint8)
+
+    def _rows_for(self, names):
+        new = [n for n in pd.unique(names) if n not in self.index]
+        if new:
+            for n in new:
+                self.index[n] = len(self.names)
+                self.names.append(n)
+            grown = np.zeros((len(self.names), 1 << self.p), dtype=np.uint8)
+            grown[:len(self.registers)] = self.registers
+            self.registers = grown
+        return np.fromiter((self.index[n] for n in names), dtype=np.int64, count=len(names))
+
+    def update(self, sketch_names, values):
+        """Add values (any hashable column) to the sketch named per row."""
+        if not len(values):
+            return
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+        bucket = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # rho = position of the leftmost 1-bit in the remaining (64 - p) bits
+        bit_len = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_len[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rho = (64 - self.p - bit_len + 1).astype(np.uint8)
+
+        rows = self._rows_for(np.asarray(sketch_names, dtype=object))
+        flat = self.registers.reshape(-1)
+        np.maximum.at(flat, rows * (1 << self.p) + bucket, rho)
+
+    def merge(self, other):
+        """Merge another HyperLogLogSet (same precision) into this one."""
+        rows = self._rows_for(np.asarray(other.names, dtype=object))
+        np.maximum.at(self.registers, rows, other.registers)
+
+    def estimate(self, names=None):
+        """Estimated distinct counts, as a Series indexed by sketch name."""
+        names = self.names if names is None else list(names)
+        present = [n for n in names if n in self.index]
+        regs = self.registers[[self.index[n] for n in present]].astype(np.float64)
+        m = 1 << self.p
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.power(2.0, -regs).sum(axis=1)
+        zeros = (regs == 0).sum(axis=1)
+        # Small-range correction (linear counting)
+        small = (raw <= 2.5 * m) & (zeros > 0)
+        raw[small] = m * np.log(m / zeros[small])
+        return pd.Series(np.round(raw), index=present).reindex(names).fillna(0)
+
+
+# ============================================================================
+# SKETCH STORE (PER DATASET)
+# ============================================================================
+class SketchStore:
+    """Heavy hitters and distinct-count sketches for one cleaned dataset."""
+
+    def __init__(self, dataset_name, k=HEAVY_HITTER_K):
+        self.dataset_name = dataset_name
+        self.rows = 0
+        self.hotspots = HeavyHitters(k)
+        self.state_day = HyperLogLogSet(HLL_PRECISION)
+        self.state = HyperLogLogSet(HLL_STATE_PRECISION)
+
+    def update_chunk(self, chunk):
+        """Update every sketch with a chunk of cleaned rows."""
+        if chunk.empty:
+            return
+        chunk = add_norm_columns(chunk.copy(), self.dataset_name)
+        key = chunk['district'].astype(str) + '|' + chunk['pincode'].astype(str).str.zfill(6)
+
+        per_key = chunk.assign(key=key).groupby(['state', 'key'])[METRIC_COLUMNS].sum()
+        counts = per_key.stack().rename('count').reset_index().rename(columns={'level_2': 'metric'})
+        self.hotspots.update(counts[['metric', 'state', 'key', 'count']])
+
+        date = chunk['date'].astype(str)
+        self.state_day.update('pincode|' + chunk['state'] + '|' + date, chunk['pincode'].astype(str))
+        self.state_day.update('district|' + chunk['state'] + '|' + date, chunk['district'].astype(str))
+        self.state.update('pincode|' + chunk['state'], chunk['pincode'].astype(str))
+        self.state.update('district|' + chunk['state'], chunk['district'].astype(str))
+        self.rows += len(chunk)
+
+    def merge(self, other):
+        """Merge another dataset's SketchStore (e.g. another worker's chunk)."""
+        self.hotspots.merge(other.hotspots)
+        self.state_day.merge(other.state_day)
+        self.state.merge(other.state)
+        self.rows += other.rows
+
+    # --- Queries ---
+    def top_hotspots(self, metric, n=1, district_filter=None):
+        """
+        Top-n (district, pincode) hotspots per state for a metric.
+
+        district_filter : set of (state, district) pairs - only consider these
+                          districts; states and districts as in the cleaned store,
+                          so same-named districts of other states stay out
+
+        Returns:
+        --------
+        pd.DataFrame with columns: state, district, pincode, count, upper_bound
+        """
+        key_filter = None
+        if district_filter is not None:
+            pairs = set(district_filter)
+            counts = self.hotspots.counts
+            key_filter = {(state, key) for state, key in zip(counts['state'], counts['key'])
+                          if (state, key.split('|', 1)[0]) in pairs}
+        top = self.hotspots.top(metric, n, key_filter)
+        parts = top['key'].str.split('|', n=1, expand=True)
+        top.insert(1, 'district', parts[0] if len(top) else [])
+        top.insert(2, 'pincode', parts[1] if len(top) else [])
+        return top.drop(columns='key')
+
+    def distinct_pincodes(self, state, date=None):
+        name = f"pincode|{state}" + (f"|{date}" if date else '')
+        sketches = self.state_day if date else self.state
+        return int(sketches.estimate([name]).iloc[0])
+
+    def distinct_districts(self, state, date=None):
+        name = f"district|{state}" + (f"|{date}" if date else '')
+        sketches = self.state_day if date else self.state
+        return int(sketches.estimate([name]).iloc[0])
+
+    # --- Persistence ---
+    def save(self, output_base):
+        """Write <base>_sketches.json (heavy hitters) and <base>_sketches.npz (HLL)."""
+        meta = {
+            'dataset': self.dataset_name,
+            'rows': self.rows,
+            'k': self.hotspots.k,
+            'hotspots': self.hotspots.counts.to_dict('list'),
+            'offsets': [[m, s, v] for (m, s), v in self.hotspots.offsets.items()],
+            'state_day_names': self.state_day.names,
+            'state_names': self.state.names,
+        }
+        with open(f"{output_base}_sketches.json", 'w') as f:
+            json.dump(meta, f, separators=(',', ':'))
+        np.savez_compressed(f"{output_base}_sketches.npz",
+                            state_day=self.state_day.registers, state=self.state.registers)
+        size_kb = (os.path.getsize(f"{output_base}_sketches.json") +
+                   os.path.getsize(f"{output_base}_sketches.npz")) / 1024
+        print(f"Sketches saved: {os.path.basename(output_base)}_sketches.* ({size_kb:.1f} KB)")
+
+    @classmethod
+    def load(cls, output_base):
+        """Load sketches saved with save(); raises FileNotFoundError if absent."""
+        with open(f"{output_base}_sketches.json") as f:
+            meta = json.load(f)
+        store = cls(meta['dataset'], meta['k'])
+        store.rows = meta['rows']
+        store.hotspots.counts = pd.DataFrame(meta['hotspots'])
+        store.hotspots.offsets = pd.Series(
+            [v for _, _, v in meta['offsets']], dtype=float,
+            index=pd.MultiIndex.from_tuples([(m, s) for m, s, _ in meta['offsets']],
+                                            names=HeavyHitters.GROUP_COLS),
+        )
+
+        registers = np.load(f"{output_base}_sketches.npz")
+        for hll, names, key in ((store.state_day, meta['state_day_names'], 'state_day'),
+                                (store.state, meta['state_names'], 'state')):
+            hll.names = names
+            hll.index = {n: i for i, n in enumerate(names)}
+            hll.registers = registers[key]
+        return store
+
+
+def build_sketches(df, dataset_name, chunk_rows=250_000):
+    """Build a SketchStore by streaming a cleaned frame through in chunks."""
+    store = SketchStore(dataset_name)
+    for start in range(0, len(df), chunk_rows):
+        store.update_chunk(df.iloc[start:start + chunk_rows])
+    return store
@@ -0,0 +1,208 @@
+"""
+Run-to-Run Diff of Cleaned Stores
+=================================
+Explains why totals moved between two cleaning runs by comparing the two
+cleaned stores row by row, without a text diff of the part files.
+- Every row gets a 64-bit fingerprint of its values and one of its natural
+  key (date, state, district, pincode); text key columns are read as
+  categoricals, so hashing touches each distinct string once
+- Hash-set membership on the fingerprint arrays splits the rows into
+  unchanged, added, removed and changed (same key, new values)
+- Changed keys are aligned by key fingerprint to count which columns changed
+- Per-state deltas of every normalized metric, split into the part coming
+  from added, removed and changed rows
+
+Usage:
+  python store_diff.py OLD_DATA_DIR [NEW_DATA_DIR] [--dataset Enrolment] [--output diff_dir]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_cleaning import KEY_COLUMNS
+from metrics import COLUMN_MAPS, DATA_DIR, DATASETS, METRIC_COLUMNS, add_norm_columns, part_files
+
+CHANGE_TYPES = ('added', 'removed', 'changed')
+CATEGORY_COLUMNS = ['date', 'state', 'district']  # pincode stays numeric (fast to hash)
+
+
+def load_store(dataset_name, data_dir):
+    """All cleaned rows of a dataset with categorical text keys, or None."""
+    files = part_files(dataset_name, data_dir)
+    if not files:
+        return None
+    dfs = [pd.read_csv(f, dtype={c: 'category' for c in CATEGORY_COLUMNS}) for f in files]
+    # Concatenating categoricals with different categories would fall back to strings
+    keys = {c: union_categoricals([df[c] for df in dfs]) for c in CATEGORY_COLUMNS}
+    df = pd.concat([df.drop(columns=CATEGORY_COLUMNS) for df in dfs], ignore_index=True)
+    return df.assign(**keys)[dfs[0].columns]
+
+
+def _align_dtypes(old, new, columns):
+    """Give shared columns one dtype on both sides, so equal values hash equally."""
+    for c in columns:
+        if old[c].dtype == new[c].dtype:
+            continue
+        numeric = all(pd.api.types.is_numeric_dtype(df[c]) for df in (old, new))
+        dtype = float if numeric else str
+        old[c], new[c] = old[c].astype(dtype), new[c].astype(dtype)
+
+
+def fingerprints(df, columns):
+    """(row fingerprints over columns, key fingerprints over KEY_COLUMNS) as uint64 arrays."""
+    rows = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    keys = pd.util.hash_pandas_object(df[KEY_COLUMNS], index=False).to_numpy()
+    return rows, keys
+
+
+def _isin(values, other):
+    """Hash-set membership of uint64 fingerprints (O(n), no sort)."""
+    return pd.Index(values).isin(other)
+
+
+def _metrics(df, dataset_name):
+    """Normalized metric columns with the state."""
+    mapping = COLUMN_MAPS[dataset_name]
+    counts = df[[c for c in mapping.values() if c and c in df.columns]]
+    counts = counts.apply(pd.to_numeric, errors='coerce').fillna(0)
+    add_norm_columns(counts, dataset_name)
+    return counts[METRIC_COLUMNS].assign(state=df['state'])
+
+
+def diff_frames(old, new, dataset_name):
+    """
+    Classify the rows of two cleaned stores of one dataset.
+
+    Parameters:
+    -----------
+    old, new : pd.DataFrame - Cleaned rows (load_store)
+    dataset_name : str - Key of COLUMN_MAPS
+
+    Returns:
+    --------
+    dict with:
+      'counts'  : dict - rows per class (unchanged, added, removed, changed_old, changed_new)
+      'rows'    : pd.DataFrame - every differing row with a 'change' column
+                  (added, removed, changed_old, changed_new)
+      'states'  : pd.DataFrame - per state and metric: old, new, delta and
+                  the delta from added, removed and changed rows
+      'columns' : pd.Series - changed keys per value column
+      'schema'  : (columns only in old, columns only in new)
+    """
+    columns = [c for c in old.columns if c in new.columns]
+    _align_dtypes(old, new, columns)
+    old_rows, old_keys = fingerprints(old, columns)
+    new_rows, new_keys = fingerprints(new, columns)
+
+    # Rows present on one side only, then split by whether their key survives
+    old_only = ~_isin(old_rows, new_rows)
+    new_only = ~_isin(new_rows, old_rows)
+    removed_changed = old_only & _isin(old_keys, new_keys[new_only])
+    added_changed = new_only & _isin(new_keys, old_keys[old_only])
+    change_old = np.select([removed_changed, old_only], ['changed_old', 'removed'], '')
+    change_new = np.select([added_changed, new_only], ['changed_new', 'added'], '')
+
+    counts = {
+        'unchanged': int((~new_only).sum()),
+        'added': int((new_only & ~added_changed).sum()),
+        'removed': int((old_only & ~removed_changed).sum()),
+        'changed_old': int(removed_changed.sum()),
+        'changed_new': int(added_changed.sum()),
+    }
+    rows = pd.concat([
+        old.loc[old_only, columns].assign(change=change_old[old_only]),
+        new.loc[new_only, columns].assign(change=change_new[new_only]),
+    ], ignore_index=True).astype({c: str for c in KEY_COLUMNS})
+    rows = rows.sort_values(KEY_COLUMNS + ['change'], kind='stable', ignore_index=True)
+
+    # Which value columns changed: align the last version of each changed key on both sides
+    value_cols = [c for c in columns if c not in KEY_COLUMNS]
+    before = old.loc[removed_changed, value_cols].set_axis(old_keys[removed_changed])
+    after = new.loc[added_changed, value_cols].set_axis(new_keys[added_changed])
+    before = before[~before.index.duplicated(keep='last')].sort_index()
+    after = after[~after.index.duplicated(keep='last')].reindex(before.index)
+    changed_columns = (before != after).sum().sort_values(ascending=False)
+
+    # Per-state metric deltas, split by change type
+    old_m, new_m = _metrics(old, dataset_name), _metrics(new, dataset_name)
+    parts = {
+        'old': old_m,
+        'new': new_m,
+        'added': new_m[new_only & ~added_changed],
+        'removed': old_m[old_only & ~removed_changed].assign(
+            **{m: -old_m.loc[old_only & ~removed_changed, m] for m in METRIC_COLUMNS}),
+        'changed': pd.concat([
+            new_m[added_changed],
+            old_m[removed_changed].assign(**{m: -old_m.loc[removed_changed, m] for m in METRIC_COLUMNS}),
+        ]),
+    }
+    states = pd.concat({name: part.groupby('state', observed=True)[METRIC_COLUMNS].sum()
+                        for name, part in parts.items()}, axis=1).fillna(0)
+    states = states.stack(level=1, future_stack=True).rename_axis(['state', 'metric'])
+    states.insert(2, 'delta', states['new'] - states['old'])
+    states = states[['old', 'new', 'delta', *CHANGE_TYPES]]
+    if np.array_equal(states.to_numpy(), np.round(states.to_numpy())):
+        states = states.astype(np.int64)  # counts stay integers in the report
+    states = states.reset_index()
+
+    schema = ([c for c in old.columns if c not in new.columns], [c for c in new.columns if c not in old.columns])
+    return {'counts': counts, 'rows': rows, 'states': states, 'columns': changed_columns, 'schema': schema}
+
+
+def print_diff(dataset_name, result, metric='norm_total', top=15):
+    counts = result['counts']
+    print(f"\n{'='*60}")
+    print(f"{dataset_name}: {counts['unchanged']:,} unchanged, {counts['added']:,} added, "
+          f"{counts['removed']:,} removed, {counts['changed_new']:,} changed")
+    print('='*60)
+    only_old, only_new = result['schema']
+    if only_old or only_new:
+        print(f"  Columns only in old: {only_old or '-'}; only in new: {only_new or '-'}")
+    changed = result['columns'][result['columns'] > 0]
+    if len(changed):
+        print("  Changed columns (keys): " + ', '.join(f"{c} ({n:,})" for c, n in changed.items()))
+    states = result['states']
+    states = states[(states['metric'] == metric) & (states['delta'] != 0)]
+    if states.empty:
+        print(f"  No state total of {metric} changed.")
+        return
+    print(f"\n  {metric} by state (largest moves):")
+    moved = states.reindex(states['delta'].abs().sort_values(ascending=False).index).head(top)
+    print(moved.drop(columns='metric').to_string(index=False, float_format='{:,.0f}'.format))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two cleaned stores by row fingerprints")
+    parser.add_argument('old_dir', help="cleaned_data directory of the earlier run")
+    parser.add_argument('new_dir', nargs='?', default=DATA_DIR, help="cleaned_data directory of the later run")
+    parser.add_argument('--dataset', choices=list(DATASETS), help="Only this dataset (default: all)")
+    parser.add_argument('--metric', choices=METRIC_COLUMNS, default='norm_total', help="Metric to print")
+    parser.add_argument('--top', type=int, default=15, help="States to print")
+    parser.add_argument('--output', help="Directory for <dataset>_diff_rows.csv and _diff_states.csv")
+    args = parser.parse_args()
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    for name in [args.dataset] if args.dataset else DATASETS:
+        start = time.perf_counter()
+        old, new = load_store(name, args.old_dir), load_store(name, args.new_dir)
+        if old is None or new is None:
+            print(f"\nSkipping {name}: no cleaned data in {args.old_dir if old is None else args.new_dir}")
+            continue
+        result = diff_frames(old, new, name)
+        print_diff(name, result, args.metric, args.top)
+        if args.output:
+            base = os.path.join(args.output, DATASETS[name])
+            result['rows'].to_csv(f"{base}_diff_rows.csv", index=False)
+            result['states'].to_csv(f"{base}_diff_states.csv", index=False)
+            print(f"[OK] Diff rows and state deltas saved: {base}_diff_*.csv")
+        print(f"[OK] {name}: {len(old):,} vs {len(new):,} rows diffed in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+Test Setup
+==========
+- The uidai scripts import each other as top-level modules, so the
+  package directory goes on sys.path before any test imports them
+"""
+
+import os
+import sys
+
+UIDAI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if UIDAI_DIR not in sys.path:
+    sys.path.insert(0, UIDAI_DIR)
@@ -0,0 +1,83 @@
+"""
+Distributed Cleaning Matches Single-Process Cleaning
+====================================================
+- A small synthetic enrolment dump (restated keys across files, raw state
+  spellings, rows that fail the quality rules) is cleaned twice: by
+  distributed_clean.py local with several worker processes, and by
+  data_cleaning.clean_dataset in one process
+- Cleaned parts, quarantine, conflicts and state lineage must hold the same
+  rows (order aside) for every conflict policy
+"""
+
+import glob
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_cleaning
+from conftest import UIDAI_DIR
+
+STATES = ['Gujarat', 'gujarat', 'Bihar', 'jammu and kashmir', 'Orissa', 'Narnia']
+DISTRICTS = ['North', 'South', 'East']
+
+
+def write_dump(raw_dir, n_files=4, rows_per_file=300, seed=7):
+    """Raw CSV files where every later file restates part of the one before it."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(raw_dir)
+    previous = None
+    for i in range(n_files):
+        df = pd.DataFrame({
+            'date': [f"{d:02d}-03-2025" for d in rng.integers(1, 29, rows_per_file)],
+            'state': rng.choice(STATES, rows_per_file),
+            'district': rng.choice(DISTRICTS, rows_per_file),
+            'pincode': rng.integers(380001, 380060, rows_per_file).astype(str),
+            'age_0_5': rng.integers(0, 40, rows_per_file),
+            'age_5_17': rng.integers(0, 40, rows_per_file),
+            'age_18_greater': rng.integers(0, 40, rows_per_file),
+        })
+        df.loc[df.index[:5], 'age_0_5'] = -1          # counts_non_negative
+        df.loc[df.index[5:10], 'date'] = '31-02-2025'  # date_parsed
+        df.loc[df.index[10:15], 'pincode'] = '012345'  # pincode_valid
+        if previous is not None:
+            restated = previous.iloc[20:60].copy()
+            restated['age_5_17'] += 1
+            df = pd.concat([df, previous.iloc[60:80], restated], ignore_index=True)
+        df.to_csv(os.path.join(raw_dir, f"dump_{i}.csv"), index=False)
+        previous = df
+
+
+def _read_sorted(path):
+    df = pd.read_csv(path, dtype=str)
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+@pytest.mark.parametrize('policy', data_cleaning.CONFLICT_POLICIES)
+def test_local_run_matches_single_process(tmp_path, policy):
+    write_dump(str(tmp_path / 'distributed' / 'api_data_aadhar_enrolment'))
+    write_dump(str(tmp_path / 'single' / 'api_data_aadhar_enrolment'))
+
+    subprocess.run([sys.executable, os.path.join(UIDAI_DIR, 'distributed_clean.py'), 'local',
+                    '--workers', '3', '--base-dir', str(tmp_path / 'distributed'),
+                    '--dataset', 'ENROLMENT', '--conflict-policy', policy],
+                   check=True, capture_output=True)
+
+    single_out = tmp_path / 'single' / 'cleaned_data'
+    single_out.mkdir()
+    stats = data_cleaning.clean_dataset(str(tmp_path / 'single' / 'api_data_aadhar_enrolment'),
+                                        str(single_out / 'enrolment_cleaned'), 'ENROLMENT', policy)
+    data_cleaning.write_reports([stats], str(single_out))
+    assert stats['restated_keys'] > 0 and stats['quarantined_rows'] > 0
+
+    distributed_out = tmp_path / 'distributed' / 'cleaned_data'
+    parts = sorted(os.path.basename(p) for p in glob.glob(str(single_out / 'enrolment_cleaned_part*.csv')))
+    assert parts == sorted(os.path.basename(p)
+                           for p in glob.glob(str(distributed_out / 'enrolment_cleaned_part*.csv')))
+    for name in parts + ['enrolment_cleaned_quarantine.csv', 'enrolment_cleaned_conflicts.csv',
+                         'state_lineage.csv']:
+        pd.testing.assert_frame_equal(_read_sorted(distributed_out / name), _read_sorted(single_out / name),
+                                      obj=name)
@@ -0,0 +1,113 @@
+"""
+Ingestion Against the Mock API
+==============================
+- MockServer on an ephemeral port with injected 503s: every row arrives
+  and the run is recorded in ingest_manifest.json
+- A run stopped by a hard error resumes from its cursor and only fetches
+  the missing pages
+"""
+
+import asyncio
+import glob
+import json
+import os
+import threading
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+import ingest
+
+N_ROWS = 1_000
+PAGE_SIZE = 50
+STOP_OFFSET = 600
+
+
+@pytest.fixture
+def mock_api():
+    """Start a mock API for a handler class; yields a function returning its base URL."""
+    servers = []
+
+    def start(handler):
+        server = ingest.MockServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/resource"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def run_ingest(base_dir, base_url, retries=10):
+    return asyncio.run(ingest.ingest_all({'enrolment': 'mock-enrolment'}, concurrency=4, base_dir=str(base_dir),
+                                         base_url=base_url, page_size=PAGE_SIZE, retries=retries))
+
+
+def read_manifest(base_dir):
+    with open(os.path.join(ingest.raw_dir('enrolment', str(base_dir)), ingest.MANIFEST)) as f:
+        return json.load(f)
+
+
+def raw_rows(base_dir):
+    files = glob.glob(os.path.join(ingest.raw_dir('enrolment', str(base_dir)), '*.csv'))
+    return pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+
+
+def test_ingest_with_injected_failures(tmp_path, mock_api):
+    base_url = mock_api(ingest.make_mock_handler(N_ROWS, fail_rate=0.2))
+    (run,) = run_ingest(tmp_path, base_url)
+
+    df = raw_rows(tmp_path)
+    assert len(df) == N_ROWS
+    assert list(df.columns) == ingest.RAW_FIELDS['enrolment']
+
+    manifest = read_manifest(tmp_path)
+    assert len(manifest['runs']) == 1
+    entry = manifest['runs'][0]
+    assert entry == run
+    assert entry['total'] == entry['rows'] == N_ROWS
+    assert [f['offset'] for f in entry['files']] == list(range(0, N_ROWS, PAGE_SIZE))
+    raw = ingest.raw_dir('enrolment', str(tmp_path))
+    assert all(os.path.exists(os.path.join(raw, f['file'])) for f in entry['files'])
+    assert not os.path.exists(os.path.join(raw, '.ingest-mock-enrolment'))
+
+
+def test_interrupted_run_resumes(tmp_path, mock_api, capsys):
+    base = ingest.make_mock_handler(N_ROWS, fail_rate=0.1)
+    requested = []
+
+    class Stopping(base):
+        """Answers 404 (not retryable) from STOP_OFFSET on, ending the run."""
+
+        def do_GET(self):
+            offset = int(parse_qs(urlparse(self.path).query).get('offset', ['0'])[-1])
+            if offset >= STOP_OFFSET:
+                self._send(404, {'error': 'stopped'})
+                return
+            super().do_GET()
+
+    class Counting(base):
+        def do_GET(self):
+            requested.append(int(parse_qs(urlparse(self.path).query)['offset'][-1]))
+            super().do_GET()
+
+    with pytest.raises(HTTPError):
+        run_ingest(tmp_path, mock_api(Stopping))
+    staging = os.path.join(ingest.raw_dir('enrolment', str(tmp_path)), '.ingest-mock-enrolment')
+    with open(os.path.join(staging, 'cursor.json')) as f:
+        cursor = json.load(f)
+    done = {int(o) for o in cursor['done']}
+    assert done and max(done) < STOP_OFFSET
+    assert not os.path.exists(os.path.join(ingest.raw_dir('enrolment', str(tmp_path)), ingest.MANIFEST))
+
+    capsys.readouterr()
+    (run,) = run_ingest(tmp_path, mock_api(Counting))
+    assert 'Resuming enrolment run' in capsys.readouterr().out
+    assert run['run_id'] == cursor['run_id']
+    assert not done & set(requested)
+    assert len(raw_rows(tmp_path)) == run['rows'] == N_ROWS
+    assert len(read_manifest(tmp_path)['runs']) == 1
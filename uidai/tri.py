@@ -9,9 +9,17 @@ from mpl_toolkits.mplot3d import Axes3D
 import os
 import glob
 
+from district_join import join_district_days, load_district_day_join
+from downsample import thin
+from preview import PREVIEW, load_preview_csv, stratified_total_se
+
 print("Loading data for Trilateral Analysis...")
 
 def load_split_csv(base_name):
+    # Preview mode: stratified sample with counts scaled to full totals
+    if PREVIEW:
+        return load_preview_csv(base_name)
+    
     # Construct searching pattern
     base_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(base_dir, 'cleaned_data')
@@ -60,6 +68,12 @@ daily_bio_aligned = raw_bio.reindex(all_dates, fill_value=0)
 daily_demo_aligned = raw_demo.reindex(all_dates, fill_value=0)
 daily_enrol_aligned = raw_enrol.reindex(all_dates, fill_value=0)
 
+# Max points per daily line/area figure (only applied with --downsample);
+# the three series are thinned together so they keep the same dates
+PLOT_POINTS = 600
+daily_aligned = thin(pd.DataFrame({'Biometric': daily_bio_aligned, 'Demographic': daily_demo_aligned,
+                                   'Enrolment': daily_enrol_aligned}), PLOT_POINTS)
+
 # Merge state totals for scatter/bar plots (State-wise data doesn't need date alignment)
 merged_all = pd.merge(bio_by_state, demo_by_state, left_index=True, right_index=True, how='inner')
 merged_all = pd.merge(merged_all, enrol_by_state, left_index=True, right_index=True, how='inner')
@@ -73,9 +87,16 @@ plt.figure(figsize=(16, 6))
 top_10_all = merged_all.nlargest(10, 'Enrolment')
 x = np.arange(len(top_10_all))
 width = 0.25
-plt.bar(x - width, top_10_all['Biometric'], width, label='Biometric', color='skyblue')
-plt.bar(x, top_10_all['Demographic'], width, label='Demographic', color='lightgreen')
-plt.bar(x + width, top_10_all['Enrolment'], width, label='Enrolment', color='coral')
+# Preview mode: 95% confidence intervals of the sample-scaled totals
+if PREVIEW:
+    err_bio = 1.96 * stratified_total_se(biometric_df, 'total_updates').reindex(top_10_all.index).values
+    err_demo = 1.96 * stratified_total_se(demographic_df, 'demo_age_5_17').reindex(top_10_all.index).values
+    err_enrol = 1.96 * stratified_total_se(enrolment_df, 'total_enrolment').reindex(top_10_all.index).values
+else:
+    err_bio = err_demo = err_enrol = None
+plt.bar(x - width, top_10_all['Biometric'], width, yerr=err_bio, capsize=3, label='Biometric', color='skyblue')
+plt.bar(x, top_10_all['Demographic'], width, yerr=err_demo, capsize=3, label='Demographic', color='lightgreen')
+plt.bar(x + width, top_10_all['Enrolment'], width, yerr=err_enrol, capsize=3, label='Enrolment', color='coral')
 plt.title('Trilateral Comparison: Top 10 States', fontsize=14, fontweight='bold')
 plt.xticks(x, top_10_all.index, rotation=45)
 plt.legend()
@@ -84,9 +105,9 @@ plt.show()
 
 # Figure 44: Daily Trend Comparison (Using Aligned Data)
 plt.figure(figsize=(16, 6))
-plt.plot(daily_bio_aligned.index, daily_bio_aligned.values, label='Biometric', linewidth=2.5)
-plt.plot(daily_demo_aligned.index, daily_demo_aligned.values, label='Demographic', linewidth=2.5)
-plt.plot(daily_enrol_aligned.index, daily_enrol_aligned.values, label='Enrolment', linewidth=2.5)
+plt.plot(daily_aligned.index, daily_aligned['Biometric'].values, label='Biometric', linewidth=2.5)
+plt.plot(daily_aligned.index, daily_aligned['Demographic'].values, label='Demographic', linewidth=2.5)
+plt.plot(daily_aligned.index, daily_aligned['Enrolment'].values, label='Enrolment', linewidth=2.5)
 plt.title('Trilateral Comparison: Daily Trends', fontsize=14, fontweight='bold')
 plt.legend()
 plt.tight_layout()
@@ -94,17 +115,17 @@ plt.show()
 
 # Figure 45: Stacked Area (FIXED with Aligned Data)
 plt.figure(figsize=(16, 6))
-# Only use the _aligned variables here to ensure matching shapes
-plt.fill_between(daily_bio_aligned.index, 0, daily_bio_aligned.values, 
+# Only use the aligned frame here to ensure matching shapes
+stack_bio = daily_aligned['Biometric'].values
+stack_demo = stack_bio + daily_aligned['Demographic'].values
+stack_enrol = stack_demo + daily_aligned['Enrolment'].values
+plt.fill_between(daily_aligned.index, 0, stack_bio, 
                  alpha=0.6, label='Biometric', color='skyblue')
 
-plt.fill_between(daily_demo_aligned.index, daily_bio_aligned.values, 
-                 daily_bio_aligned.values + daily_demo_aligned.values, 
+plt.fill_between(daily_aligned.index, stack_bio, stack_demo, 
                  alpha=0.6, label='Demographic', color='lightgreen')
 
-plt.fill_between(daily_enrol_aligned.index, 
-                 daily_bio_aligned.values + daily_demo_aligned.values,
-                 daily_bio_aligned.values + daily_demo_aligned.values + daily_enrol_aligned.values, 
+plt.fill_between(daily_aligned.index, stack_demo, stack_enrol, 
                  alpha=0.6, label='Enrolment', color='peachpuff')
 
 plt.title('Trilateral Comparison: Cumulative Daily Trends', fontsize=14, fontweight='bold')
@@ -203,17 +224,41 @@ plt.show()
 
 # Figure 52: Normalized Trends (Using Aligned Data)
 plt.figure(figsize=(16, 6))
-# Normalize using the aligned series
+# Normalize using the full aligned series (min/max over all days), then thin for plotting
 daily_bio_norm = (daily_bio_aligned - daily_bio_aligned.min()) / (daily_bio_aligned.max() - daily_bio_aligned.min())
 daily_demo_norm = (daily_demo_aligned - daily_demo_aligned.min()) / (daily_demo_aligned.max() - daily_demo_aligned.min())
 daily_enrol_norm = (daily_enrol_aligned - daily_enrol_aligned.min()) / (daily_enrol_aligned.max() - daily_enrol_aligned.min())
+daily_norm = thin(pd.DataFrame({'Biometric': daily_bio_norm, 'Demographic': daily_demo_norm,
+                                'Enrolment': daily_enrol_norm}), PLOT_POINTS)
 
-plt.plot(daily_bio_norm.index, daily_bio_norm.values, label='Biometric (Norm)')
-plt.plot(daily_demo_norm.index, daily_demo_norm.values, label='Demographic (Norm)')
-plt.plot(daily_enrol_norm.index, daily_enrol_norm.values, label='Enrolment (Norm)')
+plt.plot(daily_norm.index, daily_norm['Biometric'].values, label='Biometric (Norm)')
+plt.plot(daily_norm.index, daily_norm['Demographic'].values, label='Demographic (Norm)')
+plt.plot(daily_norm.index, daily_norm['Enrolment'].values, label='Enrolment (Norm)')
 plt.title('Trilateral Normalized Trends (0-1 Scale)', fontsize=14, fontweight='bold')
 plt.legend()
 plt.tight_layout()
 plt.show()
 
+# Figure 53: District-Level Updates per Enrolment (streamed sort-merge join)
+if PREVIEW:
+    # Preview mode: join the loaded samples instead of streaming the full store
+    district_day = join_district_days({'Enrolment': enrolment_df, 'Biometric': biometric_df,
+                                       'Demographic': demographic_df})
+else:
+    district_day = load_district_day_join()
+district_totals = district_day.groupby(['state', 'district'])[['enrol_total', 'bio_total', 'demo_total']].sum()
+district_totals = district_totals[district_totals['enrol_total'] >= 100]
+district_totals['Biometric per Enrolment'] = district_totals['bio_total'] / district_totals['enrol_total']
+district_totals['Demographic per Enrolment'] = district_totals['demo_total'] / district_totals['enrol_total']
+top_15_districts = district_totals.nlargest(15, 'Biometric per Enrolment')
+if not top_15_districts.empty:
+    labels = [f"{d} ({s})" for s, d in top_15_districts.index]
+    top_15_districts[['Biometric per Enrolment', 'Demographic per Enrolment']].set_axis(labels).plot(
+        kind='barh', figsize=(14, 8), color=['skyblue', 'lightgreen'])
+    plt.gca().invert_yaxis()
+    plt.title('Trilateral District View: Updates per Enrolment (Top 15 Districts)', fontsize=14, fontweight='bold')
+    plt.xlabel('Updates per Enrolment')
+    plt.tight_layout()
+    plt.show()
+
 print("Trilateral Analysis Complete.")
\ No newline at end of file
@@ -10,10 +10,17 @@ import matplotlib.dates as mdates
 import os
 import glob
 
+from downsample import thin
+from preview import PREVIEW, load_preview_csv, stratified_total_se
+
 
 print("Loading data for Trilateral Analysis...")
 
 def load_split_csv(base_name):
+    # Preview mode: stratified sample with counts scaled to full totals
+    if PREVIEW:
+        return load_preview_csv(base_name)
+    
     # Construct searching pattern
     base_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(base_dir, 'cleaned_data')
@@ -45,6 +52,9 @@ sns.set_style("whitegrid")
 # Date formatter for month names
 date_format = DateFormatter("%b %Y")  # e.g., "Jan 2024"
 
+# Max points per daily line/area figure (only applied with --downsample)
+PLOT_POINTS = 400
+
 # --- BIOMETRIC VISUALIZATIONS ---
 print("Generating Biometric Visualizations...")
 
@@ -52,6 +62,11 @@ print("Generating Biometric Visualizations...")
 plt.figure(figsize=(12, 6))
 state_bio = biometric_df.groupby('state')['total_updates'].sum().sort_values(ascending=False).head(10)
 sns.barplot(x=state_bio.values, y=state_bio.index, palette='viridis')
+if PREVIEW:
+    # 95% confidence intervals of the sample-scaled totals
+    state_bio_se = stratified_total_se(biometric_df, 'total_updates').reindex(state_bio.index)
+    plt.errorbar(state_bio.values, np.arange(len(state_bio)), xerr=1.96 * state_bio_se.values,
+                 fmt='none', ecolor='black', capsize=3)
 plt.title('Biometric: Top 10 States by Total Updates', fontsize=14, fontweight='bold')
 plt.xlabel('Total Updates')
 plt.ylabel('State')
@@ -94,7 +109,7 @@ plt.show()
 
 # Figure 5: Biometric - Daily Trend
 fig, ax = plt.subplots(figsize=(14, 6))
-daily_bio = biometric_df.groupby('date')['total_updates'].sum()
+daily_bio = thin(biometric_df.groupby('date')['total_updates'].sum(), PLOT_POINTS)
 ax.plot(daily_bio.index, daily_bio.values, color='blue', linewidth=2, marker='o', markersize=4)
 ax.xaxis.set_major_formatter(date_format)
 ax.xaxis.set_major_locator(mdates.MonthLocator())
@@ -108,7 +123,7 @@ plt.show()
 
 # Figure 6: Biometric - Age Group Trends
 fig, ax = plt.subplots(figsize=(14, 6))
-daily_bio_age = biometric_df.groupby('date')[['bio_age_5_17', 'bio_age_17_']].sum()
+daily_bio_age = thin(biometric_df.groupby('date')[['bio_age_5_17', 'bio_age_17_']].sum(), PLOT_POINTS)
 ax.plot(daily_bio_age.index, daily_bio_age['bio_age_5_17'], label='Age 5-17', linewidth=2)
 ax.plot(daily_bio_age.index, daily_bio_age['bio_age_17_'], label='Age 17+', linewidth=2)
 ax.xaxis.set_major_formatter(date_format)
@@ -143,6 +158,11 @@ print("Generating Demographic Visualizations...")
 plt.figure(figsize=(12, 6))
 state_demo = demographic_df.groupby('state')['demo_age_5_17'].sum().sort_values(ascending=False).head(10)
 sns.barplot(x=state_demo.values, y=state_demo.index, palette='plasma')
+if PREVIEW:
+    # 95% confidence intervals of the sample-scaled totals
+    state_demo_se = stratified_total_se(demographic_df, 'demo_age_5_17').reindex(state_demo.index)
+    plt.errorbar(state_demo.values, np.arange(len(state_demo)), xerr=1.96 * state_demo_se.values,
+                 fmt='none', ecolor='black', capsize=3)
 plt.title('Demographic: Top 10 States by Updates (Age 5-17)', fontsize=14, fontweight='bold')
 plt.xlabel('Total Updates')
 plt.ylabel('State')
@@ -161,7 +181,7 @@ plt.show()
 
 # Figure 10: Demographic - Daily Trend
 fig, ax = plt.subplots(figsize=(14, 6))
-daily_demo = demographic_df.groupby('date')['demo_age_5_17'].sum()
+daily_demo = thin(demographic_df.groupby('date')['demo_age_5_17'].sum(), PLOT_POINTS)
 ax.plot(daily_demo.index, daily_demo.values, color='green', linewidth=2, marker='o')
 ax.xaxis.set_major_formatter(date_format)
 ax.xaxis.set_major_locator(mdates.MonthLocator())
@@ -192,6 +212,11 @@ print("Generating Enrolment Visualizations...")
 plt.figure(figsize=(12, 6))
 state_enrol = enrolment_df.groupby('state')['total_enrolment'].sum().sort_values(ascending=False).head(10)
 sns.barplot(x=state_enrol.values, y=state_enrol.index, palette='rocket')
+if PREVIEW:
+    # 95% confidence intervals of the sample-scaled totals
+    state_enrol_se = stratified_total_se(enrolment_df, 'total_enrolment').reindex(state_enrol.index)
+    plt.errorbar(state_enrol.values, np.arange(len(state_enrol)), xerr=1.96 * state_enrol_se.values,
+                 fmt='none', ecolor='black', capsize=3)
 plt.title('Enrolment: Top 10 States', fontsize=14, fontweight='bold')
 plt.xlabel('Total Enrolment')
 plt.ylabel('State')
@@ -235,7 +260,7 @@ plt.show()
 
 # Figure 16: Enrolment - Daily Trend
 fig, ax = plt.subplots(figsize=(14, 6))
-daily_enrolment = enrolment_df.groupby('date')['total_enrolment'].sum()
+daily_enrolment = thin(enrolment_df.groupby('date')['total_enrolment'].sum(), PLOT_POINTS)
 ax.plot(daily_enrolment.index, daily_enrolment.values, color='coral', linewidth=2, marker='o')
 ax.xaxis.set_major_formatter(date_format)
 ax.xaxis.set_major_locator(mdates.MonthLocator())
@@ -248,7 +273,7 @@ plt.show()
 
 # Figure 17: Enrolment - Age Group Trends
 fig, ax = plt.subplots(figsize=(14, 6))
-age_daily = enrolment_df.groupby('date')[['age_0_5', 'age_5_17', 'age_18_greater']].sum()
+age_daily = thin(enrolment_df.groupby('date')[['age_0_5', 'age_5_17', 'age_18_greater']].sum(), PLOT_POINTS)
 ax.plot(age_daily.index, age_daily['age_0_5'], label='Age 0-5', linewidth=2)
 ax.plot(age_daily.index, age_daily['age_5_17'], label='Age 5-17', linewidth=2)
 ax.plot(age_daily.index, age_daily['age_18_greater'], label='Age 18+', linewidth=2)